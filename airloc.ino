@@ -2,21 +2,43 @@
 
 //USER SETTINGS 
 #define SAMPLE_RATE   44100            // Hz
-#define MIC_SPACING   0.05727827       // meters between microphones
+#define MIC_SPACING   0.05727827       // meters between microphones (NUM_MICS > 2: the largest distance between any two)
 #define SPEED_SOUND   343.0            // m/s
 #define BUFFER_LEN    1024             // 
 #define ENERGY_THRESHOLD 1e7           // 
+#define OUTPUT_BINARY 0                // 1 = framed binary offsets (host "Streaming binary"), 0 = one integer per line
+#define STREAM_RAW    0                // 1 = ship gated rawBuffer frames for host GCC-PHAT instead of computing offsets here
+#define STREAM_SCORES 0                // 1 = send computeOffset()'s whole score vector per chirp (host fuses them across chirps)
+#define SERIAL_BAUD   115200           // raise (e.g. 921600) with STREAM_RAW: each chirp frame is ~4 KB
+#define NUM_MICS      2                // 3 or 4 = second stereo pair on I2S_SD2; sends every pair's offset (needs OUTPUT_BINARY)
+
+#if NUM_MICS < 2 || NUM_MICS > 4
+#error "NUM_MICS must be 2, 3 or 4"
+#endif
+#if NUM_MICS > 2 && (!OUTPUT_BINARY || STREAM_RAW || STREAM_SCORES)
+#error "NUM_MICS > 2 sends FRAME_PAIR_OFFSETS: set OUTPUT_BINARY 1, STREAM_RAW 0 and STREAM_SCORES 0"
+#endif
 
 //I2S PINS 
 #define I2S_WS  25
 #define I2S_SD  22
 #define I2S_SCK 26
 #define I2S_PORT I2S_NUM_0
+#define I2S_SD2  33                     // NUM_MICS > 2: data of mics 2 (left) and 3 (right), same WS/SCK
+#define I2S_PORT2 I2S_NUM_1
 
 // Buffers
 int32_t rawBuffer[BUFFER_LEN];       // interweaved raw samples
 float leftBuf[BUFFER_LEN/2];
 float rightBuf[BUFFER_LEN/2];
+#define MAX_SHIFT_LIMIT 64               // room in corrScores; calcMaxShift() is 8 for the settings above
+double corrScores[2 * MAX_SHIFT_LIMIT + 1];
+#if NUM_MICS > 2
+int32_t rawBuffer2[BUFFER_LEN];      // second pair, clocked by the first
+float mic2Buf[BUFFER_LEN/2];
+float mic3Buf[BUFFER_LEN/2];
+float *micBufs[4] = {leftBuf, rightBuf, mic2Buf, mic3Buf};
+#endif
 
 // COMPUTE MAX SHIFT 
 int calcMaxShift() {
@@ -27,7 +49,8 @@ int calcMaxShift() {
 }
 
 // CROSS-CORRELATION 
-int computeOffset(float *a, float *b, int n, int maxShift) {
+// scores (if not NULL) receives the score of every shift, scores[shift + maxShift]
+int computeOffset(float *a, float *b, int n, int maxShift, double *scores) {
   int bestOffset = 0;
   double bestScore = -1e12;
 
@@ -39,6 +62,9 @@ int computeOffset(float *a, float *b, int n, int maxShift) {
         score += a[i] * b[j];
       }
     }
+    if (scores != NULL) {
+      scores[shift + maxShift] = score;
+    }
     if (score > bestScore) {
       bestScore = score;
       bestOffset = shift;
@@ -48,6 +74,24 @@ int computeOffset(float *a, float *b, int n, int maxShift) {
   return bestOffset;
 }
 
+// BINARY FRAMING 
+// SYNC (0xA5 0x5A) | type | payload length (uint16 LE) | payload | 8-bit sum of type, length and payload
+#define FRAME_OFFSETS 0x01
+#define FRAME_RAW_AUDIO 0x02
+#define FRAME_SCORES 0x03
+#define FRAME_PAIR_OFFSETS 0x04
+
+void sendFrame(uint8_t type, const uint8_t *payload, uint16_t len) {
+  uint8_t header[5] = {0xA5, 0x5A, type, (uint8_t)(len & 0xFF), (uint8_t)(len >> 8)};
+  uint8_t sum = header[2] + header[3] + header[4];
+  for (uint16_t i = 0; i < len; i++) {
+    sum += payload[i];
+  }
+  Serial.write(header, sizeof(header));
+  Serial.write(payload, len);
+  Serial.write(sum);
+}
+
 //I2S SETUP 
 void i2s_install() {
   const i2s_config_t i2s_config = {
@@ -76,13 +120,44 @@ void i2s_setpin() {
   i2s_set_pin(I2S_PORT, &pin_config);
 }
 
+#if NUM_MICS > 2
+// Second pair as a slave on the same WS/SCK, so both pairs sample on the same clock edge
+void i2s_install_second() {
+  const i2s_config_t i2s_config = {
+    .mode = (i2s_mode_t)(I2S_MODE_SLAVE | I2S_MODE_RX),
+    .sample_rate = SAMPLE_RATE,
+    .bits_per_sample = I2S_BITS_PER_SAMPLE_32BIT,
+    .channel_format = I2S_CHANNEL_FMT_RIGHT_LEFT,
+    .communication_format = I2S_COMM_FORMAT_I2S,
+    .intr_alloc_flags = 0,
+    .dma_buf_count = 8,
+    .dma_buf_len = BUFFER_LEN,
+    .use_apll = false,
+    .tx_desc_auto_clear = false,
+    .fixed_mclk = 0
+  };
+  i2s_driver_install(I2S_PORT2, &i2s_config, 0, NULL);
+  const i2s_pin_config_t pin_config = {
+    .bck_io_num = I2S_SCK,
+    .ws_io_num = I2S_WS,
+    .data_out_num = -1,
+    .data_in_num = I2S_SD2
+  };
+  i2s_set_pin(I2S_PORT2, &pin_config);
+}
+#endif
+
 // SETUP 
 void setup() {
-  Serial.begin(115200);
+  Serial.begin(SERIAL_BAUD);
   delay(500);
 
   i2s_install();
   i2s_setpin();
+#if NUM_MICS > 2
+  i2s_install_second();
+  i2s_start(I2S_PORT2);
+#endif
   i2s_start(I2S_PORT);
 
   Serial.println("TDOA Measurement Started");
@@ -103,6 +178,15 @@ void loop() {
     leftBuf[i] = (float)(rawBuffer[2 * i] >> 11);       // scale down 24-bit to 16-bit
     rightBuf[i] = (float)(rawBuffer[2 * i + 1] >> 11);
   }
+#if NUM_MICS > 2
+  size_t bytesRead2 = 0;
+  i2s_read(I2S_PORT2, (void*)rawBuffer2, BUFFER_LEN * sizeof(int32_t), &bytesRead2, portMAX_DELAY);
+  pairs = min(pairs, (int)(bytesRead2 / sizeof(int32_t)) / 2);
+  for (int i = 0; i < pairs; i++) {
+    mic2Buf[i] = (float)(rawBuffer2[2 * i] >> 11);
+    mic3Buf[i] = (float)(rawBuffer2[2 * i + 1] >> 11);
+  }
+#endif
 
   // Compute energy on left channel to detect chirp
   double energy = 0;
@@ -113,11 +197,47 @@ void loop() {
 
   // Only proceed if energy is above threshold (chirp detected)
   if (energy > ENERGY_THRESHOLD) {
-    int maxShift = calcMaxShift();
-    int offset = computeOffset(leftBuf, rightBuf, pairs, maxShift);
-
+#if STREAM_RAW
+    // Host does the correlation; send the untouched interleaved samples
+    sendFrame(FRAME_RAW_AUDIO, (const uint8_t *)rawBuffer, samplesRead * sizeof(int32_t));
+    return;
+#endif
+    int maxShift = min(calcMaxShift(), MAX_SHIFT_LIMIT);
+#if NUM_MICS > 2
+    // Every pair (i, j), i < j, in the order the host's MicArray expects; the host solves for the direction
+    int16_t pairLags[NUM_MICS * (NUM_MICS - 1) / 2];
+    int p = 0;
+    for (int i = 0; i < NUM_MICS; i++) {
+      for (int j = i + 1; j < NUM_MICS; j++) {
+        pairLags[p++] = (int16_t)computeOffset(micBufs[i], micBufs[j], pairs, maxShift, NULL);
+      }
+    }
+    sendFrame(FRAME_PAIR_OFFSETS, (const uint8_t *)pairLags, sizeof(pairLags));
+    return;
+#endif
+    int offset = computeOffset(leftBuf, rightBuf, pairs, maxShift, corrScores);
+
+#if STREAM_SCORES
+    // Only the shape matters to the host, so scale the largest |score| to 32767 and send int16s
+    int nScores = 2 * maxShift + 1;
+    double peak = 0;
+    for (int k = 0; k < nScores; k++) {
+      if (fabs(corrScores[k]) > peak) {
+        peak = fabs(corrScores[k]);
+      }
+    }
+    int16_t packed[2 * MAX_SHIFT_LIMIT + 1];
+    for (int k = 0; k < nScores; k++) {
+      packed[k] = peak > 0 ? (int16_t)lround(corrScores[k] * 32767.0 / peak) : 0;
+    }
+    sendFrame(FRAME_SCORES, (const uint8_t *)packed, nScores * sizeof(int16_t));
+#elif OUTPUT_BINARY
+    int16_t packed = (int16_t)offset;
+    sendFrame(FRAME_OFFSETS, (const uint8_t *)&packed, sizeof(packed));
+#else
     // Send offset in samples (one integer per line)
     Serial.println(offset);
+#endif
   }
   // else, skip sending to MATLAB (no chirp in this buffer)
 }
\ No newline at end of file
@@ -1,10 +1,9 @@
 # app.py (main launcher)
-import sys
-import os 
 import time
-from PySide6.QtWidgets import QApplication, QSplashScreen
-from PySide6.QtGui import QPixmap
-from main_window import MainWindow
+LAUNCHED = time.perf_counter() # First thing, so the startup report covers our own imports too
+import sys
+import os
+import argparse
 
 # --- Add this helper function ---
 def resource_path(relative_path):
@@ -20,23 +19,134 @@ def resource_path(relative_path):
 # --- End of helper function ---
 
 
-def main():
-    app = QApplication(sys.argv)
+class StartupTimer:
+    """Named wall-clock marks from launch to first paint (--startup-timing)."""
+
+    def __init__(self):
+        self.marks = [("launch", LAUNCHED)]
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter()))
+
+    def total_ms(self):
+        return (self.marks[-1][1] - self.marks[0][1]) * 1000
+
+    def report(self):
+        lines = ["Startup timing:"]
+        for (_, previous), (name, at) in zip(self.marks, self.marks[1:]):
+            lines.append(f"  {name:<16} {(at - previous) * 1000:7.1f} ms")
+        lines.append(f"  {'total':<16} {self.total_ms():7.1f} ms")
+        return "\n".join(lines)
+
+
+def parse_args(argv):
+    """Parses the launcher options; anything unrecognised is left for Qt."""
+    parser = argparse.ArgumentParser(description="Underwater GPS tracker (GUI by default).")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run the tracking pipeline without a GUI (PySide6 is never imported).")
+    parser.add_argument("--port", action="append",
+                        help="Serial port of an ESP32, e.g. COM3 or /dev/ttyUSB0; repeat for several arrays (headless).")
+    parser.add_argument("--baud", type=int, default=115200, help="Serial baud rate (default: 115200).")
+    parser.add_argument("--format", choices=("line", "text", "binary"), default="text",
+                        help="Firmware output format (default: text).")
+    parser.add_argument("--out", help="Session log to record to (headless).")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds (headless).")
+    parser.add_argument("--mic-spacing", type=float, help="Microphone spacing in meters.")
+    parser.add_argument("--speed-of-sound", type=float, help="Speed of sound in the medium, m/s.")
+    parser.add_argument("--sample-rate", type=float, help="I2S sample rate in Hz.")
+    parser.add_argument("--startup-timing", action="store_true",
+                        help="Print how long import, UI construction and first paint took (GUI).")
+    parser.add_argument("--poses", help="JSON file of array poses ({port: {x, y, heading}}) for position fixes (headless).")
+    parser.add_argument("--mics", help="Mic positions of multi-mic arrays in metres, \"x,y[,z]; x,y[,z]; ...\" "
+                                          "(headless; the GUI sets them per port under Array Pose).")
+    parser.add_argument("--no-reconnect", action="store_true",
+                        help="Give up on a port that fails or is unplugged instead of retrying it (headless).")
+    parser.add_argument("--publish", nargs="?", const="", metavar="ADDRESS",
+                        help="Serve the live bearing feed to other processes on a Unix socket path or "
+                             "host:port, and in shared memory (see feed.py).")
+    parser.add_argument("--stats", help="Collect per-stage timings and dump them to this JSON file on exit (headless).")
+    return parser.parse_known_args(argv)
+
+
+def run_headless(args):
+    from bearing import BearingTable
+    from pipeline import run_headless as run_pipeline
+    from tdoa import MIC_SPACING, SPEED_SOUND, SAMPLE_RATE
 
-    # Splash screen
+    if not args.port:
+        print("--headless needs --port")
+        return 2
+    table = BearingTable(args.mic_spacing or MIC_SPACING,
+                         args.speed_of_sound or SPEED_SOUND,
+                         args.sample_rate or SAMPLE_RATE)
+    from position import load_poses
+    from array_geometry import parse_positions
+    try:
+        mics = parse_positions(args.mics) if args.mics else None
+    except ValueError as e:
+        print(f"--mics: {e}")
+        return 2
+    return run_pipeline(args.port, args.baud, args.format, args.out, args.duration, table,
+                        stats_path=args.stats, poses=load_poses(args.poses) if args.poses else None,
+                        reconnect=not args.no_reconnect, publish=args.publish, mics=mics)
+
+
+def run_gui(qt_argv, startup_timing=False, publish=None):
+    timer = StartupTimer()
+    from PySide6.QtWidgets import QApplication, QSplashScreen
+    from PySide6.QtGui import QPixmap
+    from PySide6.QtCore import QObject, QEvent
+
+    app = QApplication(qt_argv)
+    timer.mark("qt import")
+
+    # Splash screen, up before the heavy imports (numpy, the pipeline) rather than for a fixed time
     # Use the resource_path function to correctly locate the image
-    splash_pixmap = QPixmap(resource_path("splashpage.jpg"))
-    splash_screen = QSplashScreen(splash_pixmap)
-    splash_screen.setMask(splash_pixmap.mask())
-    splash_screen.show()
-    time.sleep(1)
+    # (Qt waits up to 1 s for the splash to be exposed, which never happens on headless platforms)
+    splash_screen = None
+    if app.platformName() not in ("offscreen", "minimal"):
+        splash_pixmap = QPixmap(resource_path("splashpage.jpg"))
+        splash_screen = QSplashScreen(splash_pixmap)
+        splash_screen.setMask(splash_pixmap.mask())
+        splash_screen.show()
+        app.processEvents()
+    timer.mark("splash")
+
+    from main_window import MainWindow
+    timer.mark("app import")
 
     # Main Window
     window = MainWindow()
-    splash_screen.finish(window)
+    timer.mark("ui construction")
+    if publish is not None:
+        window.publish_feed(publish)
+
+    class FirstPaint(QObject):
+        """Closes the startup timer when the compass first paints."""
+        def eventFilter(self, watched, event):
+            if event.type() == QEvent.Type.Paint:
+                watched.removeEventFilter(self)
+                timer.mark("first paint")
+                if startup_timing:
+                    print(timer.report())
+                    window.statusBar().showMessage(f"Started in {timer.total_ms():.0f} ms")
+            return False
+
+    first_paint = FirstPaint(window)
+    window.viewer.installEventFilter(first_paint)
     window.show()
+    if splash_screen is not None:
+        splash_screen.finish(window)
+
+    return app.exec()
+
 
-    app.exec()
+def main(argv=None):
+    argv = sys.argv if argv is None else argv
+    args, qt_args = parse_args(argv[1:])
+    if args.headless:
+        return run_headless(args)
+    return run_gui(argv[:1] + qt_args, args.startup_timing, args.publish)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# array_geometry.py (microphone layouts and multi-pair TDOA -> direction of arrival)
+import itertools
+import json
+import os
+import numpy as np
+from bearing import wrap_angle
+from tdoa import MIC_SPACING, SPEED_SOUND, SAMPLE_RATE
+
+
+def two_mic_positions(spacing=MIC_SPACING):
+    """The stock pair, spacing metres apart, as BearingTable sees it.
+
+    BearingTable takes a positive offset (rightBuf hears the chirp later) as a
+    source on the right, so the sketch's mic 0 (leftBuf) is the one at +X.
+    """
+    return [(spacing / 2, 0.0, 0.0), (-spacing / 2, 0.0, 0.0)]
+
+
+def parse_positions(text):
+    """"x,y[,z]; x,y[,z]; ..." in metres -> [(x, y, z)]. Raises ValueError on bad input."""
+    positions = []
+    for item in text.replace("\n", ";").split(";"):
+        if not item.strip():
+            continue
+        values = [float(v) for v in item.split(",")]
+        if len(values) not in (2, 3):
+            raise ValueError(f"'{item.strip()}' is not x,y or x,y,z")
+        positions.append(tuple(values) + (0.0,) * (3 - len(values)))
+    if len(positions) < 2:
+        raise ValueError("An array needs at least two microphones.")
+    return positions
+
+
+def format_positions(positions):
+    """Inverse of parse_positions(); z is left out when it is 0."""
+    return "; ".join(",".join(f"{v:g}" for v in (p if p[2] else p[:2])) for p in positions)
+
+
+def load_geometries(path):
+    """Reads {port: [(x, y, z)]} from a JSON file; a missing file means none."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        data = json.load(f)
+    return {port: [tuple(float(v) for v in p) + (0.0,) * (3 - len(p)) for p in mics] for port, mics in data.items()}
+
+
+def save_geometries(path, geometries):
+    with open(path, "w") as f:
+        json.dump({port: [list(p) for p in mics] for port, mics in geometries.items()}, f, indent=2)
+
+
+class MicArray:
+    """Direction of arrival from the lags of every microphone pair, solved together by least squares.
+
+    Positions are metres in the array frame: +X right, +Y ahead (bearing 0),
+    +Z up. Pairs are (i, j) for i < j, in the order the sketch sends them.
+    Like computeOffset(mic i, mic j), a pair's lag is positive when mic j
+    hears the chirp after mic i. A plane wave from unit direction u reaches
+    the mic at r at time -r . u / speed_of_sound, so pair (i, j) sees
+
+        lag = (r_i - r_j) . u * sample_rate / speed_of_sound
+
+    Stacking the baselines r_j - r_i as D, a whole batch of lag rows is
+    solved with one product by the pseudo-inverse of -D. What that fixes
+    depends on the layout:
+
+    - 3-D arrays: u itself, so bearing and elevation are unambiguous;
+    - planar arrays: u up to a reflection through the array's plane. For a
+      level array that is only the sign of the elevation, so the bearing is
+      unambiguous and elevation is its magnitude;
+    - collinear arrays (like the stock pair): only the angle to the line, so
+      the source is assumed level, with the usual mirror bearing and no
+      elevation.
+    """
+
+    def __init__(self, positions, speed_of_sound=SPEED_SOUND, sample_rate=SAMPLE_RATE):
+        positions = np.asarray(positions, dtype=np.float64)
+        if positions.ndim != 2 or positions.shape[1] not in (2, 3) or len(positions) < 2:
+            raise ValueError("Mic positions must be two or more (x, y) or (x, y, z) points.")
+        if positions.shape[1] == 2:
+            positions = np.column_stack((positions, np.zeros(len(positions))))
+        self.positions = positions
+        self.pairs = np.array(list(itertools.combinations(range(len(positions)), 2)))
+        self.baselines = positions[self.pairs[:, 1]] - positions[self.pairs[:, 0]] # (P, 3) metres
+        if np.any(np.linalg.norm(self.baselines, axis=1) < 1e-9):
+            raise ValueError("Two microphones share a position.")
+
+        # Singular vectors of the baselines: the directions the lags can see
+        _, s, vt = np.linalg.svd(self.baselines)
+        self.rank = int(np.sum(s > 1e-9 * s[0]))
+        self._span = vt[:self.rank]
+        if self.rank == 1:
+            # Level direction across the line, pointing ahead where possible, for the assumed level source
+            line = vt[0]
+            across = np.cross((0.0, 0.0, 1.0), line)
+            self._across = across / np.linalg.norm(across) if np.linalg.norm(across) > 1e-9 else None
+            if self._across is not None and self._across[1] < 0:
+                self._across = -self._across
+        elif self.rank == 2:
+            # Plane normal, pointing up (or ahead for a vertical plane)
+            normal = vt[2]
+            if normal[2] < 0 or (abs(normal[2]) < 1e-9 and normal[1] < 0):
+                normal = -normal
+            self._normal = normal
+        self.speed_of_sound = self.sample_rate = None
+        self.configure(speed_of_sound, sample_rate)
+
+    @property
+    def pair_count(self):
+        return len(self.pairs)
+
+    def configure(self, speed_of_sound, sample_rate):
+        """Rebuilds the solver for a new calibration. Returns False if nothing changed."""
+        if speed_of_sound <= 0 or sample_rate <= 0:
+            raise ValueError("Speed of sound and sample rate must be positive.")
+        if (speed_of_sound, sample_rate) == (self.speed_of_sound, self.sample_rate):
+            return False
+        self.speed_of_sound, self.sample_rate = float(speed_of_sound), float(sample_rate)
+        scale = self.sample_rate / self.speed_of_sound
+        # Largest possible lag of every pair, as calcMaxShift() would give for its spacing
+        self.max_shifts = np.ceil(np.linalg.norm(self.baselines, axis=1) * scale).astype(int)
+        self._solver = np.linalg.pinv(-self.baselines * scale) # (3, P): lags -> least-squares u
+        return True
+
+    def solve(self, lags):
+        """(M, P) pair lags in samples -> (bearing, ambiguous, elevation) arrays in radians.
+
+        ambiguous equals bearing wherever the layout resolves the direction;
+        elevation is NaN where it cannot tell.
+        """
+        lags = np.atleast_2d(np.asarray(lags, dtype=np.float64))
+        u = lags @ self._solver.T # (M, 3), lies in the span of the baselines
+        norm = np.linalg.norm(u, axis=1, keepdims=True)
+        u = np.where(norm > 1, u / np.maximum(norm, 1e-12), u) # Lags past the physical limit: along the limit
+        rest = np.sqrt(np.clip(1 - np.sum(u * u, axis=1, keepdims=True), 0, None)) # Unseen part of u
+
+        elevation = np.full(len(u), np.nan)
+        if self.rank == 3:
+            u = u / np.maximum(np.linalg.norm(u, axis=1, keepdims=True), 1e-12)
+            primary = mirror = u
+            elevation = np.arcsin(np.clip(u[:, 2], -1, 1))
+        elif self.rank == 2:
+            primary = u + rest * self._normal
+            mirror = u - rest * self._normal
+            elevation = np.arcsin(np.clip(primary[:, 2], -1, 1))
+        elif self._across is not None:
+            primary = u + rest * self._across
+            mirror = u - rest * self._across
+        else:
+            # A vertical line says nothing about the bearing
+            nan = np.full(len(u), np.nan)
+            up = self._span[0] if self._span[0][2] > 0 else -self._span[0]
+            return nan, nan, np.arcsin(np.clip(u @ up, -1, 1))
+
+        bearing = np.arctan2(primary[:, 0], primary[:, 1])
+        ambiguous = np.arctan2(mirror[:, 0], mirror[:, 1])
+        if self.rank != 1:
+            # Level planar and 3-D arrays: the reflection only flips elevation, so the bearings agree
+            level = np.abs(wrap_angle(ambiguous - bearing)) < 1e-9
+            ambiguous = np.where(level, bearing, ambiguous)
+        return wrap_angle(bearing), wrap_angle(ambiguous), elevation
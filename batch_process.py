@@ -0,0 +1,289 @@
+# batch_process.py (firmware-model parameter sweeps over recorded WAV / raw I2S captures, on all cores)
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from firmware_model import (split_frames, frame_energy, correlation_scores, best_offsets, firmware_max_shift,
+                            MAX_SHIFT_LIMIT)
+from tdoa import SAMPLE_RATE, MIC_SPACING, SPEED_SOUND, BUFFER_LEN, ENERGY_THRESHOLD
+
+RAW_EXTENSIONS = (".raw", ".i2s", ".bin") # Headerless little-endian int32 L/R pairs, as in rawBuffer
+CAPTURE_EXTENSIONS = (".wav",) + RAW_EXTENSIONS
+CHUNK_PAIRS = 1 << 18 # Stereo sample pairs per task: about 6 s at 44.1 kHz, 2 MB as int32
+
+# USER SETTINGS of airloc.ino that a sweep can vary
+SETTING_NAMES = ("sample_rate", "mic_spacing", "speed_of_sound", "buffer_len", "energy_threshold")
+
+
+# --- Captures ---
+class Capture:
+    """Where a capture's samples live and how to turn them into rawBuffer-style int32 values.
+
+    Nothing is read up front; workers memory-map just the chunk they process.
+    """
+
+    def __init__(self, path, offset, pairs, channels, sample_format, sample_rate):
+        self.path = path
+        self.offset = offset # byte offset of the first sample
+        self.pairs = pairs # samples per channel
+        self.channels = channels
+        self.sample_format = sample_format # "i2", "i3", "i4" (PCM) or "f4" (float)
+        self.sample_rate = sample_rate
+
+    @property
+    def seconds(self):
+        return self.pairs / self.sample_rate
+
+    def read(self, start, count):
+        """Interleaved left/right int32 samples for pairs [start, start + count), left-justified like I2S."""
+        width = int(self.sample_format[1])
+        shape = (count, self.channels, width) if self.sample_format == "i3" else (count, self.channels)
+        dtype = np.uint8 if self.sample_format == "i3" else np.dtype("<" + self.sample_format)
+        data = np.memmap(self.path, dtype=dtype, mode="r", shape=shape,
+                         offset=self.offset + start * self.channels * width)[:, :2]
+
+        if self.sample_format == "i2":
+            samples = data.astype(np.int32) << 16
+        elif self.sample_format == "i3":
+            samples = (data[..., 0].astype(np.int32) << 8) | (data[..., 1].astype(np.int32) << 16) \
+                | (data[..., 2].astype(np.int32) << 24)
+        elif self.sample_format == "f4":
+            samples = (np.clip(data.astype(np.float64), -1.0, 1.0 - 2.0 ** -31) * 2.0 ** 31).astype(np.int32)
+        else:
+            samples = np.array(data, dtype=np.int32)
+        return samples.ravel()
+
+
+def _wav_capture(path):
+    """Finds the fmt and data chunks of a RIFF/WAVE file."""
+    with open(path, "rb") as f:
+        riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave != b"WAVE":
+            raise ValueError(f"{path} is not a WAV file")
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            tag, size = struct.unpack("<4sI", header)
+            if tag == b"fmt ":
+                body = f.read(size)
+                tag_id, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                if tag_id == 0xFFFE: # WAVE_FORMAT_EXTENSIBLE: the real format is in the sub-format GUID
+                    tag_id = struct.unpack("<H", body[24:26])[0]
+                fmt = (tag_id, channels, rate, bits)
+            elif tag == b"data":
+                if fmt is None:
+                    raise ValueError(f"{path} has data before its fmt chunk")
+                tag_id, channels, rate, bits = fmt
+                formats = {(1, 16): "i2", (1, 24): "i3", (1, 32): "i4", (3, 32): "f4"}
+                if (tag_id, bits) not in formats or channels < 2:
+                    raise ValueError(f"{path}: need 2+ channels of 16/24/32-bit PCM or 32-bit float")
+                # A truncated recording can claim more data than the file holds
+                size = min(size, os.path.getsize(path) - f.tell())
+                return Capture(path, f.tell(), size // (channels * bits // 8), channels,
+                               formats[(tag_id, bits)], rate)
+            else:
+                f.seek(size + (size & 1), os.SEEK_CUR)
+
+
+def open_capture(path, sample_rate=SAMPLE_RATE):
+    """Describes a WAV or raw I2S capture. Raw captures need the sample_rate they were taken at."""
+    if path.lower().endswith(".wav"):
+        return _wav_capture(path)
+    return Capture(path, 0, os.path.getsize(path) // 8, 2, "i4", sample_rate)
+
+
+def find_captures(paths):
+    """Expands directories into the capture files below them."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                found += sorted(os.path.join(root, name) for name in files
+                                if name.lower().endswith(CAPTURE_EXTENSIONS))
+        else:
+            found.append(path)
+    return found
+
+
+# --- Workers ---
+_settings = None # Per-process copy of the sweep, set by _init_worker
+
+
+def _init_worker(settings):
+    global _settings
+    _settings = settings
+
+
+def _process_chunk(capture, start, count):
+    """Runs every setting over one chunk. Returns [(frames, detections histogram over offsets)] per setting.
+
+    Settings that share a buffer length share the framing, the energies and
+    one set of correlation scores (for the widest max shift and the lowest
+    threshold); each setting then applies its own gate and shift window.
+    """
+    samples = capture.read(start, count)
+    results = [None] * len(_settings)
+    by_buffer = {}
+    for index, setting in enumerate(_settings):
+        by_buffer.setdefault(setting["buffer_len"], []).append(index)
+
+    for buffer_len, indices in by_buffer.items():
+        n = len(samples) // buffer_len
+        left, right = split_frames(samples[:n * buffer_len].reshape(n, buffer_len))
+        energy = frame_energy(left)
+        lowest = min(_settings[i]["energy_threshold"] for i in indices)
+        widest = max(_settings[i]["max_shift"] for i in indices)
+        candidates = energy > lowest
+        scores = correlation_scores(left[candidates], right[candidates], widest)
+        candidate_energy = energy[candidates]
+        for i in indices:
+            max_shift = _settings[i]["max_shift"]
+            hit = candidate_energy > _settings[i]["energy_threshold"]
+            offsets = best_offsets(scores[hit], max_shift, widest)
+            results[i] = (n, np.bincount(offsets + max_shift, minlength=2 * max_shift + 1))
+    return results
+
+
+# --- Sweep ---
+def make_settings(grid):
+    """Every combination of the {name: [values]} grid, with the firmware's max shift for each."""
+    names = list(grid)
+    settings = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        setting = dict(zip(names, values))
+        setting["buffer_len"] = int(setting["buffer_len"])
+        if setting["buffer_len"] < 2 or setting["buffer_len"] % 2:
+            raise ValueError("BUFFER_LEN must be a positive even number of samples")
+        # Capped like the sketch's corrScores buffer (and FirmwareModel)
+        setting["max_shift"] = min(firmware_max_shift(setting["mic_spacing"], setting["speed_of_sound"],
+                                                      setting["sample_rate"]), MAX_SHIFT_LIMIT)
+        settings.append(setting)
+    return settings
+
+
+def plan_chunks(captures, settings, chunk_pairs=CHUNK_PAIRS):
+    """Splits captures into tasks whose boundaries fall on frame boundaries for every buffer length."""
+    step = math.lcm(*(s["buffer_len"] // 2 for s in settings))
+    chunk = max(step, chunk_pairs // step * step)
+    return [(capture, start, min(chunk, capture.pairs - start))
+            for capture in captures for start in range(0, capture.pairs, chunk)]
+
+
+def run_sweep(captures, settings, workers=None, progress=print):
+    """Processes every chunk of every capture for every setting on a process pool. Returns summarize()'s rows."""
+    tasks = plan_chunks(captures, settings)
+    totals = [(0, np.zeros(2 * s["max_shift"] + 1, dtype=np.int64)) for s in settings]
+    audio_seconds = sum(c.seconds for c in captures)
+    started = time.monotonic()
+    done_seconds = 0.0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(settings,)) as pool:
+        futures = {pool.submit(_process_chunk, *task): task for task in tasks}
+        for done, future in enumerate(as_completed(futures), 1):
+            for i, (frames, histogram) in enumerate(future.result()):
+                totals[i] = (totals[i][0] + frames, totals[i][1] + histogram)
+            capture, _, count = futures[future]
+            done_seconds += count / capture.sample_rate
+            if progress and (done == len(tasks) or done % max(1, len(tasks) // 20) == 0):
+                elapsed = time.monotonic() - started
+                progress(f"{done}/{len(tasks)} chunks, {done_seconds / 60:.1f} of {audio_seconds / 60:.1f} min of audio "
+                         f"({done_seconds / max(elapsed, 1e-9):.0f}x real time)")
+    return summarize(settings, totals, audio_seconds)
+
+
+def summarize(settings, totals, audio_seconds):
+    """Detection rate and bearing statistics per setting, from the merged offset histograms."""
+    rows = []
+    for setting, (frames, histogram) in zip(settings, totals):
+        max_shift = setting["max_shift"]
+        detections = int(histogram.sum())
+        row = {name: setting[name] for name in SETTING_NAMES}
+        row.update(max_shift=max_shift, frames=int(frames), detections=detections,
+                   detection_rate=detections / frames if frames else 0.0,
+                   detections_per_min=detections / audio_seconds * 60 if audio_seconds else 0.0)
+        if detections:
+            # The bearing each whole-sample offset maps to, as the host's BearingTable does
+            offsets = np.arange(-max_shift, max_shift + 1)
+            arg = offsets * setting["speed_of_sound"] / (setting["sample_rate"] * setting["mic_spacing"])
+            bearings = np.degrees(np.arcsin(np.clip(arg, -1.0, 1.0)))
+            weights = histogram / detections
+            mean = float((weights * bearings).sum())
+            cumulative = np.cumsum(weights)
+            pick = lambda q: float(bearings[np.searchsorted(cumulative, q)])
+            row.update(bearing_mean=mean, bearing_std=float(np.sqrt((weights * (bearings - mean) ** 2).sum())),
+                       bearing_p5=pick(0.05), bearing_median=pick(0.5), bearing_p95=pick(0.95),
+                       offset_histogram=histogram.tolist())
+        rows.append(row)
+    return rows
+
+
+def print_report(rows):
+    print(f"{'rate':>7}{'spacing':>10}{'speed':>7}{'buffer':>7}{'threshold':>11}{'shift':>6}"
+          f"{'frames':>10}{'detect':>9}{'rate %':>8}{'/min':>8}{'mean°':>8}{'std°':>7}{'p5°':>7}{'p95°':>7}")
+    for r in rows:
+        stats = "".join(f"{r[k]:>{w}.1f}" if k in r else f"{'-':>{w}}"
+                        for k, w in (("bearing_mean", 8), ("bearing_std", 7), ("bearing_p5", 7), ("bearing_p95", 7)))
+        print(f"{r['sample_rate']:>7g}{r['mic_spacing']:>10.5f}{r['speed_of_sound']:>7g}{r['buffer_len']:>7}"
+              f"{r['energy_threshold']:>11.3g}{r['max_shift']:>6}{r['frames']:>10}{r['detections']:>9}"
+              f"{r['detection_rate'] * 100:>8.2f}{r['detections_per_min']:>8.1f}{stats}")
+
+
+def _values(text, kind=float):
+    return [kind(v) for v in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-run the firmware's chirp gate and computeOffset() over recorded captures "
+                    "for every combination of settings (comma-separated lists sweep a parameter).")
+    parser.add_argument("captures", nargs="+", help="WAV files, raw I2S dumps (.raw/.i2s/.bin) or directories.")
+    parser.add_argument("--threshold", type=_values, default=[ENERGY_THRESHOLD], help="ENERGY_THRESHOLD values.")
+    parser.add_argument("--buffer-len", type=lambda t: _values(t, int), default=[BUFFER_LEN], help="BUFFER_LEN values.")
+    parser.add_argument("--mic-spacing", type=_values, default=[MIC_SPACING], help="MIC_SPACING values (m).")
+    parser.add_argument("--speed-of-sound", type=_values, default=[SPEED_SOUND], help="SPEED_SOUND values (m/s).")
+    parser.add_argument("--sample-rate", type=_values,
+                        help="SAMPLE_RATE values (Hz). Defaults to the captures' own rate, which must then be the same "
+                             "for all of them (raw dumps: 44100).")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores).")
+    parser.add_argument("--json", help="Write the results (with offset histograms) to this JSON file.")
+    parser.add_argument("--csv", help="Write the results table to this CSV file.")
+    args = parser.parse_args()
+
+    raw_rate = args.sample_rate[0] if args.sample_rate else SAMPLE_RATE
+    captures = [open_capture(path, raw_rate) for path in find_captures(args.captures)]
+    if not captures:
+        parser.error("no captures found")
+    rates = args.sample_rate or sorted({c.sample_rate for c in captures})
+    if len(rates) > 1 and not args.sample_rate:
+        # Each rate would be swept over every capture, re-reading audio at rates it was not recorded at
+        parser.error(f"captures have different sample rates ({', '.join(f'{r:g}' for r in rates)} Hz); "
+                     "process them separately or pass --sample-rate")
+    settings = make_settings({
+        "sample_rate": rates, "mic_spacing": args.mic_spacing, "speed_of_sound": args.speed_of_sound,
+        "buffer_len": args.buffer_len, "energy_threshold": args.threshold,
+    })
+    minutes = sum(c.seconds for c in captures) / 60
+    print(f"{len(captures)} captures, {minutes:.1f} min of audio, {len(settings)} settings")
+
+    rows = run_sweep(captures, settings, args.workers)
+    print()
+    print_report(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            fields = list(dict.fromkeys(k for row in rows for k in row if k != "offset_histogram"))
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# bearing.py (sample offset -> bearing conversion)
+import numpy as np
+from tdoa import MIC_SPACING, SPEED_SOUND, SAMPLE_RATE, calc_max_shift
+
+# Speed of sound presets (m/s) offered in the calibration panel
+MEDIUMS = {
+    "Air": SPEED_SOUND,
+    "Fresh water": 1482.0,
+    "Sea water": 1500.0,
+}
+
+
+def wrap_angle(angle_rad):
+    """Wraps angles (scalar or array) into [-pi, pi)."""
+    return (np.asarray(angle_rad) + np.pi) % (2 * np.pi) - np.pi
+
+
+class BearingTable:
+    """Precomputed offset -> (bearing, mirror bearing) table for a two-microphone array.
+
+    A pair of microphones cannot tell a source in front of the array from its
+    reflection behind it, so every offset maps to a primary bearing theta in
+    [-90, 90] degrees (0 = ahead, positive = right) and its mirror pi - theta.
+    """
+
+    STEPS_PER_SAMPLE = 16 # Table entries per sample of lag, so fractional lags interpolate accurately
+
+    def __init__(self, mic_spacing=MIC_SPACING, speed_of_sound=SPEED_SOUND, sample_rate=SAMPLE_RATE):
+        self.mic_spacing = None
+        self.speed_of_sound = None
+        self.sample_rate = None
+        self.configure(mic_spacing, speed_of_sound, sample_rate)
+
+    def configure(self, mic_spacing, speed_of_sound, sample_rate=SAMPLE_RATE):
+        """Rebuilds the table for a new calibration. Returns False if nothing changed."""
+        if mic_spacing <= 0 or speed_of_sound <= 0 or sample_rate <= 0:
+            raise ValueError("Mic spacing, speed of sound and sample rate must all be positive.")
+        calibration = (float(mic_spacing), float(speed_of_sound), float(sample_rate))
+        if calibration == (self.mic_spacing, self.speed_of_sound, self.sample_rate):
+            return False
+        self.mic_spacing, self.speed_of_sound, self.sample_rate = calibration
+
+        self.max_shift = calc_max_shift(*calibration)
+        steps = self.STEPS_PER_SAMPLE
+        self.offsets = np.arange(-self.max_shift * steps, self.max_shift * steps + 1) / steps
+        # Path difference over spacing; lags past the physical limit clamp to +/-90 degrees
+        arg = self.offsets * self.speed_of_sound / (self.sample_rate * self.mic_spacing)
+        self.primary = np.arcsin(np.clip(arg, -1.0, 1.0))
+        self.mirror = wrap_angle(np.pi - self.primary)
+        return True
+
+    def lookup(self, offsets):
+        """Returns (primary, mirror) bearings in radians for a batch of (fractional) sample offsets."""
+        steps = self.STEPS_PER_SAMPLE
+        pos = np.clip(np.asarray(offsets, dtype=np.float64), -self.max_shift, self.max_shift)
+        pos = (pos + self.max_shift) * steps
+        index = np.minimum(pos.astype(np.intp), len(self.primary) - 2)
+        frac = pos - index
+
+        primary = self.primary[index] + frac * (self.primary[index + 1] - self.primary[index])
+        mirror = wrap_angle(np.pi - primary)
+        return primary, mirror
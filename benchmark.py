@@ -0,0 +1,143 @@
+# benchmark.py (end-to-end throughput/latency of serial -> pipeline -> ViewerWidget)
+import argparse
+import json
+import os
+import tempfile
+import time
+
+# No display needed: render with Qt's offscreen platform unless told otherwise
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PySide6.QtWidgets import QApplication
+from main_window import MainWindow
+from sim_device import SimulatedDevice
+
+# (format, chirps per second) cases run by default
+DEFAULT_CASES = [
+    ("text", 100), ("text", 1000), ("text", 10000),
+    ("binary", 100), ("binary", 1000), ("binary", 10000),
+    ("raw", 20), ("raw", 200),
+    ("scores", 200),
+]
+
+
+def _pump(app, seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def _percentiles(values):
+    if not values:
+        return {"p50_ms": None, "p99_ms": None, "max_ms": None}
+    ms = np.array(values) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99)), "max_ms": float(ms.max())}
+
+
+def run_case(app, fmt, rate, duration=5.0, jitter=0.0, transport="pty", devices=1):
+    """Streams synthetic chirps through a real MainWindow for duration seconds and returns the stats.
+
+    With devices > 1, that many simulated arrays each send rate chirps/s on their own port.
+    """
+    sims = [SimulatedDevice(rate, fmt, jitter, transport, seed=i) for i in range(devices)]
+    window = MainWindow()
+    window.RECORDINGS_DIR = tempfile.mkdtemp(prefix="airloc-bench-")
+    window.show()
+
+    delivered = [] # byte arrival -> batch handled on the GUI thread, one entry per batch
+    rendered = [] # byte arrival of the newest bearing -> end of the frame that drew it
+    last_painted = [None]
+
+    def on_batch(batch, port):
+        delivered.append(time.time() - float(batch["t"][-1]))
+    window.bridge.batch_ready.connect(on_batch)
+
+    paint = window.viewer.paintEvent
+    def timed_paint(event):
+        paint(event)
+        latest = window.history.latest_time()
+        if latest is not None and latest != last_painted[0]:
+            rendered.append(time.time() - latest)
+            last_painted[0] = latest
+    window.viewer.paintEvent = timed_paint
+
+    index = window.controls_panel.format_input.findData("binary" if fmt in ("raw", "scores") else fmt)
+    window.controls_panel.format_input.setCurrentIndex(index)
+    window.current_com_port = sims[0].port
+    window._start_serial_tracking()
+    for device in sims[1:]:
+        window._add_port(device.port)
+    _pump(app, 0.5) # Connect before the first chirp; opening the port flushes anything already queued
+    for device in sims:
+        device.start()
+    _pump(app, 0.5) # Settle before measuring
+    received_before = len(window.history)
+    _pump(app, duration)
+    received = len(window.history) - received_before
+
+    for device in sims:
+        device.stop()
+    _pump(app, 0.5) # Let everything already sent drain
+    total_sent, total_received = sum(device.sent for device in sims), len(window.history)
+    window._stop_serial_tracking()
+    window.close()
+    for device in sims:
+        device.close()
+
+    return {
+        "format": fmt,
+        "rate": rate,
+        "devices": devices,
+        "transport": transport,
+        "throughput_per_s": received / duration,
+        "sent": total_sent,
+        "received": total_received,
+        "dropped": max(total_sent - total_received, 0),
+        "batches": len(delivered),
+        "frames": len(rendered),
+        "arrival_to_gui": _percentiles(delivered),
+        "arrival_to_frame": _percentiles(rendered),
+    }
+
+
+def print_report(results):
+    print(f"{'format':<7}{'rate/s':>8}{'ports':>6}{'thru/s':>10}{'dropped':>9}{'frames':>8}"
+          f"{'gui p50':>10}{'gui p99':>10}{'frame p50':>11}{'frame p99':>11}")
+    fmt_ms = lambda v: "-" if v is None else f"{v:.1f}"
+    for r in results:
+        print(f"{r['format']:<7}{r['rate']:>8g}{r['devices']:>6}{r['throughput_per_s']:>10.0f}{r['dropped']:>9}{r['frames']:>8}"
+              f"{fmt_ms(r['arrival_to_gui']['p50_ms']):>10}{fmt_ms(r['arrival_to_gui']['p99_ms']):>10}"
+              f"{fmt_ms(r['arrival_to_frame']['p50_ms']):>11}{fmt_ms(r['arrival_to_frame']['p99_ms']):>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency/throughput benchmark against a simulated ESP32.")
+    parser.add_argument("--duration", type=float, default=5.0, help="Measured seconds per case (default: 5).")
+    parser.add_argument("--case", action="append", metavar="FORMAT:RATE",
+                        help="Run only these cases, e.g. --case text:1000 --case raw:50.")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Chirp gap jitter (fraction of the gap).")
+    parser.add_argument("--transport", choices=("pty", "tcp"), default="pty" if os.name == "posix" else "tcp")
+    parser.add_argument("--devices", type=int, default=1, help="Simulated arrays per case, each at RATE (default: 1).")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    cases = DEFAULT_CASES
+    if args.case:
+        cases = [(fmt, float(rate)) for fmt, rate in (case.split(":") for case in args.case)]
+
+    app = QApplication.instance() or QApplication([])
+    results = []
+    for fmt, rate in cases:
+        print(f"Running {fmt} at {rate:g} chirps/s for {args.duration:g} s...")
+        results.append(run_case(app, fmt, rate, args.duration, args.jitter, args.transport, args.devices))
+
+    print()
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
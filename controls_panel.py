@@ -1,13 +1,28 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QPushButton, QLabel,
     QLineEdit, QComboBox, QSlider, QGroupBox,
-    QHBoxLayout, QSizePolicy
+    QHBoxLayout, QSizePolicy, QCompleter, QListWidget, QListWidgetItem
 )
+from PySide6.QtGui import QPalette
 from PySide6.QtCore import Qt, Signal # Import Signal for custom events
+from bearing import MEDIUMS
+from tdoa import MIC_SPACING, SAMPLE_RATE
 
 class ControlsPanel(QWidget):
     # New signal to emit the desired COM port string
     com_port_changed = Signal(str)
+    # Add the COM Port field's port to the tracked receivers / remove the selected one
+    port_add_requested = Signal(str)
+    port_remove_requested = Signal(str)
+    # Emitted with (mic spacing m, speed of sound m/s, sample rate Hz) when calibration is applied
+    calibration_changed = Signal(float, float, float)
+    # Replay controls: seek to a fraction of the session, new speed (0 = as fast as possible), stop
+    replay_seek_requested = Signal(float)
+    replay_speed_changed = Signal(float)
+    replay_stop_requested = Signal()
+    # Emitted with (port, x m, y m, heading degrees) when an array pose is set
+    array_pose_changed = Signal(str, float, float, float)
+    array_geometry_changed = Signal(str, str) # port, mic positions as "x,y[,z]; ..." ("" for the stock pair)
 
     def __init__(self):
         super().__init__()
@@ -27,8 +42,10 @@ class ControlsPanel(QWidget):
         self.x_label = QLabel("X: 0.00")
         self.y_label = QLabel("Y: 0.00")
         self.z_label = QLabel("Z: 0.00")
+        self.error_label = QLabel("±: --") # 1-sigma radial uncertainty of the fix
+        self.arrays_label = QLabel("Arrays: --")
 
-        for label in (self.x_label, self.y_label, self.z_label):
+        for label in (self.x_label, self.y_label, self.z_label, self.error_label, self.arrays_label):
             label.setAlignment(Qt.AlignmentFlag.AlignLeft)
             coord_layout.addWidget(label)
         coord_group.setLayout(coord_layout)
@@ -43,15 +60,123 @@ class ControlsPanel(QWidget):
         serial_layout.addWidget(QLabel("COM Port:"))
         serial_layout.addWidget(self.port_input)
 
+        # Wire format the firmware is sending; "Legacy" keeps the old one-value-per-line reader
+        self.format_input = QComboBox()
+        self.format_input.addItem("Legacy (per line)", "line")
+        self.format_input.addItem("Streaming text", "text")
+        self.format_input.addItem("Streaming binary (offsets, scores or raw audio)", "binary")
+        self.format_input.setCurrentIndex(1)
+        serial_layout.addWidget(QLabel("Data Format:"))
+        serial_layout.addWidget(self.format_input)
+
         self.set_port_button = QPushButton("Set COM Port")
         serial_layout.addWidget(self.set_port_button)
         # Connect the button click to our new signal emitter
         self.set_port_button.clicked.connect(self._emit_com_port_setting)
 
+        # Receiver arrays being tracked; ports can be added and removed while tracking runs
+        self.active_ports = QListWidget()
+        self.active_ports.setMaximumHeight(80)
+        serial_layout.addWidget(QLabel("Active Ports:"))
+        serial_layout.addWidget(self.active_ports)
+        port_buttons = QHBoxLayout()
+        self.add_port_button = QPushButton("Add Port")
+        self.add_port_button.clicked.connect(self._emit_add_port)
+        port_buttons.addWidget(self.add_port_button)
+        self.remove_port_button = QPushButton("Remove Port")
+        self.remove_port_button.clicked.connect(self._emit_remove_port)
+        port_buttons.addWidget(self.remove_port_button)
+        serial_layout.addLayout(port_buttons)
+
         serial_settings_group.setLayout(serial_layout)
         layout.addWidget(serial_settings_group)
         # --- End New ---
 
+        # --- Array Calibration Group ---
+        calibration_group = QGroupBox("Array Calibration")
+        calibration_layout = QVBoxLayout()
+
+        self.spacing_input = QLineEdit(f"{MIC_SPACING}")
+        calibration_layout.addWidget(QLabel("Mic Spacing (m):"))
+        calibration_layout.addWidget(self.spacing_input)
+
+        self.medium_input = QComboBox()
+        for name, speed in MEDIUMS.items():
+            self.medium_input.addItem(f"{name} ({speed:.0f} m/s)", speed)
+        calibration_layout.addWidget(QLabel("Medium:"))
+        calibration_layout.addWidget(self.medium_input)
+
+        self.sample_rate_input = QLineEdit(f"{SAMPLE_RATE}")
+        calibration_layout.addWidget(QLabel("Sample Rate (Hz):"))
+        calibration_layout.addWidget(self.sample_rate_input)
+
+        self.apply_calibration_button = QPushButton("Apply Calibration")
+        calibration_layout.addWidget(self.apply_calibration_button)
+        self.apply_calibration_button.clicked.connect(self._emit_calibration)
+
+        calibration_group.setLayout(calibration_layout)
+        layout.addWidget(calibration_group)
+
+        # --- Array Pose Group ---
+        # Where each receiver array sits and which way it faces; two or more give X/Y fixes
+        pose_group = QGroupBox("Array Pose")
+        pose_layout = QVBoxLayout()
+        self._poses = {}
+        pose_fields = QHBoxLayout()
+        self.pose_x_input = QLineEdit("0")
+        self.pose_y_input = QLineEdit("0")
+        self.pose_heading_input = QLineEdit("0")
+        for label, field in (("X (m)", self.pose_x_input), ("Y (m)", self.pose_y_input),
+                             ("Heading (°)", self.pose_heading_input)):
+            field_layout = QVBoxLayout()
+            field_layout.addWidget(QLabel(label))
+            field_layout.addWidget(field)
+            pose_fields.addLayout(field_layout)
+        pose_layout.addLayout(pose_fields)
+        self.set_pose_button = QPushButton("Set Pose for Selected Port")
+        self.set_pose_button.clicked.connect(self._emit_array_pose)
+        pose_layout.addWidget(self.set_pose_button)
+        # Mic layout of arrays with more than two mics (NUM_MICS in the sketch), in the array's own frame
+        self._geometries = {}
+        pose_layout.addWidget(QLabel("Mic positions (m), x,y[,z]; ... (blank: stock pair):"))
+        self.mics_input = QLineEdit()
+        self.mics_input.setPlaceholderText("-0.03,-0.03; 0.03,-0.03; 0.03,0.03; -0.03,0.03")
+        pose_layout.addWidget(self.mics_input)
+        self.set_mics_button = QPushButton("Set Mics for Selected Port")
+        self.set_mics_button.clicked.connect(self._emit_array_geometry)
+        pose_layout.addWidget(self.set_mics_button)
+        self.active_ports.currentTextChanged.connect(self._show_array_pose)
+        pose_group.setLayout(pose_layout)
+        layout.addWidget(pose_group)
+
+        # --- Replay Group ---
+        replay_group = QGroupBox("Replay")
+        replay_layout = QVBoxLayout()
+
+        self.replay_speed_input = QComboBox()
+        for label, speed in (("1x (real time)", 1.0), ("2x", 2.0), ("5x", 5.0), ("10x", 10.0), ("As fast as possible", 0.0)):
+            self.replay_speed_input.addItem(label, speed)
+        self.replay_speed_input.currentIndexChanged.connect(
+            lambda index: self.replay_speed_changed.emit(self.replay_speed())
+        )
+        replay_layout.addWidget(QLabel("Speed:"))
+        replay_layout.addWidget(self.replay_speed_input)
+
+        self.replay_slider = QSlider(Qt.Orientation.Horizontal)
+        self.replay_slider.setRange(0, 1000)
+        self.replay_slider.sliderReleased.connect(
+            lambda: self.replay_seek_requested.emit(self.replay_slider.value() / 1000)
+        )
+        replay_layout.addWidget(self.replay_slider)
+
+        self.stop_replay_button = QPushButton("Stop Replay")
+        self.stop_replay_button.clicked.connect(self.replay_stop_requested.emit)
+        replay_layout.addWidget(self.stop_replay_button)
+
+        replay_group.setLayout(replay_layout)
+        layout.addWidget(replay_group)
+        self.set_replay_active(False)
+
         # Apply main layout
         self.setLayout(layout)
 
@@ -59,11 +184,60 @@ class ControlsPanel(QWidget):
         self.setMinimumWidth(180)
         self.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Expanding)
 
-    def update_coordinate(self, x, y, z):
-        # Existing method for coordinate update
+    def update_coordinate(self, x, y, z, sigma=None, arrays=None):
+        # Existing method for coordinate update; z is None while fixes are 2-D only
         self.x_label.setText(f"X: {x:.2f}")
         self.y_label.setText(f"Y: {y:.2f}")
-        self.z_label.setText(f"Z: {z:.2f}")
+        self.z_label.setText("Z: --" if z is None else f"Z: {z:.2f}")
+        if sigma is not None:
+            self.error_label.setText(f"±: {sigma:.2f} m")
+        if arrays is not None:
+            self.arrays_label.setText(f"Arrays: {arrays}")
+
+    def set_array_poses(self, poses):
+        """Remembers {port: (x, y, heading)} so selecting a port shows its pose."""
+        self._poses = dict(poses)
+        self._show_array_pose(self._pose_port())
+
+    def set_array_geometries(self, geometries):
+        """Remembers {port: mic positions text} so selecting a port shows its layout."""
+        self._geometries = dict(geometries)
+        self._show_array_pose(self._pose_port())
+
+    def _emit_array_geometry(self):
+        port = self._pose_port()
+        if not port:
+            print("Select or enter a port to set the mics of.")
+            return
+        text = self.mics_input.text().strip()
+        self._geometries[port] = text
+        self.array_geometry_changed.emit(port, text)
+
+    def _pose_port(self):
+        """The selected active port, or the COM Port field so poses can be set before tracking."""
+        item = self.active_ports.currentItem()
+        return item.text() if item is not None else self.port_input.text().strip()
+
+    def _show_array_pose(self, port):
+        if port in self._poses:
+            for field, value in zip((self.pose_x_input, self.pose_y_input, self.pose_heading_input),
+                                    self._poses[port]):
+                field.setText(f"{value:g}")
+        self.mics_input.setText(self._geometries.get(port, ""))
+
+    def _emit_array_pose(self):
+        port = self._pose_port()
+        try:
+            pose = (float(self.pose_x_input.text()), float(self.pose_y_input.text()),
+                    float(self.pose_heading_input.text()))
+        except ValueError:
+            print("Array X, Y and heading must be numbers.")
+            return
+        if not port:
+            print("Select or enter a port to place.")
+            return
+        self._poses[port] = pose
+        self.array_pose_changed.emit(port, *pose)
 
     def _emit_com_port_setting(self):
         """Emits the text from the COM port input field."""
@@ -72,4 +246,78 @@ class ControlsPanel(QWidget):
             self.com_port_changed.emit(port_name)
             print(f"COM Port set to: {port_name}")
         else:
-            print("COM Port field cannot be empty.")
\ No newline at end of file
+            print("COM Port field cannot be empty.")
+
+    def _emit_add_port(self):
+        port_name = self.port_input.text().strip()
+        if port_name:
+            self.port_add_requested.emit(port_name)
+        else:
+            print("COM Port field cannot be empty.")
+
+    def _emit_remove_port(self):
+        item = self.active_ports.currentItem()
+        if item is not None:
+            self.port_remove_requested.emit(item.text())
+
+    def set_active_ports(self, ports, reconnecting=()):
+        """Lists the ports feeding the pipeline; those in reconnecting are greyed out. Keeps the selection."""
+        current = self.active_ports.currentItem()
+        selected = current.text() if current is not None else None
+        self.active_ports.blockSignals(True)
+        self.active_ports.clear()
+        for port in ports:
+            item = QListWidgetItem(port)
+            if port in reconnecting:
+                item.setForeground(self.palette().brush(QPalette.ColorGroup.Disabled, QPalette.ColorRole.Text))
+                item.setToolTip("Not connected; retrying")
+            self.active_ports.addItem(item)
+            if port == selected:
+                self.active_ports.setCurrentItem(item)
+        self.active_ports.blockSignals(False)
+
+    def set_detected_ports(self, ports):
+        """Offers the scanned [(device, description)] ports as completions of the COM Port field.
+
+        If the user has not typed a port and the default one was not found,
+        the first detected port is filled in. Returns True if the field changed.
+        """
+        devices = [device for device, _ in ports]
+        completer = QCompleter(devices, self)
+        completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.port_input.setCompleter(completer)
+        self.port_input.setToolTip("\n".join(f"{device}: {description}" for device, description in ports))
+        if devices and not self.port_input.isModified() and self.port_input.text() not in devices:
+            self.port_input.setText(devices[0])
+            return True
+        return False
+
+    def data_format(self):
+        """Returns the serial reader mode selected in the Data Format box."""
+        return self.format_input.currentData()
+
+    def replay_speed(self):
+        """Returns the selected replay speed multiplier (0 = as fast as possible)."""
+        return self.replay_speed_input.currentData()
+
+    def set_replay_active(self, active):
+        """Enables the seek slider and stop button while a replay is running."""
+        self.replay_slider.setEnabled(active)
+        self.stop_replay_button.setEnabled(active)
+        if not active:
+            self.replay_slider.setValue(0)
+
+    def set_replay_position(self, fraction):
+        """Moves the seek slider to follow playback, unless the user is dragging it."""
+        if not self.replay_slider.isSliderDown():
+            self.replay_slider.setValue(int(fraction * 1000))
+
+    def _emit_calibration(self):
+        """Emits the array calibration entered in the panel."""
+        try:
+            spacing = float(self.spacing_input.text())
+            sample_rate = float(self.sample_rate_input.text())
+        except ValueError:
+            print("Mic spacing and sample rate must be numbers.")
+            return
+        self.calibration_changed.emit(spacing, self.medium_input.currentData(), sample_rate)
\ No newline at end of file
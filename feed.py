@@ -0,0 +1,644 @@
+# feed.py (live bearing feed for other local processes: shared-memory ring and socket subscribers)
+import argparse
+import errno
+import os
+import selectors
+import socket
+import stat
+import struct
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+import numpy as np
+from instrumentation import metrics
+from serial_protocol import HEADER, SYNC_WORD, MAX_PAYLOAD, FrameDecoder
+
+# One published measurement, both in the ring and in FRAME_BEARINGS payloads (32 bytes, 8-aligned)
+FEED_DTYPE = np.dtype([
+    ("t", "<f8"),          # measurement time (seconds since the epoch)
+    ("offset", "<f8"),     # sample offset between the two microphones (NaN for multi-mic arrays)
+    ("bearing", "<f4"),    # primary bearing in radians
+    ("ambiguous", "<f4"),  # mirrored bearing in radians (equal to bearing when the array resolves it)
+    ("port", "<u4"),       # id of the port the measurement came from (see the port names)
+    ("elevation", "<f4"),  # radians above level, NaN unless the array geometry can tell
+])
+
+# --- Socket framing ---
+# The socket feed uses the firmware's binary framing (see serial_protocol.py) with its own frame types,
+# so subscribers can reuse FrameDecoder and resync the same way.
+FRAME_BEARINGS = 0x10 # FEED_DTYPE rows
+FRAME_PORT = 0x11 # uint32 port id followed by the UTF-8 port name; always sent before that id is used
+FRAME_GAP = 0x12 # uint32 rows this subscriber missed because it fell behind
+FEED_DTYPES = {
+    FRAME_BEARINGS: FEED_DTYPE,
+    FRAME_PORT: np.dtype("u1"),
+    FRAME_GAP: np.dtype("<u4"),
+}
+FRAME_ROWS = MAX_PAYLOAD // FEED_DTYPE.itemsize # Rows per FRAME_BEARINGS frame
+
+# --- Shared-memory ring layout ---
+#   RING_HEADER | PORT_SLOTS names of PORT_NAME_SIZE bytes | capacity FEED_DTYPE records
+# The header holds magic, record size, capacity, port count, closed flag, the total number of records
+# ever written and the writer's pid (padded to 8 bytes). Record i lives in slot i % capacity.
+RING_MAGIC = b"AIRRING2"
+RING_HEADER = struct.Struct("<8sIIIIQI4x")
+WRITE_COUNT_OFFSET = 24 # of the uint64 write count within RING_HEADER
+CLOSED_OFFSET = 20
+WRITER_PID_OFFSET = 32
+WRITE_CHUNK = 1024 # Most records the writer fills before publishing them, so readers know what may be torn
+PORT_SLOTS = 64
+PORT_NAME_SIZE = 64
+RECORDS_OFFSET = RING_HEADER.size + PORT_SLOTS * PORT_NAME_SIZE
+
+DEFAULT_RING = "airloc_feed"
+# Unix sockets where available; "host:port" selects TCP (localhost only unless you say otherwise)
+DEFAULT_ADDRESS = "127.0.0.1:47400" if os.name == "nt" else "/tmp/airloc-feed.sock"
+
+
+def parse_address(address):
+    """"host:port" -> (AF_INET, (host, port)); anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and os.sep not in address:
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, address
+
+
+def _frame(frame_type, payload):
+    """serial_protocol.encode_frame(), with the checksum summed in numpy for large payloads."""
+    header = HEADER.pack(SYNC_WORD, frame_type, len(payload))
+    total = int(np.frombuffer(header[2:], dtype=np.uint8).sum()) + int(np.frombuffer(payload, dtype=np.uint8).sum())
+    return header + payload + bytes([total & 0xFF])
+
+
+def _port_frame(port_id, name):
+    return _frame(FRAME_PORT, struct.pack("<I", port_id) + name.encode()[:PORT_NAME_SIZE])
+
+
+def _process_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0) # Signal 0 only checks the process exists
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True # Someone else's process
+    return True
+
+
+def _stale_ring(shm):
+    """True if an existing segment is a ring whose publisher shut down or died (so it can be replaced)."""
+    if os.name == "nt":
+        return False # Windows frees a segment with its last handle, so an existing one is in use
+    if shm.size < RING_HEADER.size:
+        return False
+    magic, _, _, _, closed, _, pid = RING_HEADER.unpack_from(shm.buf, 0)
+    return magic == RING_MAGIC and (closed or not _process_alive(pid))
+
+
+def _remove_stale_socket(path):
+    """Unlinks a Unix socket left behind by a publisher that is gone. Raises OSError if one still answers."""
+    try:
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            return # Not ours: let bind() report it
+    except FileNotFoundError:
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path) # Nobody listening
+        return
+    except OSError:
+        return
+    finally:
+        probe.close()
+    raise OSError(errno.EADDRINUSE, f"Another tracker is already publishing on {path}")
+
+
+def _attach(name):
+    """Opens an existing shared-memory segment without letting this process's exit unlink it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False) # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name != "nt":
+            # Older Pythons register every attached segment with the resource tracker, which
+            # unlinks it when this (reading) process exits
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+# --- Shared memory ---
+class SharedRing:
+    """Single-writer ring of FEED_DTYPE records in shared memory.
+
+    The writer never waits for readers: it copies up to WRITE_CHUNK rows into
+    their slots and then advances the write count, one aligned 8-byte store.
+    A RingReader that falls more than capacity - WRITE_CHUNK records behind
+    loses the oldest ones and is told how many.
+    """
+
+    def __init__(self, name=DEFAULT_RING, capacity=1 << 16):
+        self.name = name
+        self.capacity = int(capacity)
+        if self.capacity < 2 * WRITE_CHUNK:
+            raise ValueError(f"A ring needs room for at least {2 * WRITE_CHUNK} records.")
+        size = RECORDS_OFFSET + self.capacity * FEED_DTYPE.itemsize
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            existing = _attach(name)
+            stale = _stale_ring(existing)
+            existing.close()
+            if not stale:
+                raise FileExistsError(errno.EEXIST, f"Shared memory '{name}' belongs to a running publisher")
+            # Left behind by a publisher that crashed: nobody can be writing it any more
+            existing = shared_memory.SharedMemory(name=name) # Tracked, so unlink() unregisters it cleanly
+            existing.close()
+            existing.unlink()
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        buf = self._shm.buf
+        RING_HEADER.pack_into(buf, 0, RING_MAGIC, FEED_DTYPE.itemsize, self.capacity, 0, 0, 0, os.getpid())
+        self._count = np.ndarray((1,), dtype="<u8", buffer=buf, offset=WRITE_COUNT_OFFSET)
+        self._records = np.ndarray((self.capacity,), dtype=FEED_DTYPE, buffer=buf, offset=RECORDS_OFFSET)
+        self._ports = 0
+
+    def set_port_name(self, port_id, name):
+        """Names a port id for readers; ids are handed out from 0 upwards."""
+        if port_id >= PORT_SLOTS:
+            return # Readers show it as its id
+        encoded = name.encode()[:PORT_NAME_SIZE]
+        offset = RING_HEADER.size + port_id * PORT_NAME_SIZE
+        self._shm.buf[offset:offset + PORT_NAME_SIZE] = encoded.ljust(PORT_NAME_SIZE, b"\0")
+        self._ports = max(self._ports, port_id + 1)
+        struct.pack_into("<I", self._shm.buf, 16, self._ports)
+
+    def write(self, rows):
+        count = int(self._count[0])
+        rows = rows[-self.capacity:]
+        for i in range(0, len(rows), WRITE_CHUNK):
+            chunk = rows[i:i + WRITE_CHUNK]
+            start = count % self.capacity
+            first = min(len(chunk), self.capacity - start)
+            self._records[start:start + first] = chunk[:first]
+            self._records[:len(chunk) - first] = chunk[first:]
+            count += len(chunk)
+            self._count[0] = count # Publishes the chunk: readers never look past the count
+
+    def close(self):
+        struct.pack_into("<I", self._shm.buf, CLOSED_OFFSET, 1) # Tells readers no more records will come
+        del self._count, self._records # Views must go before the mapping can close
+        self._shm.close()
+        self._shm.unlink()
+
+
+class RingReader:
+    """Reads a SharedRing from another process, starting with the next record written.
+
+    read() copies out the records written since the last call; lost counts
+    records that were overwritten before this reader got to them.
+    """
+
+    def __init__(self, name=DEFAULT_RING):
+        self._shm = _attach(name)
+        magic, record_size, self.capacity, _, _, _, _ = RING_HEADER.unpack_from(self._shm.buf, 0)
+        if magic != RING_MAGIC or record_size != FEED_DTYPE.itemsize:
+            self._shm.close()
+            raise ValueError(f"'{name}' is not a bearing feed ring")
+        self._count = np.ndarray((1,), dtype="<u8", buffer=self._shm.buf, offset=WRITE_COUNT_OFFSET)
+        self._records = np.ndarray((self.capacity,), dtype=FEED_DTYPE, buffer=self._shm.buf,
+                                   offset=RECORDS_OFFSET)
+        self.position = int(self._count[0])
+        self.lost = 0
+        self.ports = {}
+
+    @property
+    def closed(self):
+        """True once the publisher has shut the ring down."""
+        return bool(struct.unpack_from("<I", self._shm.buf, CLOSED_OFFSET)[0])
+
+    def read(self):
+        """Returns the new FEED_DTYPE records (possibly none)."""
+        # The writer may be filling the WRITE_CHUNK slots past the count, which hold the oldest records
+        window = self.capacity - WRITE_CHUNK
+        end = int(self._count[0])
+        if end - self.position > window:
+            self.lost += end - self.position - window
+            self.position = end - window
+        if end == self.position:
+            return np.empty(0, dtype=FEED_DTYPE)
+        slots = np.arange(self.position, end) % self.capacity
+        rows = self._records[slots] # Fancy indexing copies, handling the wrap-around
+        # The writer may have lapped us while copying: anything it could have started reusing
+        # since (including a chunk it has not published yet) is suspect and discarded
+        overwritten = int(self._count[0]) + WRITE_CHUNK - self.capacity - self.position
+        if overwritten > 0:
+            self.lost += min(overwritten, len(rows))
+            rows = rows[overwritten:]
+        self.position = end
+        return rows
+
+    def port_name(self, port_id):
+        if port_id not in self.ports:
+            count = struct.unpack_from("<I", self._shm.buf, 16)[0]
+            if port_id >= count:
+                return str(port_id)
+            offset = RING_HEADER.size + port_id * PORT_NAME_SIZE
+            self.ports[port_id] = bytes(self._shm.buf[offset:offset + PORT_NAME_SIZE]).rstrip(b"\0").decode()
+        return self.ports[port_id]
+
+    def close(self):
+        del self._count, self._records
+        self._shm.close()
+
+
+# --- Sockets ---
+class _Subscriber:
+    """One connected socket subscriber and the bytes still to be sent to it."""
+
+    def __init__(self, sock, name):
+        self.sock = sock
+        self.name = name
+        self.out = bytearray()
+        self.missed = 0 # Rows dropped since the last FRAME_GAP was queued
+        self.missed_total = 0
+        self.behind_since = None # When its buffer first filled up, while it stays full
+
+
+class BearingPublisher:
+    """Publishes every processed batch to other local processes.
+
+    Subscribe publish() to a Pipeline. It runs on the ingest thread, after
+    the GUI's own subscriber, and only copies rows into the shared-memory
+    ring (if ring_name) and onto a queue for the socket thread (if address
+    and anyone is connected), so it adds next to nothing to the GUI path.
+
+    Each socket subscriber gets up to max_buffer bytes of backlog. Past that
+    it is a slow consumer: its rows are dropped (and a FRAME_GAP tells it how
+    many) while everyone else carries on, and after max_lag seconds without
+    catching up it is disconnected. Rows waiting for the socket thread are
+    capped at max_pending; past that the oldest go, reported the same way.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, ring_name=DEFAULT_RING, ring_capacity=1 << 16,
+                 max_buffer=1 << 20, max_lag=5.0, max_pending=1 << 16):
+        self.address = address
+        self.ring_name = ring_name
+        self.ring_capacity = ring_capacity
+        self.max_buffer = max_buffer
+        self.max_lag = max_lag
+        self.max_pending = max_pending
+        self.ring = None
+        self.published = 0
+        self.disconnected_slow = 0 # Subscribers dropped for falling behind
+        self._port_ids = {}
+        self._subscribers = {} # socket -> _Subscriber, owned by the I/O thread
+        self._listening = 0 # Number of socket subscribers, read without the lock by publish()
+        self._pending = deque() # (frame type, payload, rows) for the I/O thread
+        self._pending_rows = 0
+        self._pending_dropped = 0 # Rows dropped from _pending, not yet reported to subscribers
+        self._lock = threading.Lock()
+        self._ring_lock = threading.Lock()
+        self._listener = None
+        self._selector = None
+        self._wake_r = self._wake_w = None
+        self._thread = None
+        self.running = False
+
+    def start(self):
+        """Creates the ring and the listening socket.
+
+        Raises OSError if either is unavailable, including when another
+        publisher is still running on them (only leftovers of a dead one are
+        replaced).
+        """
+        family, sockaddr = parse_address(self.address) if self.address else (None, None)
+        if family == socket.AF_UNIX:
+            _remove_stale_socket(sockaddr) # Before the ring, so a refusal leaves nothing to undo
+        if self.ring_name:
+            self.ring = SharedRing(self.ring_name, self.ring_capacity)
+        if not self.address:
+            return
+        self._listener = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            if family == socket.AF_INET:
+                self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._listener.bind(sockaddr)
+            self._listener.listen()
+        except OSError:
+            self._listener.close()
+            self._listener = None
+            if self.ring is not None:
+                self.ring.close()
+                self.ring = None
+            raise
+        self._listener.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._selector.register(self._listener, selectors.EVENT_READ, "accept")
+        self._selector.register(self._wake_r, selectors.EVENT_READ, "wake")
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="BearingFeed", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.running = False
+        self._wake()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._ring_lock:
+            if self.ring is not None:
+                self.ring.close()
+                self.ring = None
+
+    def subscriber_count(self):
+        return self._listening
+
+    def stats(self):
+        """Counters for a status line: subscribers, rows published, slow-consumer drops."""
+        return {
+            "published": self.published,
+            "subscribers": self._listening,
+            "slow_disconnects": self.disconnected_slow,
+            "missed_rows": sum(s.missed_total for s in list(self._subscribers.values())),
+        }
+
+    def publish(self, batch, port=""):
+        """Pipeline subscriber: BEARING_DTYPE batch from port."""
+        started = metrics.start()
+        port_id = self._port_ids.get(port)
+        if port_id is None:
+            port_id = self._port_ids[port] = len(self._port_ids)
+            if self.ring is not None:
+                self.ring.set_port_name(port_id, port)
+            if self._listener is not None:
+                self._queue(FRAME_PORT, (port_id, port), 0)
+        rows = np.zeros(len(batch), dtype=FEED_DTYPE)
+        for field in ("t", "offset", "bearing", "ambiguous", "elevation"):
+            rows[field] = batch[field]
+        rows["port"] = port_id
+        with self._ring_lock: # close() may run on another thread
+            if self.ring is not None:
+                self.ring.write(rows)
+        if self._listening:
+            self._queue(FRAME_BEARINGS, rows, len(rows))
+        self.published += len(rows)
+        metrics.stop("publish", started, len(rows))
+
+    def _queue(self, frame_type, payload, rows):
+        with self._lock:
+            was_empty = not self._pending
+            self._pending.append((frame_type, payload, rows))
+            self._pending_rows += rows
+            if self._pending_rows > self.max_pending:
+                self._trim_pending()
+        if was_empty:
+            self._wake()
+
+    def _trim_pending(self):
+        """Drops the oldest queued bearings (keeping port names) until under max_pending. Holds _lock."""
+        kept = []
+        while self._pending_rows > self.max_pending and len(self._pending) > 1:
+            entry = self._pending.popleft()
+            if entry[0] != FRAME_BEARINGS:
+                kept.append(entry)
+                continue
+            self._pending_rows -= entry[2]
+            self._pending_dropped += entry[2]
+            metrics.drop("publish", entry[2])
+        self._pending.extendleft(reversed(kept))
+
+    def _wake(self):
+        if self._wake_w is not None:
+            try:
+                self._wake_w.send(b"\0")
+            except OSError:
+                pass # Buffer full: a wake-up is already pending
+
+    # --- I/O thread ---
+    def _run(self):
+        try:
+            while self.running:
+                for key, events in self._selector.select():
+                    if key.data == "accept":
+                        self._accept()
+                    elif key.data == "wake":
+                        self._send_pending()
+                    elif events & selectors.EVENT_READ:
+                        self._check_closed(key.data)
+                    elif key.data.sock in self._subscribers:
+                        self._flush(key.data)
+        finally:
+            for subscriber in list(self._subscribers.values()):
+                self._drop(subscriber)
+            self._selector.close()
+            self._listener.close()
+            family, sockaddr = parse_address(self.address)
+            if family == socket.AF_UNIX and os.path.exists(sockaddr):
+                os.unlink(sockaddr)
+            self._wake_r.close()
+            self._wake_w.close()
+            self._wake_w = None
+
+    def _accept(self):
+        try:
+            sock, peer = self._listener.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        subscriber = _Subscriber(sock, str(peer) or "local")
+        for port, port_id in list(self._port_ids.items()):
+            subscriber.out += _port_frame(port_id, port)
+        self._subscribers[sock] = subscriber
+        self._listening = len(self._subscribers)
+        self._selector.register(sock, selectors.EVENT_READ, subscriber)
+        self._flush(subscriber)
+        print(f"Bearing feed subscriber connected ({self._listening} now).")
+
+    def _send_pending(self):
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        with self._lock:
+            pending, self._pending = self._pending, deque()
+            dropped, self._pending_rows, self._pending_dropped = self._pending_dropped, 0, 0
+        if dropped:
+            for subscriber in list(self._subscribers.values()):
+                subscriber.missed += dropped
+                subscriber.missed_total += dropped
+        for frame_type, payload, rows in pending:
+            if frame_type == FRAME_PORT:
+                data = _port_frame(*payload)
+            else:
+                data = b"".join(_frame(FRAME_BEARINGS, payload[i:i + FRAME_ROWS].tobytes())
+                                for i in range(0, len(payload), FRAME_ROWS))
+            # Encoded once, then shared by every subscriber
+            for subscriber in list(self._subscribers.values()):
+                self._deliver(subscriber, data, rows)
+        for subscriber in list(self._subscribers.values()):
+            self._flush(subscriber)
+
+    def _deliver(self, subscriber, data, rows):
+        if rows and subscriber.out and len(subscriber.out) + len(data) > self.max_buffer:
+            # Slow consumer: skip its rows rather than hold up the others or grow without limit
+            now = time.monotonic()
+            if subscriber.behind_since is None:
+                subscriber.behind_since = now
+                print(f"Bearing feed subscriber {subscriber.name} is falling behind; dropping its rows.")
+            elif now - subscriber.behind_since > self.max_lag:
+                self.disconnected_slow += 1
+                print(f"Disconnecting bearing feed subscriber {subscriber.name}: "
+                      f"more than {self.max_lag:.0f} s behind.")
+                self._drop(subscriber)
+                return
+            subscriber.missed += rows
+            subscriber.missed_total += rows
+            metrics.drop("publish", rows)
+            return
+        subscriber.behind_since = None
+        if subscriber.missed:
+            subscriber.out += _frame(FRAME_GAP, struct.pack("<I", min(subscriber.missed, 0xFFFFFFFF)))
+            subscriber.missed = 0
+        subscriber.out += data
+
+    def _flush(self, subscriber):
+        if subscriber.out:
+            try:
+                sent = subscriber.sock.send(subscriber.out)
+            except BlockingIOError:
+                sent = 0
+            except OSError:
+                self._drop(subscriber)
+                return
+            del subscriber.out[:sent]
+        if not subscriber.out and subscriber.missed:
+            # Caught up: tell it what it missed now rather than with the next batch
+            subscriber.out += _frame(FRAME_GAP, struct.pack("<I", min(subscriber.missed, 0xFFFFFFFF)))
+            subscriber.missed = 0
+            subscriber.behind_since = None
+        # Only wait for writability while something is left over
+        events = selectors.EVENT_WRITE if subscriber.out else selectors.EVENT_READ
+        self._selector.modify(subscriber.sock, events, subscriber)
+
+    def _check_closed(self, subscriber):
+        """Subscribers never send anything, so readable means they hung up."""
+        try:
+            data = subscriber.sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._drop(subscriber)
+            print(f"Bearing feed subscriber disconnected ({self._listening} left).")
+
+    def _drop(self, subscriber):
+        if self._subscribers.pop(subscriber.sock, None) is None:
+            return
+        self._listening = len(self._subscribers)
+        self._selector.unregister(subscriber.sock)
+        subscriber.sock.close()
+
+
+class FeedSubscriber:
+    """Client side of the socket feed: read() returns the FEED_DTYPE batches received so far.
+
+    ports maps port ids to names and missed counts the rows the publisher
+    dropped because this subscriber fell behind.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=5.0):
+        family, sockaddr = parse_address(address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(sockaddr)
+        self._decoder = FrameDecoder("binary", FEED_DTYPES)
+        self.ports = {}
+        self.missed = 0
+        self.closed = False
+
+    def read(self, timeout=None):
+        """Waits up to timeout seconds (None: until data arrives) and returns a list of FEED_DTYPE batches."""
+        self.sock.settimeout(timeout)
+        try:
+            data = self.sock.recv(1 << 16)
+        except socket.timeout:
+            return []
+        if not data:
+            self.closed = True
+            return []
+        records = self._decoder.feed(data)
+        for payload in records.get(FRAME_PORT, []):
+            port_id, = struct.unpack_from("<I", payload)
+            self.ports[port_id] = bytes(payload[4:]).decode()
+        for payload in records.get(FRAME_GAP, []):
+            self.missed += int(payload[0])
+        return records.get(FRAME_BEARINGS, [])
+
+    def close(self):
+        self.sock.close()
+
+
+# --- Command line: tail the feed ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the live bearing feed of a running tracker.")
+    parser.add_argument("--socket", nargs="?", const=DEFAULT_ADDRESS,
+                        help=f"Read the socket feed (default address: {DEFAULT_ADDRESS}).")
+    parser.add_argument("--ring", nargs="?", const=DEFAULT_RING,
+                        help=f"Read the shared-memory ring instead (default name: {DEFAULT_RING}).")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between summaries.")
+    args = parser.parse_args(argv)
+
+    waiting = False
+    while True:
+        try:
+            source = RingReader(args.ring) if args.ring else FeedSubscriber(args.socket or DEFAULT_ADDRESS)
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            if not waiting:
+                print("Waiting for the tracker to publish (Tools -> Publish Bearing Feed, or --publish)...")
+                waiting = True
+            try:
+                time.sleep(0.5)
+            except KeyboardInterrupt:
+                return 1
+    if args.ring:
+        name_of = source.port_name
+    else:
+        name_of = lambda port_id: source.ports.get(port_id, str(port_id))
+    count, latest = 0, None
+    last_print = time.monotonic()
+    try:
+        while not source.closed:
+            if args.ring:
+                batches = [source.read()]
+                time.sleep(0.01)
+            else:
+                batches = source.read(args.interval)
+            for rows in batches:
+                if len(rows):
+                    count += len(rows)
+                    latest = rows[-1]
+            if time.monotonic() - last_print >= args.interval:
+                last_print = time.monotonic()
+                missed = source.lost if args.ring else source.missed
+                if latest is not None:
+                    print(f"{count} bearings, latest {np.degrees(latest['bearing']):.2f}° from "
+                          f"{name_of(int(latest['port']))}, {time.time() - latest['t']:.3f} s old, missed {missed}")
+        print("Feed closed by the tracker.")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        source.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
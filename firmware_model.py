@@ -0,0 +1,105 @@
+# firmware_model.py (bit-exact model of the sketch's energy gate and computeOffset())
+import math
+import numpy as np
+from tdoa import SAMPLE_RATE, MIC_SPACING, SPEED_SOUND, BUFFER_LEN, ENERGY_THRESHOLD, SAMPLE_SHIFT
+
+# airloc.ino starts computeOffset() from this score, so a frame whose every score is lower reports 0
+INITIAL_SCORE = -1e12
+MAX_SHIFT_LIMIT = 64 # Size of the sketch's corrScores buffer, which caps maxShift
+SCORE_SCALE = 32767.0 # STREAM_SCORES scales the largest |score| of a chirp to this
+
+# The ESP32 does float math in IEEE single precision and double math in IEEE double (soft float).
+# Each function below keeps the sketch's types and summation order, so results match the device
+# bit for bit: products of two floats are rounded to float32, then accumulated in double one term
+# at a time (np.cumsum is strictly sequential, unlike np.sum's pairwise summation).
+
+
+def firmware_max_shift(mic_spacing=MIC_SPACING, speed_of_sound=SPEED_SOUND, sample_rate=SAMPLE_RATE):
+    """calcMaxShift(): the double division is stored in a float, then multiplied in float."""
+    max_delay = np.float32(mic_spacing / speed_of_sound)
+    return int(math.ceil(np.float32(max_delay * np.float32(sample_rate))))
+
+
+def split_frames(raw_frames):
+    """(n_frames, buffer_len) interleaved int32 -> float32 left/right, as `(float)(rawBuffer[i] >> 11)`."""
+    scaled = (np.asarray(raw_frames, dtype=np.int32) >> SAMPLE_SHIFT).astype(np.float32)
+    return scaled[:, 0::2], scaled[:, 1::2]
+
+
+def frame_energy(left):
+    """Mean left-channel energy per frame, summed like the sketch's `energy` loop."""
+    squares = (left * left).astype(np.float64)
+    return np.cumsum(squares, axis=1)[:, -1] / left.shape[1]
+
+
+def correlation_scores(left, right, max_shift):
+    """computeOffset()'s score for every shift in [-max_shift, max_shift], shape (n_frames, 2 * max_shift + 1)."""
+    frames, n = left.shape
+    scores = np.zeros((frames, 2 * max_shift + 1))
+    if not frames:
+        return scores
+    for k, shift in enumerate(range(-max_shift, max_shift + 1)):
+        # i runs over the samples of a whose partner j = i + shift is inside b
+        first, last = max(0, -shift), min(n, n - shift)
+        if last <= first:
+            continue
+        products = (left[:, first:last] * right[:, first + shift:last + shift]).astype(np.float64)
+        scores[:, k] = np.cumsum(products, axis=1)[:, -1]
+    return scores
+
+
+def best_offsets(scores, max_shift, scores_max_shift=None):
+    """computeOffset()'s result from correlation_scores(): the first shift with a strictly higher score.
+
+    scores may cover a wider range (scores_max_shift) than max_shift, so one
+    set of scores serves several settings in a sweep.
+    """
+    centre = max_shift if scores_max_shift is None else scores_max_shift
+    window = scores[:, centre - max_shift:centre + max_shift + 1]
+    best = np.argmax(window, axis=1) # First maximum, as `score > bestScore` keeps the earliest
+    offsets = best - max_shift
+    offsets[window[np.arange(len(window)), best] <= INITIAL_SCORE] = 0
+    return offsets
+
+
+def quantize_scores(scores):
+    """The STREAM_SCORES payload for each row of correlation_scores(): `(int16_t)lround(score * 32767.0 / peak)`."""
+    peak = np.abs(scores).max(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scaled = scores * SCORE_SCALE / peak
+    # lround() rounds halves away from zero; the fraction is exact, so this matches it for every double
+    whole = np.trunc(scaled)
+    rounded = whole + np.sign(scaled) * (np.abs(scaled - whole) >= 0.5)
+    return np.where(peak > 0, rounded, 0).astype(np.int16)
+
+
+class FirmwareModel:
+    """What airloc.ino reports for a stream of I2S frames, for a given set of USER SETTINGS."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, mic_spacing=MIC_SPACING, speed_of_sound=SPEED_SOUND,
+                 buffer_len=BUFFER_LEN, energy_threshold=ENERGY_THRESHOLD):
+        self.sample_rate = sample_rate
+        self.mic_spacing = mic_spacing
+        self.speed_of_sound = speed_of_sound
+        self.buffer_len = int(buffer_len)
+        self.energy_threshold = energy_threshold
+        self.max_shift = min(firmware_max_shift(mic_spacing, speed_of_sound, sample_rate), MAX_SHIFT_LIMIT)
+
+    def frames(self, samples):
+        """Cuts interleaved int32 samples into whole i2s_read() buffers; a trailing partial one is dropped."""
+        samples = np.asarray(samples, dtype=np.int32).ravel()
+        count = len(samples) // self.buffer_len
+        return samples[:count * self.buffer_len].reshape(count, self.buffer_len)
+
+    def process(self, raw_frames):
+        """Returns (detected mask, offsets of the detected frames) for (n_frames, buffer_len) I2S frames."""
+        left, right = split_frames(raw_frames)
+        detected = frame_energy(left) > self.energy_threshold
+        scores = correlation_scores(left[detected], right[detected], self.max_shift)
+        return detected, best_offsets(scores, self.max_shift)
+
+    def score_vectors(self, raw_frames):
+        """The FRAME_SCORES payloads (int16, one row per detected frame) a STREAM_SCORES build would send."""
+        left, right = split_frames(raw_frames)
+        detected = frame_energy(left) > self.energy_threshold
+        return quantize_scores(correlation_scores(left[detected], right[detected], self.max_shift))
@@ -0,0 +1,165 @@
+# history.py (fixed-memory bearing history)
+import numpy as np
+
+HISTORY_DTYPE = np.dtype([
+    ("t", "<f8"),          # measurement time (seconds since the epoch)
+    ("primary", "<f4"),    # bearing in radians, [-pi/2, pi/2] for a pair of mics, [-pi, pi) for arrays that resolve it
+    ("ambiguous", "<f4"),  # mirrored bearing in radians, [-pi, pi)
+])
+
+
+class BearingHistory:
+    """Preallocated ring buffer of timestamped bearings.
+
+    The default capacity (2**21 rows, 32 MB) holds more than 13 hours at the
+    firmware's highest chirp rate. Once full, the oldest rows are overwritten.
+    Rows are assumed to arrive in time order.
+    """
+
+    DEFAULT_CAPACITY = 1 << 21
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = int(capacity)
+        self._rows = np.zeros(self.capacity, dtype=HISTORY_DTYPE)
+        self._head = 0 # Next row to write
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self._head = 0
+        self.count = 0
+
+    def append(self, t, primary, ambiguous):
+        """Appends a batch of bearings; t may be one time for the batch or one per bearing."""
+        primary = np.atleast_1d(primary)
+        n = len(primary)
+        if n == 0:
+            return
+        t = np.broadcast_to(np.asarray(t, dtype=np.float64), (n,))
+        ambiguous = np.broadcast_to(ambiguous, (n,))
+        if n > self.capacity: # Only the newest rows would survive anyway
+            t, primary, ambiguous = t[-self.capacity:], primary[-self.capacity:], ambiguous[-self.capacity:]
+            n = self.capacity
+
+        first = min(n, self.capacity - self._head)
+        for dest, src in ((slice(self._head, self._head + first), slice(0, first)),
+                          (slice(0, n - first), slice(first, n))):
+            self._rows["t"][dest] = t[src]
+            self._rows["primary"][dest] = primary[src]
+            self._rows["ambiguous"][dest] = ambiguous[src]
+        self._head = (self._head + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+
+    def segments(self):
+        """Returns the stored rows as up to two views, oldest first (no copying)."""
+        if self.count < self.capacity:
+            return [self._rows[:self.count]] if self.count else []
+        return [self._rows[self._head:], self._rows[:self._head]]
+
+    def latest_time(self):
+        """Time of the newest row, or None when empty."""
+        if not self.count:
+            return None
+        return float(self._rows["t"][self._head - 1])
+
+    def latest(self, n):
+        """Copies the newest n rows, oldest first."""
+        n = min(n, self.count)
+        index = (self._head - n + np.arange(n)) % self.capacity
+        return self._rows[index]
+
+    def decimate(self, t0, t1, bins, field="primary"):
+        """Min/max envelope of field over [t0, t1) in equal time bins.
+
+        Returns (bin_centers, mins, maxs) for the non-empty bins only. Rows are
+        reduced in place with reduceat, so the cost is one pass over the window
+        and the output never exceeds bins points whatever the history length.
+        """
+        edges = np.linspace(t0, t1, bins + 1)
+        mins = np.full(bins, np.inf, dtype=np.float32)
+        maxs = np.full(bins, -np.inf, dtype=np.float32)
+
+        for segment in self.segments():
+            bounds = np.searchsorted(segment["t"], edges)
+            nonempty = bounds[1:] > bounds[:-1]
+            if not nonempty.any():
+                continue
+            values = segment[field][bounds[0]:bounds[-1]]
+            # Empty bins have zero width, so each non-empty bin runs to the next one's start
+            starts = bounds[:-1][nonempty] - bounds[0]
+            mins[nonempty] = np.minimum(mins[nonempty], np.minimum.reduceat(values, starts))
+            maxs[nonempty] = np.maximum(maxs[nonempty], np.maximum.reduceat(values, starts))
+
+        filled = np.isfinite(mins)
+        centers = 0.5 * (edges[:-1] + edges[1:])
+        return centers[filled], mins[filled], maxs[filled]
+
+
+class BearingDensity:
+    """Exponentially decaying histogram of bearings around the full circle.
+
+    add() decays the bins to the newest time and adds the batch with one
+    bincount, so the work per measurement is constant however long the
+    session runs. A bearing age seconds older than the newest one weighs
+    0.5 ** (age / half_life).
+
+    changed() tells a view whether the peak-normalised density has moved by
+    more than a threshold since mark_shown(), so a cached rendering is only
+    redrawn when the difference would be visible.
+    """
+
+    def __init__(self, bins=180, half_life=5.0):
+        self.bins = int(bins)
+        self.half_life = half_life
+        self.counts = np.zeros(self.bins)
+        self.t = None # Time the counts are decayed to
+        self._shown = np.zeros(self.bins)
+
+    def clear(self):
+        self.counts[:] = 0
+        self.t = None
+        self._shown[:] = 0
+
+    def add(self, t, bearings):
+        """Adds a batch of bearings (radians, any range); t may be one time for the batch or one per bearing."""
+        bearings = np.atleast_1d(np.asarray(bearings, dtype=np.float64))
+        t = np.broadcast_to(np.asarray(t, dtype=np.float64), bearings.shape)
+        valid = np.isfinite(bearings) & np.isfinite(t)
+        if not valid.all():
+            bearings, t = bearings[valid], t[valid]
+        if not len(bearings):
+            return
+        t_end = t.max() if self.t is None else max(t.max(), self.t)
+        if self.t is not None and t_end > self.t:
+            self.counts *= 0.5 ** ((t_end - self.t) / self.half_life)
+        self.t = t_end
+        index = (np.mod(bearings, 2 * np.pi) * (self.bins / (2 * np.pi))).astype(np.intp) % self.bins
+        self.counts += np.bincount(index, 0.5 ** ((t_end - t) / self.half_life), minlength=self.bins)
+
+    def normalised(self):
+        """Bins scaled so the fullest is 1 (all zeros when empty)."""
+        peak = self.counts.max()
+        return self.counts / peak if peak > 0 else np.zeros(self.bins)
+
+    def changed(self, threshold=0.02):
+        return np.abs(self.normalised() - self._shown).max() > threshold
+
+    def mark_shown(self):
+        """Records the density a view is about to draw; returns it."""
+        self._shown = self.normalised()
+        return self._shown
+
+    def bin_edges(self):
+        """Start angle of every bin in radians, clockwise from 0."""
+        return np.arange(self.bins) * (2 * np.pi / self.bins)
+
+
+def envelope_points(x, mins, maxs):
+    """Interleaves a min/max envelope into one zig-zag polyline (x0,min0), (x0,max0), (x1,min1)..."""
+    xs = np.repeat(x, 2)
+    ys = np.empty(len(xs), dtype=np.float64)
+    ys[0::2] = mins
+    ys[1::2] = maxs
+    return xs, ys
@@ -0,0 +1,150 @@
+# instrumentation.py (per-stage timing, counters and gauges for the processing pipeline)
+import json
+import threading
+import time
+import numpy as np
+
+# Log-spaced histogram edges: 4 buckets per octave from 1 us to ~4 s
+HISTOGRAM_EDGES = 1e-6 * 2.0 ** (np.arange(0, 22 * 4 + 1) / 4)
+
+
+class StageStats:
+    """Rolling timing samples and counters for one stage."""
+
+    WINDOW = 2048 # Most recent samples kept for percentiles and the rolling histogram
+    RATE_WINDOW = 5.0 # seconds over which the item rate is averaged (less if the samples kept cover less)
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.items = 0
+        self.drops = 0
+        self.gauge = None # Latest value of a level (e.g. queue depth), if the stage reports one
+        self._durations = np.zeros(self.WINDOW)
+        self._ends = np.zeros(self.WINDOW) # When each sample finished, for the rate
+        self._counts = np.zeros(self.WINDOW)
+        self._created = time.monotonic()
+
+    def record(self, duration, items=1):
+        slot = self.calls % self.WINDOW
+        self._durations[slot] = duration
+        self._ends[slot] = time.monotonic()
+        self._counts[slot] = items
+        self.calls += 1
+        self.items += items
+
+    def snapshot(self):
+        """Summary of the rolling window: percentiles in ms, item rate and counters."""
+        n = min(self.calls, self.WINDOW)
+        durations = self._durations[:n]
+        # Average over the span the kept samples cover: at high call rates the window holds
+        # less than RATE_WINDOW, and a new stage has not existed that long
+        now = time.monotonic()
+        if self.calls >= self.WINDOW:
+            since = self._ends[self.calls % self.WINDOW] # Oldest kept sample; anything earlier is gone
+        else:
+            since = self._created
+        since = max(since, now - self.RATE_WINDOW)
+        recent = self._ends[:n] > since
+        summary = {
+            "calls": self.calls,
+            "items": self.items,
+            "drops": self.drops,
+            "rate_per_s": float(self._counts[:n][recent].sum() / max(now - since, 1e-6)),
+        }
+        if self.gauge is not None:
+            summary["gauge"] = self.gauge
+        if n:
+            p50, p99 = np.percentile(durations, (50, 99)) * 1000
+            summary.update(p50_ms=float(p50), p99_ms=float(p99), max_ms=float(durations.max() * 1000))
+        return summary
+
+    def histogram(self):
+        """Counts of the rolling window's durations over HISTOGRAM_EDGES."""
+        n = min(self.calls, self.WINDOW)
+        counts, _ = np.histogram(np.clip(self._durations[:n], HISTOGRAM_EDGES[0], HISTOGRAM_EDGES[-1]),
+                                 HISTOGRAM_EDGES)
+        return counts
+
+
+class Instrumentation:
+    """Registry of StageStats, switched off by default.
+
+    Hot paths bracket their work like this, which costs one attribute check
+    while disabled:
+
+        started = metrics.start()
+        ...work...
+        metrics.stop("ingest", started, items)
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self.stages.setdefault(name, StageStats(name))
+        return stats
+
+    def start(self):
+        """Returns a start timestamp, or None when disabled."""
+        return time.perf_counter() if self.enabled else None
+
+    def stop(self, name, started, items=1):
+        """Records the time since start() for a stage (no-op if start() returned None)."""
+        if started is not None:
+            self.stage(name).record(time.perf_counter() - started, items)
+
+    def record(self, name, duration, items=1):
+        if self.enabled:
+            self.stage(name).record(duration, items)
+
+    def drop(self, name, count=1):
+        if self.enabled:
+            self.stage(name).drops += count
+
+    def set_gauge(self, name, value):
+        if self.enabled:
+            self.stage(name).gauge = value
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+
+    def snapshot(self):
+        return {name: stats.snapshot() for name, stats in list(self.stages.items())}
+
+    def summary_line(self):
+        """One-line readout for a status bar."""
+        parts = []
+        for name, s in self.snapshot().items():
+            text = f"{name} {s['rate_per_s']:.0f}/s"
+            if "p99_ms" in s:
+                text += f" p99 {s['p99_ms']:.2f}ms"
+            if "gauge" in s:
+                text += f" q={s['gauge']}"
+            if s["drops"]:
+                text += f" drops={s['drops']}"
+            parts.append(text)
+        return " | ".join(parts) if parts else "No pipeline activity yet"
+
+    def dump(self, path):
+        """Writes every stage's summary and rolling histogram to a JSON file."""
+        report = {
+            "time": time.time(),
+            "histogram_edges_s": HISTOGRAM_EDGES.tolist(),
+            "stages": {
+                name: dict(stats.snapshot(), histogram=stats.histogram().tolist())
+                for name, stats in list(self.stages.items())
+            },
+        }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+# Process-wide instance shared by the pipeline and the widgets
+metrics = Instrumentation()
@@ -1,59 +1,69 @@
 from PySide6.QtWidgets import (
-    QMainWindow, QStatusBar, QToolBar, QLabel, QWidget, QHBoxLayout,
-    QSizePolicy, QMessageBox
+    QMainWindow, QStatusBar, QToolBar, QLabel, QWidget, QHBoxLayout, QVBoxLayout,
+    QSizePolicy, QMessageBox, QFileDialog
 )
 from PySide6.QtGui import QAction
-from PySide6.QtCore import QSize, Qt, QThread, Signal, QTimer # Added QThread, Signal, QTimer
-import numpy as np # Import numpy for mathematical functions like arcsin
-import serial # Import pyserial for serial communication
+from PySide6.QtCore import QSize, Qt, QObject, Signal, QTimer
+import time
+import os
+import threading
+import numpy as np
+from pipeline import Pipeline, BatchQueue
+from history import BearingHistory
+from timeseries_widget import TimeSeriesWidget
 from viewer_widget import ViewerWidget
 from controls_panel import ControlsPanel
-
-
-# --- Serial Reader Class ---
-class SerialReader(QThread):
-    data_received = Signal(float)
-    error_occurred = Signal(str)
-
-    def __init__(self, port, baud_rate):
+from instrumentation import metrics
+from position import load_poses, save_poses
+from array_geometry import parse_positions, format_positions, load_geometries, save_geometries
+
+
+# --- Pipeline Bridge ---
+class PipelineBridge(QObject):
+    """Subscribes to a Pipeline and re-emits its callbacks as Qt signals, delivered on the GUI thread.
+
+    Batches wait in a bounded BatchQueue rather than in Qt's event queue, so a
+    stalled GUI coalesces them (or drops the oldest rows) instead of growing
+    memory, and the newest bearing is always the next one shown. Only one
+    drain event is pending at a time; fixes keep just the latest set.
+    """
+    batch_ready = Signal(object, str) # BEARING_DTYPE batch, port
+    status = Signal(str)
+    error = Signal(str)
+    fix_ready = Signal(object) # POSITION_DTYPE fixes
+    _ready = Signal() # Something was queued; drained on the GUI thread
+
+    def __init__(self, pipeline, policy="coalesce"):
         super().__init__()
-        self.port = port
-        self.baud_rate = baud_rate
-        self.running = False
-        self.serial_connection = None
-
-    def run(self):
-        self.running = True
-        try:
-            self.serial_connection = serial.Serial(self.port, self.baud_rate, timeout=1)
-            print(f"Connected to serial port {self.port} at {self.baud_rate} baud.")
-            self.error_occurred.emit(f"Connected to {self.port}") # Confirm connection in status bar
-            while self.running:
-                if self.serial_connection.in_waiting > 0:
-                    line = self.serial_connection.readline().decode('utf-8').strip()
-                    try:
-                        delta_t = float(line)
-                        self.data_received.emit(delta_t)
-                    except ValueError:
-                        print(f"Could not parse '{line}' as float. Skipping.")
-                self.msleep(10)
-        except serial.SerialException as e:
-            self.error_occurred.emit(f"Serial port error: {e}. Check port settings and connection.")
-            print(f"Serial port error: {e}")
-        except Exception as e:
-            self.error_occurred.emit(f"An unexpected error occurred in serial reader: {e}")
-            print(f"An unexpected error occurred: {e}")
-        finally:
-            if self.serial_connection and self.serial_connection.is_open:
-                self.serial_connection.close()
-            print("Serial reader stopped.")
+        self.batches = BatchQueue(self._ready.emit, policy=policy, name="dispatch")
+        self.fixes = BatchQueue(self._ready.emit, policy="latest", name="fixes")
+        self._ready.connect(self._drain, Qt.ConnectionType.QueuedConnection)
+        pipeline.subscribe(self.batches.put)
+        pipeline.on_status(self.status.emit)
+        pipeline.on_error(self.error.emit)
+        pipeline.on_fix(self.fixes.put)
+
+    def _drain(self):
+        for batch, port, queued in self.batches.get_all():
+            metrics.record("dispatch", time.perf_counter() - queued, len(batch))
+            self.batch_ready.emit(batch, port)
+        for fixes, _, _ in self.fixes.get_all():
+            self.fix_ready.emit(fixes)
+
+    def overflow_summary(self):
+        """Queue overflow counters, for the stats readout."""
+        q = self.batches
+        return f"queue coalesced={q.coalesced} dropped={q.dropped_batches} batches/{q.dropped_rows} rows"
 
 
 class MainWindow(QMainWindow):
-    # Fixed parameters for the TDOA calculation (no longer user inputs)
-    DEFAULT_MIC_DISTANCE = 0.0762    # meters (3 inches)
-    DEFAULT_SPEED_OF_SOUND = 1500.0 # m/s (e.g., speed in water)
     BAUD_RATE = 115200 # Match your ESP32's baud rate
+    RECORDINGS_DIR = os.path.abspath("recordings") # Every tracking session is logged here
+    POSES_FILE = os.path.abspath("array_poses.json") # Array poses, kept between runs
+    GEOMETRY_FILE = os.path.abspath("mic_geometry.json") # Mic layouts of multi-mic arrays, kept between runs
+
+    export_finished = Signal(str) # Status message from a background export
+    ports_detected = Signal(list) # [(device, description)] from the background port scan
 
     def __init__(self):
         super().__init__()
@@ -64,10 +74,17 @@ class MainWindow(QMainWindow):
         central_widget = QWidget()
         layout = QHBoxLayout()
 
-        ## ViewerWidget - The canvas for the compass display
+        # Every bearing shown is also kept here for the trail and time-series views
+        self.history = BearingHistory()
+
+        ## ViewerWidget - The canvas for the compass display, bearing-vs-time plot below it
         from viewer_widget import ViewerWidget # Local import to ensure it's available
-        self.viewer = ViewerWidget()
-        layout.addWidget(self.viewer, 2)
+        self.viewer = ViewerWidget(self.history)
+        self.timeseries = TimeSeriesWidget(self.history)
+        display_layout = QVBoxLayout()
+        display_layout.addWidget(self.viewer, 3)
+        display_layout.addWidget(self.timeseries, 1)
+        layout.addLayout(display_layout, 2)
 
         central_widget.setLayout(layout)
         self.setCentralWidget(central_widget)
@@ -77,12 +94,59 @@ class MainWindow(QMainWindow):
         self.controls_panel = ControlsPanel()
         layout.addWidget(self.controls_panel, 1)
 
-        # Initialize SerialReader related attributes
-        self.serial_reader = None
+        # Qt-free processing core; this window is just one of its subscribers
+        self.pipeline = Pipeline()
+        self.bridge = PipelineBridge(self.pipeline)
+        self.bridge.batch_ready.connect(self._handle_bearing_batch)
+        self.bridge.error.connect(self._show_serial_error)
+        self.controls_panel.calibration_changed.connect(self._update_calibration)
+
+        # Array poses for multi-array X/Y fixes
+        self.bridge.fix_ready.connect(self._handle_fixes)
+        self.controls_panel.array_pose_changed.connect(self._set_array_pose)
+        try:
+            for port, pose in load_poses(self.POSES_FILE).items():
+                self.pipeline.set_array_pose(port, *pose)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not read array poses from {self.POSES_FILE}: {e}")
+        self.controls_panel.set_array_poses(self.pipeline.positions.poses)
+
+        # Mic layouts of arrays with more than two mics
+        self.controls_panel.array_geometry_changed.connect(self._set_array_geometry)
+        self.geometries = {}
+        try:
+            for port, positions in load_geometries(self.GEOMETRY_FILE).items():
+                self.pipeline.set_array_geometry(port, positions)
+                self.geometries[port] = positions
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Could not read mic geometry from {self.GEOMETRY_FILE}: {e}")
+        self.controls_panel.set_array_geometries({port: format_positions(p) for port, p in self.geometries.items()})
+
+        # Live bearing feed for other local processes (Tools -> Publish Bearing Feed)
+        self.feed = None
+        self.feed_address = None # Socket address to publish on; None for the default
+
+        # Session recording: the active Recorder and the log that Save Data exports
+        self.recorder = None
+        self.last_recording = None
+
+        # Replay of a recorded session (File -> Load Recorded Data)
+        self.controls_panel.replay_seek_requested.connect(self._seek_replay)
+        self.controls_panel.replay_speed_changed.connect(self._set_replay_speed)
+        self.controls_panel.replay_stop_requested.connect(self._stop_replay)
+
+        # Serial port used for real-time tracking
         self.current_com_port = self.controls_panel.port_input.text() # Get initial port from GUI
 
         # Connect the COM port change signal from ControlsPanel
         self.controls_panel.com_port_changed.connect(self._update_com_port)
+        self.controls_panel.port_add_requested.connect(self._add_port)
+        self.controls_panel.port_remove_requested.connect(self._remove_port)
+
+        # Port enumeration can take a noticeable time (USB drivers on Windows), so it runs off the
+        # GUI thread once the event loop is up instead of delaying the first paint
+        self.ports_detected.connect(self._show_detected_ports)
+        QTimer.singleShot(0, self.detect_serial_ports)
 
         # Toolbar
         toolbar = QToolBar("Main Toolbar")
@@ -91,6 +155,17 @@ class MainWindow(QMainWindow):
 
         # Status bar
         self.setStatusBar(QStatusBar(self))
+        self.export_finished.connect(self.statusBar().showMessage)
+        self.bridge.status.connect(self.statusBar().showMessage)
+        self.bridge.status.connect(self._refresh_ports) # Ports come and go as devices drop out and reconnect
+
+        # Pipeline stats readout (View -> Show Pipeline Stats), refreshed twice a second while shown
+        self.stats_label = QLabel()
+        self.stats_label.setVisible(False)
+        self.statusBar().addPermanentWidget(self.stats_label)
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(500)
+        self.stats_timer.timeout.connect(self._refresh_stats)
 
         # --- Menu Bar Setup ---
         menu_bar = self.menuBar()
@@ -125,13 +200,30 @@ class MainWindow(QMainWindow):
         save_json_action.triggered.connect(self.save_json_action)
         save_menu.addAction(save_json_action)
         load_recorded_data = file_menu.addAction("Load Recorded Data")
+        load_recorded_data.triggered.connect(self._load_recorded_data)
+        self.show_stats_action = QAction("Show Pipeline Stats", self)
+        self.show_stats_action.setCheckable(True)
+        self.show_stats_action.toggled.connect(self._toggle_stats)
+        view_menu.addAction(self.show_stats_action)
+        show_density_action = QAction("Show Bearing Density", self)
+        show_density_action.setCheckable(True)
+        show_density_action.setChecked(self.viewer.show_density)
+        show_density_action.toggled.connect(self.viewer.set_show_density)
+        view_menu.addAction(show_density_action)
+        dump_stats_action = QAction("Dump Pipeline Stats...", self)
+        dump_stats_action.triggered.connect(self._dump_stats)
+        tool_menu.addAction(dump_stats_action)
+        self.publish_feed_action = QAction("Publish Bearing Feed", self)
+        self.publish_feed_action.setCheckable(True)
+        self.publish_feed_action.toggled.connect(self._toggle_feed)
+        tool_menu.addAction(self.publish_feed_action)
         dept_reading = view_menu.addMenu("Show Depth Readings")
         reset_view = view_menu.addMenu("Reset View")
 
 
     def _update_com_port(self, new_port_str):
         """Updates the COM port to be used for serial communication."""
-        if self.serial_reader and self.serial_reader.isRunning():
+        if self.pipeline.is_live():
             QMessageBox.information(self, "Port Change",
                                     "Please stop real-time tracking before changing the COM port. "
                                     "Restart tracking for the new port to take effect.")
@@ -142,94 +234,345 @@ class MainWindow(QMainWindow):
             self.statusBar().showMessage(f"COM Port updated to: {self.current_com_port}")
 
 
+    def detect_serial_ports(self):
+        """Scans for serial ports on a background thread; results arrive through ports_detected."""
+        def scan():
+            try:
+                from serial.tools import list_ports
+                ports = [(port.device, port.description) for port in list_ports.comports()]
+            except Exception as e:
+                print(f"Could not list serial ports: {e}")
+                return
+            self.ports_detected.emit(ports)
+
+        threading.Thread(target=scan, name="PortScan", daemon=True).start()
+
+    def _show_detected_ports(self, ports):
+        """Offers the scanned ports in the controls panel, picking one if the default is not present."""
+        if self.controls_panel.set_detected_ports(ports) and not self.pipeline.is_live():
+            self.current_com_port = self.controls_panel.port_input.text()
+        if ports:
+            self.statusBar().showMessage(f"Serial ports found: {', '.join(device for device, _ in ports)}")
+
     def _start_serial_tracking(self):
-        """Initializes and starts the serial reader thread."""
+        """Starts feeding the selected serial port through the pipeline."""
         if not self.current_com_port:
             QMessageBox.warning(self, "COM Port Missing", "Please enter a COM Port in the Serial Settings.")
             return
 
-        if self.serial_reader is None or not self.serial_reader.isRunning():
-            self.serial_reader = SerialReader(self.current_com_port, self.BAUD_RATE)
-            self.serial_reader.data_received.connect(self._handle_live_delta_t)
-            self.serial_reader.error_occurred.connect(self._show_serial_error)
-            self.serial_reader.start()
+        if not self.pipeline.is_live():
+            self._add_port(self.current_com_port)
+
+    def _add_port(self, port):
+        """Adds a receiver port to real-time tracking, starting tracking (and a recording) if needed."""
+        if port in self.pipeline.ports():
+            return
+        if not self.pipeline.is_live():
+            self._stop_replay()
+            self.pipeline.stop()
+            self._start_recording()
             self.start_tracking_action.setEnabled(False)
             self.stop_tracking_action.setEnabled(True)
-            self.statusBar().showMessage(f"Attempting to connect to {self.current_com_port}...")
+        self.pipeline.add_port(port, self.BAUD_RATE, self.controls_panel.data_format())
+        self._refresh_ports()
+        self.statusBar().showMessage(f"Attempting to connect to {port}...")
+
+    def _remove_port(self, port):
+        """Stops reading one receiver port; tracking stops with the last one."""
+        self.pipeline.remove_port(port)
+        if self.pipeline.ports():
+            self._refresh_ports()
+        else:
+            self._stop_serial_tracking()
+
+    def _refresh_ports(self, *_):
+        states = self.pipeline.port_states()
+        self.controls_panel.set_active_ports(list(states),
+                                             [port for port, state in states.items() if state != "connected"])
 
     def _stop_serial_tracking(self):
-        """Stops the serial reader thread and resets GUI state."""
-        if self.serial_reader: # Check if a thread object exists at all
-            if self.serial_reader.isRunning(): # If it's still running, actively stop it
-                print("Attempting to stop active serial reader thread.") # Added for debugging
-                self.serial_reader.stop() # This method tells the thread to finish
-            else:
-                print("Serial reader thread exists but is not running.") # Added for debugging
-            # In any case (whether it was running or already finished due to an error),
-            # clean up the reference to the thread object.
-            self.serial_reader = None
-        else:
-            print("No serial reader thread instance found.") # Added for debugging
+        """Stops the serial source and resets GUI state."""
+        if self.pipeline.ports():
+            print("Stopping serial source.")
+            self.pipeline.stop()
+        self._stop_recording()
+        self._refresh_ports()
 
         # These lines should ALWAYS execute to reset the GUI state
         self.start_tracking_action.setEnabled(True)
         self.stop_tracking_action.setEnabled(False)
         self.statusBar().showMessage("Real-time tracking stopped.")
 
-    def _handle_live_delta_t(self, delta_t):
-        """Receives live delta_t from serial and triggers angle calculation."""
-        self._calculate_and_display_angle(
-            delta_t,
-            self.DEFAULT_MIC_DISTANCE,
-            self.DEFAULT_SPEED_OF_SOUND
-        )
-        # Status bar already updated by SerialReader on connection,
-        # but can add delta_t update if desired:
-        # self.statusBar().showMessage(f"Live Delta T: {delta_t:.6f}s")
-
-
-    def _calculate_and_display_angle(self, delta_t, mic_distance, speed_of_sound):
-        """Calculates the angle and updates the viewer widget."""
+    def _update_calibration(self, mic_spacing, speed_of_sound, sample_rate):
+        """Rebuilds the bearing table when the array calibration changes."""
         try:
-            if mic_distance == 0:
-                print("Error: Microphone distance cannot be zero for angle calculation.")
-                self.statusBar().showMessage("Error: Mic distance is zero!")
-                return
-
-            arg = (delta_t * speed_of_sound) / mic_distance
-            
-            # Clamp the argument to ensure it's within valid range for arcsin
-            if arg > 1.0:
-                arg = 1.0
-            elif arg < -1.0:
-                arg = -1.0
-
-            angle_rad = np.arcsin(arg)
-            angle_deg = np.degrees(angle_rad)
+            rebuilt = self.pipeline.configure(mic_spacing, speed_of_sound, sample_rate)
+        except ValueError as e:
+            self.statusBar().showMessage(f"Calibration error: {e}")
+            return
+        if rebuilt:
+            self.statusBar().showMessage(
+                f"Calibration applied: {mic_spacing:.4f} m spacing, {speed_of_sound:.0f} m/s, "
+                f"{sample_rate:.0f} Hz (max shift {self.pipeline.bearing_table.max_shift} samples)"
+            )
+
+    def _handle_bearing_batch(self, batch, port):
+        """Records a batch of bearings from the pipeline and shows the latest one."""
+        if len(batch) == 0:
+            return
+        started = metrics.start()
+        finite = np.isfinite(batch["bearing"]) # A vertical line array gives no bearing
+        if finite.all():
+            self.history.append(batch["t"], batch["bearing"], batch["ambiguous"])
+        elif finite.any():
+            self.history.append(batch["t"][finite], batch["bearing"][finite], batch["ambiguous"][finite])
+        latest = batch[-1]
+        self.viewer.set_angle(float(latest["bearing"]), float(latest["ambiguous"]), float(latest["elevation"]),
+                              bool(latest["resolved"]))
+        self.viewer.add_bearings(batch["t"], batch["bearing"], batch["ambiguous"])
+        if not self.timeseries.full_circle:
+            # Bearings without a mirror can be anywhere around the array
+            self.timeseries.set_full_circle(bool(batch["resolved"].any()))
+        self.timeseries.mark_dirty()
+        if self.pipeline.replay is not None:
+            self._update_replay_position(float(latest["t"]))
+        metrics.stop("gui_update", started, len(batch))
+
+    def _set_array_pose(self, port, x, y, heading):
+        """Places an array for position fixes and saves the poses for next time."""
+        try:
+            self.pipeline.set_array_pose(port, x, y, heading)
+        except ValueError as e:
+            self.statusBar().showMessage(f"Array pose error: {e}")
+            return
+        try:
+            save_poses(self.POSES_FILE, self.pipeline.positions.poses)
+        except OSError as e:
+            print(f"Could not save array poses: {e}")
+        self.statusBar().showMessage(f"{port} placed at ({x:g}, {y:g}) m facing {heading:g}°")
 
-            print(f"Calculated Angle: {angle_deg:.2f}° (Live)")
-            self.viewer.set_angle(angle_rad)
+    def _set_array_geometry(self, port, text):
+        """Sets (or with blank text, clears) the mic layout of a multi-mic array and saves it for next time."""
+        try:
+            if text:
+                positions = parse_positions(text)
+                self.pipeline.set_array_geometry(port, positions)
+                self.geometries[port] = positions
+            else:
+                self.pipeline.remove_array_geometry(port)
+                self.geometries.pop(port, None)
+        except ValueError as e:
+            self.statusBar().showMessage(f"Mic geometry error: {e}")
+            return
+        try:
+            save_geometries(self.GEOMETRY_FILE, self.geometries)
+        except OSError as e:
+            print(f"Could not save mic geometry: {e}")
+        if text:
+            geometry = self.pipeline.geometries[port]
+            resolved = {1: "front/back ambiguous", 2: "bearing, elevation up to sign", 3: "bearing and elevation"}[geometry.rank]
+            self.statusBar().showMessage(f"{port}: {len(positions)} mics, {geometry.pair_count} pairs ({resolved})")
+        else:
+            self.statusBar().showMessage(f"{port}: stock two-mic pair")
 
-        except Exception as e:
-            print(f"An error occurred during angle calculation: {e}")
-            self.statusBar().showMessage(f"Calculation error: {e}")
+    def _handle_fixes(self, fixes):
+        """Shows the newest position fix in the Coordinates box."""
+        latest = fixes[-1]
+        self.controls_panel.update_coordinate(float(latest["x"]), float(latest["y"]), None,
+                                              float(latest["sigma"]), int(latest["arrays"]))
 
     def _show_serial_error(self, message):
-        QMessageBox.critical(self, "Serial Error", message)
-        # No need to update status bar again, message box is primary notification
-        self._stop_serial_tracking() # Attempt to stop tracking on error
+        """Reports a pipeline error in the status bar; a dialog would stall every view behind it."""
+        print(message)
+        self.statusBar().showMessage(message, 10000)
+        # The failed port is already dropped; tracking only stops once no port is left
+        if self.pipeline.ports():
+            self._refresh_ports()
+        else:
+            self._stop_serial_tracking()
 
     def closeEvent(self, event):
-        """Ensure serial reader thread is stopped when the main window closes."""
+        """Ensure the serial source or replay is stopped when the main window closes."""
         self._stop_serial_tracking()
+        self._stop_replay()
+        self._stop_feed()
+        self.pipeline.shutdown()
         super().closeEvent(event)
 
-    # --- Existing placeholder methods ---
-    def save_action(self, checked):
-        print("Save Data clicked:", checked)
+    # --- Replay ---
+    def _load_recorded_data(self, checked=False):
+        """Opens a session log and starts replaying it into the viewer."""
+        if self.pipeline.is_live():
+            QMessageBox.information(self, "Load Recorded Data", "Please stop real-time tracking before replaying a session.")
+            return
+        from recorder import LOG_EXTENSION # Local import, keeps the log code off the startup path
+        path, _ = QFileDialog.getOpenFileName(self, "Load Recorded Data", self.RECORDINGS_DIR,
+                                              f"Session Logs (*{LOG_EXTENSION})")
+        if path:
+            self.start_replay(path)
+
+    def start_replay(self, path):
+        """Replays the session log at path at the speed selected in the controls panel."""
+        from replay import RecordedSession # Local import
+        try:
+            session = RecordedSession(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Load Recorded Data", f"Could not open {path}: {e}")
+            return
+        if not len(session):
+            session.close()
+            QMessageBox.information(self, "Load Recorded Data", f"{path} contains no measurements.")
+            return
+
+        self.history.clear() # The history ring must stay in time order
+        self.viewer.clear_density()
+        self.timeseries.set_full_circle(False) # Until the session shows a multi-mic bearing
+        self.pipeline.start_replay(session, self.controls_panel.replay_speed())
+        self.controls_panel.set_replay_active(True)
+        self.statusBar().showMessage(
+            f"Replaying {os.path.basename(path)}: {session.rows} measurements, "
+            f"{session.end_time - session.start_time:.1f} s"
+        )
+
+    def _stop_replay(self):
+        if self.pipeline.replay is None:
+            return
+        self.pipeline.stop()
+        self.controls_panel.set_replay_active(False)
+
+    def _seek_replay(self, fraction):
+        """Seeks the running replay to a fraction (0..1) of the session's duration."""
+        if self.pipeline.replay is None:
+            return
+        session = self.pipeline.replay.session
+        self.history.clear()
+        self.viewer.clear_density()
+        self.pipeline.seek_replay(session.start_time + fraction * (session.end_time - session.start_time))
+
+    def _set_replay_speed(self, speed):
+        if self.pipeline.replay is not None:
+            self.pipeline.replay.set_speed(speed)
+
+    def _update_replay_position(self, t):
+        session = self.pipeline.replay.session
+        duration = session.end_time - session.start_time
+        self.controls_panel.set_replay_position((t - session.start_time) / duration if duration > 0 else 1.0)
+
+    # --- Pipeline Stats ---
+    def _toggle_stats(self, shown):
+        """Turns instrumentation on with the readout; off again costs the pipeline nothing."""
+        metrics.enabled = shown
+        self.stats_label.setVisible(shown)
+        if shown:
+            metrics.reset()
+            self._refresh_stats()
+            self.stats_timer.start()
+        else:
+            self.stats_timer.stop()
+
+    def _refresh_stats(self):
+        self.stats_label.setText(f"{metrics.summary_line()} | {self.bridge.overflow_summary()}")
+
+    def _dump_stats(self, checked=False):
+        if not metrics.stages:
+            QMessageBox.information(self, "Pipeline Stats",
+                                    "No stats collected yet. Enable View -> Show Pipeline Stats first.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Dump Pipeline Stats", "pipeline_stats.json",
+                                              "JSON Files (*.json)")
+        if path:
+            metrics.dump(path)
+            self.statusBar().showMessage(f"Pipeline stats written to {path}")
+
+    # --- Bearing Feed ---
+    def publish_feed(self, address=None):
+        """Starts the bearing feed on address (default socket address), checking the menu item."""
+        self.feed_address = address or None
+        self.publish_feed_action.setChecked(True)
+
+    def _toggle_feed(self, on):
+        if not on:
+            self._stop_feed()
+            self.statusBar().showMessage("Bearing feed stopped.")
+            return
+        from feed import BearingPublisher, DEFAULT_ADDRESS # Local import
+        feed = BearingPublisher(self.feed_address or DEFAULT_ADDRESS)
+        try:
+            feed.start()
+        except OSError as e:
+            self.statusBar().showMessage(f"Could not publish the bearing feed: {e}", 10000)
+            self.publish_feed_action.setChecked(False)
+            return
+        self.feed = feed
+        self.pipeline.subscribe(feed.publish)
+        self.statusBar().showMessage(f"Publishing bearings on {feed.address} and shared memory '{feed.ring_name}'")
 
+    def _stop_feed(self):
+        if self.feed is None:
+            return
+        self.pipeline.unsubscribe(self.feed.publish)
+        self.feed.close()
+        self.feed = None
+
+    # --- Recording ---
+    def _start_recording(self):
+        """Starts logging the session to a new file in RECORDINGS_DIR."""
+        from recorder import Recorder, LOG_EXTENSION # Local import
+        name = time.strftime("session_%Y%m%d_%H%M%S") + LOG_EXTENSION
+        self.recorder = Recorder(os.path.join(self.RECORDINGS_DIR, name))
+        try:
+            self.recorder.start()
+        except OSError as e:
+            print(f"Could not start recording: {e}")
+            self.recorder = None
+            return
+        self.pipeline.add_recorder(self.recorder)
+
+    def _stop_recording(self):
+        """Flushes and closes the session log so it can be exported."""
+        if self.recorder is None:
+            return
+        self.pipeline.remove_recorder(self.recorder)
+        error = self.recorder.stop()
+        if error is not None:
+            self.statusBar().showMessage(f"Recording stopped early: {error}", 10000)
+        if self.recorder.dropped_batches:
+            print(f"Recorder dropped {self.recorder.dropped_batches} batches (disk too slow).")
+        self.last_recording = self.recorder.path
+        self.recorder = None
+
+    # --- Save Data ---
     def save_action_csv(self, checked):
-        print("Save to CSV File clicked:", checked)
+        from recorder import export_csv # Local import
+        self._export_recording("CSV Files (*.csv)", ".csv", export_csv)
 
     def save_json_action(self, checked):
-        print("Save to JSON File clicked:", checked)
\ No newline at end of file
+        from recorder import export_json # Local import
+        self._export_recording("JSON Files (*.json)", ".json", export_json)
+
+    def _export_recording(self, file_filter, extension, exporter):
+        """Asks for a destination and streams the current (or last) session log there on a background thread."""
+        # A live log is safe to read: the writer only appends whole chunks and readers stop at a partial one
+        source = self.recorder.path if self.recorder else self.last_recording
+        if source is None or not os.path.exists(source):
+            QMessageBox.information(self, "Save Data", "No recorded session yet. Start real-time tracking first.")
+            return
+
+        default_path = os.path.splitext(source)[0] + extension
+        out_path, _ = QFileDialog.getSaveFileName(self, "Save Data", default_path, file_filter)
+        if not out_path:
+            return
+
+        def run_export():
+            try:
+                rows = exporter(source, out_path)
+                self.export_finished.emit(f"Saved {rows} measurements to {out_path}")
+            except (OSError, ValueError) as e:
+                self.export_finished.emit(f"Export failed: {e}")
+
+        threading.Thread(target=run_export, name="Export", daemon=True).start()
+        self.statusBar().showMessage(f"Exporting to {out_path}...")
+
+    # --- Existing placeholder methods ---
+    def save_action(self, checked):
+        print("Save Data clicked:", checked)
@@ -0,0 +1,769 @@
+# pipeline.py (Qt-free processing core: serial ingest -> bearings -> subscribers)
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+import numpy as np
+from serial_protocol import FrameDecoder, FRAME_OFFSETS, FRAME_RAW_AUDIO, FRAME_SCORES, FRAME_PAIR_OFFSETS
+from tdoa import GccPhatEngine, ScoreFusion
+from bearing import BearingTable
+from position import PositionSolver
+from array_geometry import MicArray
+from instrumentation import metrics
+
+# Layout of the batches handed to every subscriber
+BEARING_DTYPE = np.dtype([
+    ("t", "<f8"),          # measurement time (seconds since the epoch)
+    ("offset", "<f8"),     # sample offset between the two microphones (NaN for multi-mic arrays)
+    ("bearing", "<f4"),    # primary bearing in radians
+    ("ambiguous", "<f4"),  # mirrored bearing in radians (equal to bearing when the array resolves it)
+    ("elevation", "<f4"),  # radians above level, NaN unless the array geometry can tell
+    ("resolved", "?"),     # the array told front from back: no mirror (multi-mic arrays only)
+])
+
+
+# --- Serial Ports ---
+class _Port:
+    """State of one open port on the I/O thread."""
+
+    def __init__(self, name, connection, mode, tdoa_engine):
+        self.name = name
+        self.connection = connection
+        self.decoder = FrameDecoder(mode)
+        self.tdoa_engine = tdoa_engine
+        self.fusion = None # ScoreFusion, made when the device first sends score vectors
+        self.polled = False # True if the selector cannot wait on this port's handle
+
+
+class MultiPortSource:
+    """Reads any number of serial ports from one long-lived I/O thread and passes decoded offsets to sink(offsets, t, port).
+
+    Ports whose handle can be waited on (ttys, ptys and socket:// URLs on
+    POSIX) are registered with a selector, so an idle source costs nothing.
+    Ports the selector cannot take (Windows COM ports, loop://) are polled
+    without blocking every POLL_INTERVAL. All reads, decoding, TDOA and score fusion run on
+    the one thread, so sink sees a single stream in arrival order, each batch
+    tagged with its port.
+
+    add_port()/remove_port() may be called from any thread while running; the
+    I/O thread picks the change up through a wake-up socket. With reconnect,
+    a port that fails to open or drops out (USB unplugged) is retried after
+    RECONNECT_DELAY seconds, doubling up to MAX_RECONNECT_DELAY, until it
+    comes back or is removed; progress is reported through on_status.
+    Without reconnect it is dropped and reported through on_error.
+    """
+
+    READ_CHUNK = 4096 # Largest single read() from one port
+    POLL_INTERVAL = 0.005 # seconds between polls of ports the selector cannot wait on
+    RECONNECT_DELAY = 0.5 # seconds before the first retry of a failed port
+    MAX_RECONNECT_DELAY = 10.0
+    fusion_window = 4 # Score vectors fused per lag for devices streaming correlation scores
+
+    def __init__(self, sink, tdoa_engine_factory=None, on_status=None, on_error=None, reconnect=True):
+        self.sink = sink
+        self.tdoa_engine_factory = tdoa_engine_factory
+        self.on_status = on_status or print
+        self.on_error = on_error or print
+        self.reconnect = reconnect
+        self.reconnects = 0 # Ports brought back after a failure
+        self.running = False
+        self._ports = {} # name -> _Port, owned by the I/O thread
+        self._retries = {} # name -> (due, delay, baud rate, mode), owned by the I/O thread
+        self._wanted = {} # name -> (baud rate, mode): the ports asked for and not yet removed (or failed)
+        self._connected = set()
+        self._opened_before = set() # Ports that have been open at least once since they were added, owned by the I/O thread
+        self._commands = deque()
+        self._lock = threading.Lock()
+        self._selector = None
+        self._wake_r = self._wake_w = None
+        self._thread = None
+
+    def start(self):
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="SerialPorts", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Closes every port and waits for the I/O thread to exit."""
+        self.running = False
+        self._wake()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_port(self, port, baud_rate, mode="text"):
+        """Opens port on the I/O thread. mode is "line" (one value at a time, old firmware), "text" or "binary"."""
+        with self._lock:
+            self._wanted[port] = (baud_rate, mode)
+            self._commands.append(("add", port, baud_rate, mode))
+        self._wake()
+
+    def remove_port(self, port):
+        with self._lock:
+            self._wanted.pop(port, None)
+            self._commands.append(("remove", port))
+        self._wake()
+
+    def sync(self, timeout=2.0):
+        """Waits until every add/remove queued so far has been applied by the I/O thread."""
+        if not self.is_alive() or threading.current_thread() is self._thread:
+            return
+        done = threading.Event()
+        with self._lock:
+            self._commands.append(("sync", done))
+        self._wake()
+        done.wait(timeout)
+
+    def rebuild_engines(self):
+        """Replaces every open port's TDOA engine with a fresh one from tdoa_engine_factory (after a recalibration)."""
+        with self._lock:
+            self._commands.append(("engines",))
+        self._wake()
+
+    def ports(self):
+        """Names of the ports added and not since removed (or failed, without reconnect)."""
+        with self._lock:
+            return list(self._wanted)
+
+    def port_states(self):
+        """{port: "connected" or "connecting"} for every wanted port."""
+        with self._lock:
+            return {name: "connected" if name in self._connected else "connecting" for name in self._wanted}
+
+    def _wake(self):
+        if self._wake_w is not None:
+            try:
+                self._wake_w.send(b"\0")
+            except OSError:
+                pass # Buffer full: a wake-up is already pending
+
+    # --- I/O thread ---
+    def _run(self):
+        try:
+            while self.running:
+                polled = [port for port in self._ports.values() if port.polled]
+                timeout = self.POLL_INTERVAL if polled else None
+                if self._retries:
+                    wait = max(0.0, min(due for due, _, _, _ in self._retries.values()) - time.monotonic())
+                    timeout = wait if timeout is None else min(timeout, wait)
+                events = self._selector.select(timeout)
+                arrival = time.time()
+                for key, _ in events:
+                    if key.data is None:
+                        self._apply_commands()
+                    else:
+                        self._read(key.data, arrival)
+                for port in polled:
+                    if port.name in self._ports:
+                        self._read(port, arrival)
+                if self._retries:
+                    self._retry_due()
+        finally:
+            for name in list(self._ports):
+                self._close(name)
+            self._selector.close()
+            self._wake_r.close()
+            self._wake_w.close()
+            self._wake_w = None
+            self._apply_commands() # Release anyone waiting in sync()
+            print("Serial ports stopped.")
+
+    def _apply_commands(self):
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        while True:
+            with self._lock:
+                if not self._commands:
+                    return
+                command = self._commands.popleft()
+            if command[0] == "add":
+                self._retries.pop(command[1], None)
+                self._opened_before.discard(command[1])
+                if self.running:
+                    self._open(*command[1:])
+            elif command[0] == "remove":
+                self._retries.pop(command[1], None)
+                self._opened_before.discard(command[1])
+                self._close(command[1])
+                self.on_status(f"Disconnected from {command[1]}")
+            elif command[0] == "engines":
+                for port in self._ports.values():
+                    port.tdoa_engine = self.tdoa_engine_factory() if self.tdoa_engine_factory else None
+            else:
+                command[1].set()
+
+    def _retry_due(self):
+        now = time.monotonic()
+        for name, (due, delay, baud_rate, mode) in list(self._retries.items()):
+            if due <= now:
+                del self._retries[name]
+                self._open(name, baud_rate, mode, min(delay * 2, self.MAX_RECONNECT_DELAY))
+
+    def _open(self, name, baud_rate, mode, next_delay=None):
+        """Opens a port; next_delay is set when this is a retry and is the backoff if it fails again."""
+        import serial # pyserial is only loaded once a port is opened, keeping it off the startup path
+        if name in self._ports:
+            self._close(name)
+        try:
+            # serial_for_url also accepts loop://, socket:// and rfc2217:// stand-ins for a device
+            connection = serial.serial_for_url(name, baud_rate, timeout=0)
+        except (serial.SerialException, OSError, ValueError) as e:
+            self._lost(name, f"Could not open {name}: {e}", (baud_rate, mode), next_delay)
+            return
+        engine = self.tdoa_engine_factory() if self.tdoa_engine_factory else None
+        port = _Port(name, connection, mode, engine)
+        try:
+            self._selector.register(connection.fileno(), selectors.EVENT_READ, port)
+        except (AttributeError, ValueError, OSError, NotImplementedError):
+            port.polled = True
+        self._ports[name] = port
+        with self._lock:
+            self._connected.add(name)
+        print(f"Connected to serial port {name} at {baud_rate} baud.")
+        if name in self._opened_before:
+            self.reconnects += 1
+            self.on_status(f"Reconnected to {name}")
+        else:
+            # A retry that finally opens a port that was missing at startup is still its first connection
+            self._opened_before.add(name)
+            self.on_status(f"Connected to {name}")
+
+    def _close(self, name):
+        with self._lock:
+            self._connected.discard(name)
+        port = self._ports.pop(name, None)
+        if port is None:
+            return
+        if not port.polled:
+            self._selector.unregister(port.connection.fileno())
+        try:
+            port.connection.close()
+        except Exception:
+            pass # The device may already be gone
+
+    def _lost(self, name, reason, settings, delay=None):
+        """Handles a port that failed to open or stopped reading: retry it later, or give it up."""
+        self._close(name)
+        with self._lock:
+            wanted = name in self._wanted
+            if wanted and not self.reconnect:
+                self._wanted.pop(name)
+        if not wanted:
+            return # Removed meanwhile (e.g. closed on purpose): nothing to report
+        if not self.reconnect:
+            self.on_error(f"Serial port error: {reason}. Check port settings and connection.")
+            return
+        delay = self.RECONNECT_DELAY if delay is None else delay
+        self._retries[name] = (time.monotonic() + delay, delay) + tuple(settings)
+        self.on_status(f"{reason}. Retrying in {delay:.1f} s")
+
+    def _read(self, port, arrival):
+        try:
+            connection = port.connection
+            if port.polled:
+                waiting = connection.in_waiting
+                if not waiting:
+                    return
+                data = connection.read(min(waiting, self.READ_CHUNK))
+            else:
+                # Readiness with no data means the device went away; pyserial raises for that
+                data = connection.read(self.READ_CHUNK)
+        except Exception as e:
+            with self._lock:
+                settings = self._wanted.get(port.name, (None, None))
+            self._lost(port.name, f"Lost {port.name} ({e})", settings)
+            return
+        if not data:
+            return
+
+        started = metrics.start()
+        decoder = port.decoder
+        bad_before = decoder.bad_records
+        records = decoder.feed(data)
+        offsets = records.get(FRAME_OFFSETS, [])
+        metrics.stop("ingest", started, sum(len(o) for o in offsets))
+        metrics.drop("ingest", decoder.bad_records - bad_before)
+
+        raw_frames = records.get(FRAME_RAW_AUDIO)
+        if raw_frames and port.tdoa_engine is not None:
+            started = metrics.start()
+            offsets = offsets + [port.tdoa_engine.process(raw_frames)]
+            metrics.stop("tdoa", started, len(raw_frames))
+        score_vectors = records.get(FRAME_SCORES)
+        if score_vectors:
+            started = metrics.start()
+            if port.fusion is None:
+                port.fusion = ScoreFusion(self.fusion_window)
+            offsets = offsets + [port.fusion.process(score_vectors, arrival)]
+            metrics.stop("fusion", started, len(score_vectors))
+        batches = []
+        if offsets and decoder.mode == "line":
+            batches.extend(offsets) # Old firmware path: one measurement per batch, as it always was
+        elif offsets:
+            batches.append(offsets[0] if len(offsets) == 1 else np.concatenate(offsets))
+        pair_lags = records.get(FRAME_PAIR_OFFSETS)
+        if pair_lags:
+            # Multi-mic arrays send every pair's lag per chirp: one (chirps, pairs) batch
+            width = len(pair_lags[-1])
+            batches.append(np.vstack([lags for lags in pair_lags if len(lags) == width]))
+        for values in batches:
+            if len(values):
+                try:
+                    self.sink(values, arrival, port.name)
+                except Exception as e:
+                    self.on_error(f"An unexpected error occurred processing {port.name}: {e}")
+
+
+# --- Consumer Queue ---
+class BatchQueue:
+    """Bounded hand-off of (batch, port) pairs from the ingest thread to a slower consumer (e.g. the GUI).
+
+    put() never blocks. on_ready() is called only when the queue goes from
+    empty to non-empty, so at most one wake-up is ever pending for the
+    consumer, which then takes everything with get_all(). When max_batches
+    are already queued, policy decides what gives:
+
+    - "coalesce": the batch is appended to the newest queued batch of the same
+      port, keeping every row; past max_rows the oldest rows are dropped.
+    - "drop_oldest": the oldest queued batch is discarded.
+    - "latest": only the newest batch is kept (max_batches is 1).
+
+    Either way the freshest data is always queued. Overflows are counted in
+    coalesced, dropped_batches and dropped_rows.
+    """
+
+    POLICIES = ("coalesce", "drop_oldest", "latest")
+
+    def __init__(self, on_ready, max_batches=32, max_rows=1 << 17, policy="coalesce", name="queue"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown queue policy '{policy}'")
+        self.on_ready = on_ready
+        self.max_batches = 1 if policy == "latest" else max_batches
+        self.max_rows = max_rows
+        self.policy = policy
+        self.name = name # Stage name for instrumentation
+        self.coalesced = 0
+        self.dropped_batches = 0
+        self.dropped_rows = 0
+        self._items = deque() # [batch, port, put time]
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, batch, port=""):
+        with self._lock:
+            was_empty = not self._items
+            if len(self._items) >= self.max_batches:
+                self._overflow(batch, port)
+            else:
+                self._items.append([batch, port, time.perf_counter()])
+                self._rows += len(batch)
+            self._trim()
+            depth = len(self._items)
+        metrics.set_gauge(self.name, depth)
+        if was_empty:
+            self.on_ready()
+
+    def _overflow(self, batch, port):
+        if self.policy == "coalesce":
+            for item in reversed(self._items):
+                if item[1] == port:
+                    item[0] = np.concatenate((item[0], batch))
+                    self._rows += len(batch)
+                    self.coalesced += 1
+                    return
+        # Different port (or not coalescing): make room by discarding the oldest batch
+        dropped = self._items.popleft()
+        self._rows -= len(dropped[0])
+        self.dropped_batches += 1
+        self.dropped_rows += len(dropped[0])
+        metrics.drop(self.name, len(dropped[0]))
+        self._items.append([batch, port, time.perf_counter()])
+        self._rows += len(batch)
+
+    def _trim(self):
+        """Keeps at most max_rows queued rows, dropping the oldest ones."""
+        while self._rows > self.max_rows and self._items:
+            item = self._items[0]
+            excess = min(self._rows - self.max_rows, len(item[0]))
+            if excess == len(item[0]):
+                self._items.popleft()
+                self.dropped_batches += 1
+            else:
+                item[0] = item[0][excess:]
+            self._rows -= excess
+            self.dropped_rows += excess
+            metrics.drop(self.name, excess)
+
+    def get_all(self):
+        """Takes every queued (batch, port, put time) at once."""
+        with self._lock:
+            items, self._items = self._items, deque()
+            self._rows = 0
+        metrics.set_gauge(self.name, 0)
+        return items
+
+
+# --- Pipeline ---
+class Pipeline:
+    """Turns offsets from serial ports or a replayed session into bearing batches for subscribers.
+
+    Subscribers are called as callback(batch, port) on the ingest thread with a
+    BEARING_DTYPE array, so they must return quickly (hand off to a queue or a
+    Qt signal). Status and error messages go to the on_status/on_error lists.
+    Once two or more ports have an array pose, every batch also feeds the
+    position solver and on_fix listeners get callback(fixes) (POSITION_DTYPE).
+
+    Ports with more than two microphones send every pair's lag per chirp;
+    those batches are solved with the port's MicArray (set_array_geometry(),
+    or the port None one as a default) instead of the bearing table.
+    """
+
+    def __init__(self, bearing_table=None, reconnect=True):
+        self.bearing_table = bearing_table or BearingTable()
+        self.reconnect = reconnect # Retry ports that fail or drop out, rather than giving them up
+        self.positions = PositionSolver()
+        self.geometries = {} # port (None: any port) -> MicArray
+        self._geometry_warned = set()
+        self.source = None # Active MultiPortSource
+        self.replay = None # Active ReplaySource
+        self._replay_thread = None
+        self._subscribers = []
+        self._recorders = {}
+        self._status_listeners = []
+        self._error_listeners = []
+        self._fix_listeners = []
+        self._lock = threading.Lock() # Keeps a recalibration or pose change from racing a lookup
+
+    # --- Subscribers ---
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def on_status(self, callback):
+        self._status_listeners.append(callback)
+
+    def on_error(self, callback):
+        self._error_listeners.append(callback)
+
+    def on_fix(self, callback):
+        self._fix_listeners.append(callback)
+
+    def add_recorder(self, recorder):
+        """Logs every processed batch to recorder (a started Recorder)."""
+        def record(batch, port):
+            recorder.submit(batch["t"], batch["offset"], batch["bearing"], port, batch["elevation"])
+        self._recorders[recorder] = record
+        self.subscribe(record)
+
+    def remove_recorder(self, recorder):
+        self.unsubscribe(self._recorders.pop(recorder, None))
+
+    def _status(self, message):
+        for callback in self._status_listeners:
+            callback(message)
+
+    def _error(self, message):
+        for callback in self._error_listeners:
+            callback(message)
+
+    # --- Processing ---
+    def configure(self, mic_spacing, speed_of_sound, sample_rate):
+        """Recalibrates the bearing table. Returns False if nothing changed."""
+        with self._lock:
+            changed = self.bearing_table.configure(mic_spacing, speed_of_sound, sample_rate)
+            for geometry in self.geometries.values():
+                changed = geometry.configure(speed_of_sound, sample_rate) or changed
+        if changed and self.source is not None:
+            # Ports already open made their GCC-PHAT engine with the old max_shift
+            self.source.rebuild_engines()
+        return changed
+
+    def set_array_geometry(self, port, positions):
+        """Mic positions [(x, y, z)] in metres for a multi-mic array on port (None: every port without its own)."""
+        geometry = MicArray(positions, self.bearing_table.speed_of_sound, self.bearing_table.sample_rate)
+        with self._lock:
+            self.geometries[port] = geometry
+            self._geometry_warned.discard(port)
+
+    def remove_array_geometry(self, port):
+        with self._lock:
+            self.geometries.pop(port, None)
+
+    def set_array_pose(self, port, x, y, heading_deg):
+        """Places the array on port (metres, degrees clockwise from +Y) for position fixes."""
+        with self._lock:
+            self.positions.set_pose(port, x, y, heading_deg)
+
+    def remove_array_pose(self, port):
+        with self._lock:
+            self.positions.remove_pose(port)
+
+    def process(self, offsets, t, port="", bearings=None, elevations=None):
+        """Converts a batch of offsets to bearings and hands it to every subscriber.
+
+        offsets is 1-D for a two-mic array, or (chirps, pairs) lags for a
+        multi-mic one. bearings and elevations (from a recording) stand in for
+        rows whose offset is NaN, which is how multi-mic measurements are logged.
+        """
+        offsets = np.asarray(offsets, dtype=np.float64)
+        pair_lags = offsets if offsets.ndim == 2 else None
+        offsets = np.atleast_1d(offsets) if pair_lags is None else np.full(len(offsets), np.nan)
+        batch = np.empty(len(offsets), dtype=BEARING_DTYPE)
+        batch["t"] = t
+        batch["offset"] = offsets
+        batch["elevation"] = np.nan
+        batch["resolved"] = False
+        started = metrics.start()
+        with self._lock:
+            if pair_lags is not None:
+                geometry = self.geometries.get(port) or self.geometries.get(None)
+                if geometry is None or geometry.pair_count != pair_lags.shape[1]:
+                    if port not in self._geometry_warned:
+                        self._geometry_warned.add(port)
+                        self._error(f"{port} sends lags for {pair_lags.shape[1]} mic pairs, but no matching "
+                                    f"mic geometry is set for it.")
+                    return batch[:0]
+                batch["bearing"], batch["ambiguous"], batch["elevation"] = geometry.solve(pair_lags)
+                # Planar and 3-D layouts have no mirror; a vertical line gives no bearing at all (NaN)
+                batch["resolved"] = (geometry.rank >= 2) & np.isfinite(batch["bearing"])
+            else:
+                recorded = np.isnan(offsets)
+                if recorded.any():
+                    batch["bearing"], batch["ambiguous"] = self.bearing_table.lookup(np.where(recorded, 0.0, offsets))
+                    known = np.asarray(bearings)[recorded] if bearings is not None else np.nan
+                    batch["bearing"][recorded] = batch["ambiguous"][recorded] = known
+                    batch["resolved"][recorded] = np.isfinite(batch["bearing"][recorded]) # Logged without a mirror
+                    if elevations is not None:
+                        batch["elevation"][recorded] = np.asarray(elevations)[recorded]
+                else:
+                    batch["bearing"], batch["ambiguous"] = self.bearing_table.lookup(offsets)
+            metrics.stop("bearing", started, len(batch))
+            fixes = None
+            if len(self.positions.poses) >= 2:
+                started = metrics.start()
+                fixes = self.positions.update(port, batch["t"], batch["bearing"], batch["ambiguous"])
+                metrics.stop("position", started, len(fixes))
+        for callback in self._subscribers:
+            callback(batch, port)
+        if fixes is not None and len(fixes):
+            for callback in self._fix_listeners:
+                callback(fixes)
+        return batch
+
+    # --- Sources ---
+    def start_serial(self, port, baud_rate, mode="text"):
+        """Starts reading a serial port into the pipeline, replacing whatever was running."""
+        self.stop()
+        self.add_port(port, baud_rate, mode)
+
+    def add_port(self, port, baud_rate, mode="text"):
+        """Adds a port to the live ingest; ports already running carry on. Stops a replay first.
+
+        The I/O thread is started on first use and kept for the life of the
+        pipeline; stopping tracking only removes its ports.
+        """
+        if self.replay is not None:
+            self.stop()
+        if self.source is None:
+            self.source = MultiPortSource(
+                self.process, lambda: GccPhatEngine(self.bearing_table.max_shift),
+                on_status=self._status, on_error=self._error, reconnect=self.reconnect,
+            )
+            self.source.start()
+        self.source.add_port(port, baud_rate, mode)
+
+    def remove_port(self, port):
+        if self.source is not None:
+            self.source.remove_port(port)
+
+    def ports(self):
+        """Serial ports currently feeding the pipeline (including ones waiting to reconnect)."""
+        return self.source.ports() if self.source is not None else []
+
+    def port_states(self):
+        return self.source.port_states() if self.source is not None else {}
+
+    def start_replay(self, session, speed=1.0):
+        """Starts playing a RecordedSession into the pipeline."""
+        from replay import ReplaySource
+        self.stop()
+        self.replay = ReplaySource(session, speed)
+        self._start_replay_thread()
+
+    def _start_replay_thread(self):
+        ports = self.replay.session.ports
+
+        def emit(columns):
+            port_ids = columns["port"]
+            if port_ids[0] == port_ids[-1] and (port_ids == port_ids[0]).all():
+                self.process(columns["offset"], columns["t"], ports.get(int(port_ids[0]), ""), columns["bearing"],
+                             columns["elevation"])
+                return
+            # One batch per run of consecutive rows from the same port, so time order is kept
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(port_ids)) + 1, [len(port_ids)]))
+            for start, end in zip(starts[:-1], starts[1:]):
+                self.process(columns["offset"][start:end], columns["t"][start:end],
+                             ports.get(int(port_ids[start]), ""), columns["bearing"][start:end],
+                             columns["elevation"][start:end])
+
+        def run():
+            try:
+                self.replay.run(emit)
+            except Exception as e:
+                self._error(f"Replay error: {e}")
+            print("Replay stopped.")
+
+        self._replay_thread = threading.Thread(target=run, name="Replay", daemon=True)
+        self._replay_thread.start()
+
+    def seek_replay(self, t):
+        """Seeks the replay to session time t, resuming playback if it had reached the end."""
+        if self.replay is None:
+            return
+        playing = self.replay.seek(t)
+        with self._lock:
+            self.positions.reset() # Bearings cached before the jump must not pair with ones after it
+        if not playing:
+            # Playback had reached the end; its thread is exiting (or gone), so play again from t
+            self._replay_thread.join()
+            self._start_replay_thread()
+
+    def is_live(self):
+        """True while at least one serial port is feeding the pipeline."""
+        return self.source is not None and self.source.is_alive() and bool(self.source.ports())
+
+    def stop(self):
+        """Stops reading every serial port, or the replay. No batches arrive once this returns."""
+        if self.source is not None:
+            for port in self.source.ports():
+                self.source.remove_port(port)
+            self.source.sync()
+        if self.replay is not None:
+            self.replay.stop()
+            if self._replay_thread is not threading.current_thread():
+                self._replay_thread.join()
+            self.replay.session.close()
+            self.replay = None
+            self._replay_thread = None
+        with self._lock:
+            self.positions.reset()
+
+    def shutdown(self):
+        """Stops everything and ends the I/O thread (on exit)."""
+        self.stop()
+        if self.source is not None:
+            self.source.stop()
+            self.source = None
+
+
+# --- Headless entry point ---
+def run_headless(ports, baud_rate=115200, mode="text", out=None, duration=None, bearing_table=None,
+                 print_interval=1.0, stats_path=None, poses=None, reconnect=True, publish=None, mics=None):
+    """Tracks one or more serial ports without any GUI, optionally logging to out. Returns a process exit code.
+
+    Runs until duration elapses or, without reconnect, every port has failed;
+    any port error makes the exit code 1. With reconnect, dropped ports are
+    retried until they come back. publish is a socket address (or "" for the
+    default) to serve the bearing feed on, along with its shared-memory ring.
+    mics ([(x, y, z)]) is the mic layout of ports sending multi-mic pair lags. With stats_path, per-stage instrumentation is enabled and
+    dumped there on exit. poses ({port: (x, y, heading_deg)}) enables position fixes.
+    """
+    ports = [ports] if isinstance(ports, str) else list(ports)
+    metrics.enabled = stats_path is not None
+    pipeline = Pipeline(bearing_table, reconnect=reconnect)
+    for port, pose in (poses or {}).items():
+        pipeline.set_array_pose(port, *pose)
+    if mics:
+        pipeline.set_array_geometry(None, mics)
+    stats = {"count": 0, "latest": None, "errors": 0, "fix": None}
+    failed = threading.Event() # Wakes the report loop early to check whether any port is left
+
+    def on_batch(batch, port):
+        stats["count"] += len(batch)
+        stats["latest"] = batch[-1]
+
+    def on_fix(fixes):
+        stats["fix"] = fixes[-1]
+
+    def on_error(message):
+        print(message)
+        stats["errors"] += 1
+        failed.set()
+
+    pipeline.subscribe(on_batch)
+    pipeline.on_status(print)
+    pipeline.on_error(on_error)
+    pipeline.on_fix(on_fix)
+
+    feed = None
+    if publish is not None:
+        from feed import BearingPublisher, DEFAULT_ADDRESS
+        feed = BearingPublisher(publish or DEFAULT_ADDRESS)
+        try:
+            feed.start()
+        except OSError as e:
+            print(f"Could not publish the bearing feed: {e}")
+            return 1
+        pipeline.subscribe(feed.publish)
+        print(f"Publishing bearings on {feed.address} and shared memory '{feed.ring_name}'")
+
+    recorder = None
+    if out:
+        from recorder import Recorder
+        recorder = Recorder(out)
+        recorder.start()
+        pipeline.add_recorder(recorder)
+        print(f"Recording to {out}")
+
+    for port in ports:
+        pipeline.add_port(port, baud_rate, mode)
+    started = time.monotonic()
+    try:
+        while pipeline.is_live():
+            if duration is not None and time.monotonic() - started >= duration:
+                break
+            failed.wait(print_interval)
+            failed.clear()
+            latest = stats["latest"]
+            if latest is not None:
+                if latest["resolved"]:
+                    elevation = "" if np.isnan(latest["elevation"]) else f", elevation {np.degrees(latest['elevation']):.2f}°"
+                    print(f"{stats['count']} bearings, latest {np.degrees(latest['bearing']):.2f}°{elevation}")
+                else:
+                    print(f"{stats['count']} bearings, latest {np.degrees(latest['bearing']):.2f}° "
+                          f"(mirror {np.degrees(latest['ambiguous']):.2f}°, offset {latest['offset']:.2f})")
+            fix = stats["fix"]
+            if fix is not None:
+                print(f"  fix X {fix['x']:.2f} m, Y {fix['y']:.2f} m ± {fix['sigma']:.2f} m "
+                      f"from {fix['arrays']} arrays")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.shutdown()
+        if feed:
+            feed.close()
+        if recorder:
+            error = recorder.stop()
+            if error is not None:
+                print(f"Recording stopped early: {error}")
+            print(f"Wrote {recorder.rows_written} measurements to {out}")
+        if stats_path:
+            metrics.dump(stats_path)
+            print(metrics.summary_line())
+    return 1 if stats["errors"] else 0
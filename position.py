@@ -0,0 +1,180 @@
+# position.py (bearings from several receiver arrays -> X/Y fix)
+import itertools
+import json
+import os
+import numpy as np
+
+# Layout of the fixes handed to fix listeners
+POSITION_DTYPE = np.dtype([
+    ("t", "<f8"),       # time of the measurement that completed the fix
+    ("x", "<f8"),       # metres along +X (east of the origin)
+    ("y", "<f8"),       # metres along +Y (north of the origin)
+    ("sigma", "<f8"),   # 1-sigma radial (DRMS) uncertainty in metres
+    ("arrays", "<u1"),  # number of arrays that contributed
+])
+
+# Normal-equation terms kept per array and bearing choice: n n^T (3 unique entries), n c and c^2
+_NXX, _NXY, _NYY, _NXC, _NYC, _CC = range(6)
+
+
+def load_poses(path):
+    """Reads {port: (x, y, heading_deg)} from a JSON file; a missing file means no poses."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        data = json.load(f)
+    return {port: (float(p["x"]), float(p["y"]), float(p["heading"])) for port, p in data.items()}
+
+
+def save_poses(path, poses):
+    with open(path, "w") as f:
+        json.dump({port: {"x": x, "y": y, "heading": heading} for port, (x, y, heading) in poses.items()},
+                  f, indent=2)
+
+
+class PositionSolver:
+    """Least-squares X/Y fix from the latest bearing of every array with a known pose.
+
+    An array at p facing heading h (degrees clockwise from +Y) that reports
+    bearing theta puts the source on the line through p at azimuth
+    a = h + theta, or at h + mirror for its mirror bearing (pi - theta for a
+    two-mic array; theta itself for arrays that resolve the direction). That line is
+    n . x = n . p with n = (cos a, -sin a). A fix minimises the squared
+    distance to the lines of every array heard within max_age seconds.
+
+    The normal-equation terms of each array's latest bearing, primary and
+    mirror, are cached, so a batch from one array only builds its own rows.
+    Every primary/mirror combination is then solved at once. The fix is the
+    one that puts the source ahead of each array along its chosen bearing,
+    has the smallest residual, and on a tie uses the fewest mirrors.
+    """
+
+    MAX_ARRAYS = 8 # 2**MAX_ARRAYS mirror combinations are solved per measurement
+    TIE = 1e-6 # m^2 added per mirrored bearing, so exact ties go to the primaries
+
+    def __init__(self, max_age=0.5, bearing_sigma=np.radians(2.0)):
+        self.max_age = max_age # seconds a bearing stays usable for fixes with other arrays
+        self.bearing_sigma = bearing_sigma # radians, for the uncertainty estimate
+        self.poses = {}
+        self._index = {}
+        self._configure()
+
+    def set_pose(self, port, x, y, heading_deg):
+        """Places an array. Its cached bearing is discarded."""
+        if port not in self.poses and len(self.poses) >= self.MAX_ARRAYS:
+            raise ValueError(f"At most {self.MAX_ARRAYS} arrays can be positioned.")
+        self.poses[port] = (float(x), float(y), float(heading_deg))
+        self._configure()
+
+    def remove_pose(self, port):
+        if self.poses.pop(port, None) is not None:
+            self._configure()
+
+    def _configure(self):
+        ports = list(self.poses)
+        n = len(ports)
+        self._index = {port: i for i, port in enumerate(ports)}
+        self._position = np.array([self.poses[p][:2] for p in ports], dtype=np.float64).reshape(n, 2)
+        self._heading = np.radians([self.poses[p][2] for p in ports])
+        self._combos = np.array(list(itertools.product((0, 1), repeat=n)), dtype=np.float64).reshape(2 ** n, n)
+        self._mirrors = self._combos.sum(axis=1)
+        self.reset()
+
+    def reset(self):
+        """Forgets every array's latest bearing (e.g. after a replay seek)."""
+        n = len(self.poses)
+        self._terms = np.zeros((n, 2, 6)) # [array, primary/mirror, term]
+        self._azimuth = np.zeros((n, 2))
+        self._last_t = np.full(n, -np.inf)
+
+    def _rows(self, index, primary, mirror):
+        """Azimuths (M, 2) and normal-equation terms (M, 2, 6) of one array's bearings, primary and mirror."""
+        azimuth = self._heading[index] + np.stack([primary, mirror], axis=1)
+        nx, ny = np.cos(azimuth), -np.sin(azimuth)
+        c = nx * self._position[index, 0] + ny * self._position[index, 1]
+        terms = np.stack([nx * nx, nx * ny, ny * ny, nx * c, ny * c, c * c], axis=-1)
+        return azimuth, terms
+
+    def update(self, port, t, primary, mirror=None):
+        """Feeds one array's bearings (radians) and returns the fixes they complete as POSITION_DTYPE.
+
+        mirror defaults to the two-mic mirror, pi - primary.
+        """
+        index = self._index.get(port)
+        if index is None or len(self.poses) < 2:
+            return np.empty(0, dtype=POSITION_DTYPE)
+        primary = np.atleast_1d(np.asarray(primary, dtype=np.float64))
+        if mirror is None:
+            mirror = np.pi - primary
+        mirror = np.broadcast_to(np.asarray(mirror, dtype=np.float64), primary.shape)
+        t = np.broadcast_to(np.asarray(t, dtype=np.float64), primary.shape)
+        usable = np.isfinite(primary) & np.isfinite(mirror)
+        if not usable.all():
+            primary, mirror, t = primary[usable], mirror[usable], t[usable]
+            if not len(primary):
+                return np.empty(0, dtype=POSITION_DTYPE)
+        azimuth, terms = self._rows(index, primary, mirror)
+
+        # Which cached arrays are recent enough to pair with each measurement
+        others = np.abs(t[:, None] - self._last_t[None, :]) <= self.max_age # (M, N)
+        others[:, index] = False
+        combos = self._combos
+        delta = self._terms[:, 1] - self._terms[:, 0]
+
+        # Summed terms for every (measurement, combination): linear in the mirror choices
+        summed = (others @ self._terms[:, 0] + terms[:, 0])[:, None, :] # (M, 1, 6)
+        summed = summed + np.einsum("mn,cn,nf->mcf", others, combos, delta)
+        summed = summed + combos[None, :, index, None] * (terms[:, 1] - terms[:, 0])[:, None, :]
+
+        a, b, d = summed[..., _NXX], summed[..., _NXY], summed[..., _NYY]
+        e, f = summed[..., _NXC], summed[..., _NYC]
+        det = a * d - b * b
+        # Singular combinations (parallel lines) give inf/nan here and are rejected below
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = (d * e - b * f) / det
+            y = (a * f - b * e) / det
+            residual = summed[..., _CC] - (x * e + y * f)
+
+            # The source has to lie ahead of every contributing array along its chosen bearing
+            azimuths = np.broadcast_to(self._azimuth, (len(t),) + self._azimuth.shape).copy() # (M, N, 2)
+            azimuths[:, index] = azimuth
+            chosen = np.where(combos[None] > 0, azimuths[:, None, :, 1], azimuths[:, None, :, 0]) # (M, C, N)
+            dx = x[..., None] - self._position[:, 0]
+            dy = y[..., None] - self._position[:, 1]
+            along = np.sin(chosen) * dx + np.cos(chosen) * dy
+        contributing = others.copy()
+        contributing[:, index] = True
+        ahead = np.all((along > 0) | ~contributing[:, None, :], axis=2)
+
+        count = contributing.sum(axis=1)
+        scale = np.maximum(a + d, 1e-12) # Conditioning test relative to the geometry
+        usable = ahead & (det > 1e-9 * scale * scale) & (count >= 2)[:, None]
+        score = np.where(usable, residual + self.TIE * self._mirrors, np.inf)
+        best = np.argmin(score, axis=1)
+        rows = np.flatnonzero(np.isfinite(score[np.arange(len(t)), best]))
+
+        # Remember this array's newest bearing for the next batch, from any array
+        self._terms[index] = terms[-1]
+        self._azimuth[index] = azimuth[-1]
+        self._last_t[index] = t[-1]
+
+        fixes = np.empty(len(rows), dtype=POSITION_DTYPE)
+        if not len(rows):
+            return fixes
+        best = best[rows]
+        fixes["t"] = t[rows]
+        fixes["x"] = x[rows, best]
+        fixes["y"] = y[rows, best]
+        fixes["arrays"] = count[rows]
+        fixes["sigma"] = self._sigma(chosen[rows, best], dx[rows, best], dy[rows, best], contributing[rows])
+        return fixes
+
+    def _sigma(self, azimuth, dx, dy, contributing):
+        """DRMS error from the bearing noise: inverse of sum(n n^T / (r sigma)^2) over contributing arrays."""
+        nx, ny = np.cos(azimuth), -np.sin(azimuth)
+        weight = contributing / np.maximum(dx * dx + dy * dy, 1e-12) / self.bearing_sigma ** 2
+        a = (weight * nx * nx).sum(axis=1)
+        b = (weight * nx * ny).sum(axis=1)
+        d = (weight * ny * ny).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.sqrt((a + d) / (a * d - b * b)) # trace of the 2x2 inverse
@@ -0,0 +1,275 @@
+# recorder.py (session log writer and CSV/JSON exports)
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import numpy as np
+from instrumentation import metrics
+
+# --- On-disk format ---
+# A log is FILE_HEADER followed by chunks. Every chunk starts with CHUNK_HEADER:
+#   tag (4 bytes) | count (uint32) | payload size (uint32) | reserved (uint32) | first t (f8) | last t (f8)
+# DATA chunks hold `count` rows stored column by column (see DATA_COLUMNS).
+# PORT chunks name a port id: count is the id, the payload is the UTF-8 name.
+# Payloads are padded to 8 bytes so every column can be memory-mapped in place.
+# AIRLOG01 logs (before multi-mic arrays) lack the elevation column; they still read, with NaN elevation.
+FILE_MAGIC = b"AIRLOG02"
+LEGACY_MAGIC = b"AIRLOG01"
+FILE_HEADER = struct.Struct("<8sd") # magic, session start time
+CHUNK_HEADER = struct.Struct("<4sIIIdd")
+TAG_DATA = b"DATA"
+TAG_PORT = b"PORT"
+DATA_COLUMNS = (
+    ("t", np.dtype("<f8")),        # measurement time (seconds since the epoch)
+    ("offset", np.dtype("<f4")),   # raw sample offset from the firmware / TDOA engine (NaN for multi-mic arrays)
+    ("bearing", np.dtype("<f4")),  # primary bearing in radians
+    ("elevation", np.dtype("<f4")), # radians above level, NaN unless the array geometry can tell
+    ("port", np.dtype("<u2")),     # id of the port the measurement came from (see PORT chunks)
+)
+FILE_COLUMNS = {
+    FILE_MAGIC: DATA_COLUMNS,
+    LEGACY_MAGIC: tuple(column for column in DATA_COLUMNS if column[0] != "elevation"),
+}
+ROW_SIZE = sum(dtype.itemsize for _, dtype in DATA_COLUMNS)
+LOG_EXTENSION = ".airlog"
+
+
+def _padded(size):
+    return (size + 7) & ~7
+
+
+def data_payload_size(rows):
+    return _padded(rows * ROW_SIZE)
+
+
+class Recorder:
+    """Appends measurements to a session log from a background writer thread.
+
+    submit() never blocks: batches go through a bounded queue and are counted
+    in dropped_batches if the disk cannot keep up. The writer packs rows into
+    chunks of chunk_rows, writing a partial chunk after flush_interval seconds
+    of quiet so data reaches disk promptly.
+
+    fsync is "chunk" (after every chunk), "interval" (at most every
+    fsync_interval seconds) or "never" (leave it to the OS).
+    """
+
+    def __init__(self, path, chunk_rows=4096, flush_interval=1.0, fsync="interval",
+                 fsync_interval=5.0, queue_size=256):
+        if fsync not in ("chunk", "interval", "never"):
+            raise ValueError(f"Unknown fsync policy '{fsync}'")
+        self.path = path
+        self.chunk_rows = int(chunk_rows)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.rows_written = 0
+        self.dropped_batches = 0
+        self.error = None # Set if the writer thread hits an I/O error
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._ports = {} # Port name -> id
+        self._columns = {name: np.empty(self.chunk_rows, dtype=dtype) for name, dtype in DATA_COLUMNS}
+        self._pending = 0
+        self._last_fsync = time.monotonic()
+        self._file = None
+        self._thread = None
+
+    def start(self):
+        """Creates the log file and starts the writer thread."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "wb")
+        self._file.write(FILE_HEADER.pack(FILE_MAGIC, time.time()))
+        self._thread = threading.Thread(target=self._run, name="Recorder", daemon=True)
+        self._thread.start()
+
+    def submit(self, t, offsets, bearings, port="", elevations=np.nan):
+        """Queues a batch for writing. Returns False (and counts a drop) if the queue is full or the writer died."""
+        if self.error is not None:
+            self.dropped_batches += 1
+            metrics.drop("recorder")
+            return False
+        try:
+            self._queue.put_nowait((t, offsets, bearings, port, elevations))
+            metrics.set_gauge("recorder", self._queue.qsize())
+            return True
+        except queue.Full:
+            self.dropped_batches += 1
+            metrics.drop("recorder")
+            return False
+
+    def stop(self):
+        """Writes everything still queued, then closes the log. Returns the writer's I/O error, if it hit one."""
+        if self._thread is None:
+            return self.error
+        # A writer that died on an I/O error no longer drains the queue, so never block on it
+        while self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self._thread.join()
+        self._thread = None
+        return self.error
+
+    def _run(self):
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    self._write_chunk() # Quiet period: push out the partial chunk
+                    continue
+                if item is None:
+                    break
+                self._add_batch(*item)
+            self._write_chunk()
+            self._sync(force=True)
+        except OSError as e:
+            self.error = e
+            print(f"Recorder error: {e}")
+        finally:
+            try:
+                self._file.close()
+            except OSError:
+                pass # Flushing the buffer failed too; the first error is already recorded
+
+    def _add_batch(self, t, offsets, bearings, port, elevations):
+        offsets = np.atleast_1d(offsets)
+        n = len(offsets)
+        if port not in self._ports:
+            self._ports[port] = len(self._ports)
+            self._write_port(self._ports[port], port)
+        batch = {
+            "t": np.broadcast_to(t, (n,)),
+            "offset": offsets,
+            "bearing": np.broadcast_to(bearings, (n,)),
+            "elevation": np.broadcast_to(elevations, (n,)),
+            "port": np.broadcast_to(self._ports[port], (n,)),
+        }
+
+        done = 0
+        while done < n:
+            take = min(n - done, self.chunk_rows - self._pending)
+            for name, column in self._columns.items():
+                column[self._pending:self._pending + take] = batch[name][done:done + take]
+            self._pending += take
+            done += take
+            if self._pending == self.chunk_rows:
+                self._write_chunk()
+
+    def _write_port(self, port_id, name):
+        encoded = name.encode("utf-8")
+        size = _padded(len(encoded))
+        self._file.write(CHUNK_HEADER.pack(TAG_PORT, port_id, size, 0, 0.0, 0.0))
+        self._file.write(encoded.ljust(size, b"\0"))
+
+    def _write_chunk(self):
+        n = self._pending
+        if not n:
+            return
+        t = self._columns["t"]
+        size = data_payload_size(n)
+        self._file.write(CHUNK_HEADER.pack(TAG_DATA, n, size, 0, float(t[0]), float(t[n - 1])))
+        for name, _ in DATA_COLUMNS:
+            self._file.write(self._columns[name][:n].tobytes())
+        self._file.write(b"\0" * (size - n * ROW_SIZE))
+        self.rows_written += n
+        self._pending = 0
+        self._sync()
+
+    def _sync(self, force=False):
+        self._file.flush()
+        now = time.monotonic()
+        if self.fsync == "never" and not force:
+            return
+        if force or self.fsync == "chunk" or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+
+# --- Reading and export ---
+def iter_chunks(path):
+    """Yields (ports, columns) for every DATA chunk of a log, one chunk in memory at a time.
+
+    ports is the {id: name} table known so far; columns maps column names to arrays.
+    """
+    ports = {}
+    with open(path, "rb") as f:
+        magic, _ = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic not in FILE_COLUMNS:
+            raise ValueError(f"{path} is not a recorded session log")
+        while True:
+            header = f.read(CHUNK_HEADER.size)
+            if len(header) < CHUNK_HEADER.size:
+                break
+            tag, count, size, _, _, _ = CHUNK_HEADER.unpack(header)
+            payload = f.read(size)
+            if len(payload) < size:
+                break # Truncated tail (e.g. the app was killed mid-write)
+            if tag == TAG_PORT:
+                ports[count] = payload.rstrip(b"\0").decode("utf-8")
+            elif tag == TAG_DATA:
+                yield ports, unpack_columns(payload, count, layout=FILE_COLUMNS[magic])
+
+
+def unpack_columns(buffer, rows, offset=0, layout=DATA_COLUMNS):
+    """Returns zero-copy column arrays for a DATA payload starting at offset in buffer.
+
+    Columns missing from an older layout come back as NaN.
+    """
+    columns = {}
+    for name, dtype in layout:
+        columns[name] = np.frombuffer(buffer, dtype=dtype, count=rows, offset=offset)
+        offset += rows * dtype.itemsize
+    if "elevation" not in columns:
+        columns["elevation"] = np.full(rows, np.nan, dtype="<f4")
+    return columns
+
+
+def _port_names(ports, ids):
+    return [ports.get(int(i), "") for i in ids]
+
+
+def export_csv(log_path, csv_path):
+    """Streams a session log to CSV. Returns the number of rows written."""
+    rows = 0
+    with open(csv_path, "w", newline="") as out:
+        # Offset and elevation are left empty where a row has none (NaN)
+        out.write("timestamp,offset_samples,bearing_deg,elevation_deg,port\n")
+        for ports, columns in iter_chunks(log_path):
+            degrees = np.degrees(columns["bearing"].astype(np.float64))
+            elevations = np.degrees(columns["elevation"].astype(np.float64))
+            names = _port_names(ports, columns["port"])
+            out.writelines(
+                f"{t:.6f},{'' if o != o else f'{o:.4f}'},{b:.3f},{'' if e != e else f'{e:.3f}'},{p}\n"
+                for t, o, b, e, p in zip(columns["t"], columns["offset"], degrees, elevations, names)
+            )
+            rows += len(names)
+    return rows
+
+
+def export_json(log_path, json_path):
+    """Streams a session log to a JSON array of measurement objects. Returns the number of rows written."""
+    rows = 0
+    with open(json_path, "w") as out:
+        out.write("[")
+        for ports, columns in iter_chunks(log_path):
+            degrees = np.degrees(columns["bearing"].astype(np.float64))
+            elevations = np.degrees(columns["elevation"].astype(np.float64))
+            names = _port_names(ports, columns["port"])
+            for t, o, b, e, p in zip(columns["t"], columns["offset"], degrees, elevations, names):
+                out.write(",\n" if rows else "\n")
+                # null where a row has no offset (multi-mic arrays) or no elevation (most arrays)
+                out.write(json.dumps({"timestamp": round(float(t), 6),
+                                      "offset_samples": None if o != o else round(float(o), 4),
+                                      "bearing_deg": round(float(b), 3),
+                                      "elevation_deg": None if e != e else round(float(e), 3), "port": p}))
+                rows += 1
+        out.write("\n]\n")
+    return rows
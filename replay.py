@@ -0,0 +1,173 @@
+# replay.py (memory-mapped playback of recorded session logs)
+import mmap
+import threading
+import time
+import numpy as np
+from recorder import (
+    FILE_HEADER, FILE_COLUMNS, CHUNK_HEADER, TAG_DATA, TAG_PORT, unpack_columns,
+)
+
+
+class RecordedSession:
+    """Read-only, memory-mapped session log with a chunk-level time index.
+
+    Opening only walks the chunk headers; no measurement is read until it is
+    asked for, so even multi-hour logs load near-instantly.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # Zero-length file
+            self._file.close()
+            raise ValueError(f"{path} is empty")
+        magic, self.session_start = FILE_HEADER.unpack_from(self._map, 0)
+        if magic not in FILE_COLUMNS:
+            self.close()
+            raise ValueError(f"{path} is not a recorded session log")
+        self.layout = FILE_COLUMNS[magic]
+        self._build_index()
+
+    def _build_index(self):
+        self.ports = {}
+        offsets, rows, first, last = [], [], [], []
+        pos = FILE_HEADER.size
+        end = len(self._map)
+        while pos + CHUNK_HEADER.size <= end:
+            tag, count, size, _, t_first, t_last = CHUNK_HEADER.unpack_from(self._map, pos)
+            payload = pos + CHUNK_HEADER.size
+            if payload + size > end:
+                break # Truncated tail from an interrupted recording
+            if tag == TAG_DATA:
+                offsets.append(payload)
+                rows.append(count)
+                first.append(t_first)
+                last.append(t_last)
+            elif tag == TAG_PORT:
+                self.ports[count] = self._map[payload:payload + size].rstrip(b"\0").decode("utf-8")
+            pos = payload + size
+
+        self.chunk_offsets = np.array(offsets, dtype=np.int64)
+        self.chunk_rows = np.array(rows, dtype=np.int64)
+        self.chunk_first = np.array(first, dtype=np.float64)
+        self.chunk_last = np.array(last, dtype=np.float64)
+        self.rows = int(self.chunk_rows.sum())
+
+    def __len__(self):
+        return len(self.chunk_offsets)
+
+    @property
+    def start_time(self):
+        return float(self.chunk_first[0]) if len(self) else None
+
+    @property
+    def end_time(self):
+        return float(self.chunk_last[-1]) if len(self) else None
+
+    def columns(self, chunk):
+        """Zero-copy column arrays of one chunk (views into the mapped file)."""
+        return unpack_columns(self._map, int(self.chunk_rows[chunk]), int(self.chunk_offsets[chunk]), self.layout)
+
+    def locate(self, t):
+        """Returns (chunk, row) of the first measurement at or after time t in O(log n)."""
+        chunk = int(np.searchsorted(self.chunk_last, t, side="left"))
+        if chunk >= len(self):
+            return len(self), 0
+        row = int(np.searchsorted(self.columns(chunk)["t"], t, side="left"))
+        return chunk, row
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class ReplaySource:
+    """Plays a RecordedSession back as measurement batches.
+
+    speed is a playback multiplier (1.0 = real time); None or 0 plays as fast
+    as possible for bulk reprocessing. run() calls emit(columns) with dicts
+    of column slices and returns when the session ends or stop() is called.
+    """
+
+    FRAME_INTERVAL = 1 / 60 # Paced playback groups everything due within one display frame
+    BULK_ROWS = 4096 # Rows per batch when playing as fast as possible
+
+    def __init__(self, session, speed=1.0):
+        self.session = session
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._seek_to = None
+        self._reanchor = False
+        self._running = True # Cleared by stop()
+        self._finished = False # run() reached the end of the session
+        self.position = session.start_time # Time of the last emitted measurement
+
+    def seek(self, t):
+        """Jumps playback to time t; safe to call from any thread.
+
+        Returns False if run() had already reached the end of the session: the
+        seek is kept, and the caller must call run() again to play from t.
+        """
+        with self._lock:
+            self._seek_to = t
+            if self._finished:
+                self._finished = False
+                return False
+            return True
+
+    def set_speed(self, speed):
+        with self._lock:
+            self.speed = speed
+            self._reanchor = True # Keep the current spot; only the playback clock restarts
+
+    def stop(self):
+        self._running = False
+
+    def run(self, emit):
+        session = self.session
+        chunk, row = 0, 0
+        anchor = None # (wall clock, session time) pair that paced playback is measured from
+
+        try:
+            while self._running:
+                with self._lock:
+                    if self._seek_to is not None:
+                        chunk, row = session.locate(self._seek_to)
+                        self._seek_to = None
+                        anchor = None
+                        continue
+                    if chunk >= len(session):
+                        self._finished = True # Decided under the lock: a seek() lands before this or restarts run()
+                        break
+                    speed = self.speed
+                    if self._reanchor:
+                        self._reanchor = False
+                        if anchor is not None:
+                            anchor = (time.monotonic(), self.position)
+
+                columns = session.columns(chunk)
+                t = columns["t"]
+                if not speed:
+                    stop = min(row + self.BULK_ROWS, len(t))
+                else:
+                    if anchor is None:
+                        anchor = (time.monotonic(), float(t[row]))
+                    # Session time that should be on screen by the end of this frame
+                    due = anchor[1] + (time.monotonic() - anchor[0] + self.FRAME_INTERVAL) * speed
+                    stop = int(np.searchsorted(t, due, side="right"))
+                    if stop <= row:
+                        wait = (float(t[row]) - anchor[1]) / speed - (time.monotonic() - anchor[0])
+                        time.sleep(min(max(wait, 0.0), self.FRAME_INTERVAL))
+                        continue
+
+                batch = {name: column[row:stop] for name, column in columns.items()}
+                self.position = float(t[stop - 1])
+                emit(batch)
+                row = stop
+                if row >= len(t):
+                    chunk, row = chunk + 1, 0
+        finally:
+            with self._lock:
+                self._finished = True # Also after stop() or an error, so a later seek() plays again
@@ -0,0 +1,167 @@
+# serial_protocol.py (ESP32 wire formats and stream decoder)
+import struct
+import numpy as np
+
+# --- Binary frame layout ---
+# Every binary record sent by the firmware looks like:
+#   SYNC_WORD (2 bytes) | frame type (uint8) | payload length (uint16 LE) | payload | checksum (uint8)
+# The checksum is the 8-bit sum of the type, length and payload bytes, so a
+# resync after line noise only costs the bytes up to the next sync word.
+SYNC_WORD = b"\xA5\x5A"
+HEADER = struct.Struct("<2sBH")
+CHECKSUM_SIZE = 1
+MAX_PAYLOAD = 16384 # Anything larger is treated as a corrupted header
+
+# Frame types and the dtype of their payload
+FRAME_OFFSETS = 0x01 # int16 sample offsets, one per detected chirp
+FRAME_RAW_AUDIO = 0x02 # int32 interleaved L/R I2S samples (rawBuffer), one chirp frame
+FRAME_SCORES = 0x03 # int16 computeOffset() scores for shifts -maxShift..maxShift, peak scaled to 32767, one chirp
+FRAME_PAIR_OFFSETS = 0x04 # int16 sample offset of every mic pair (0,1), (0,2), ..., (N-2,N-1), one chirp (NUM_MICS > 2)
+PAYLOAD_DTYPES = {
+    FRAME_OFFSETS: np.dtype("<i2"),
+    FRAME_RAW_AUDIO: np.dtype("<i4"),
+    FRAME_SCORES: np.dtype("<i2"),
+    FRAME_PAIR_OFFSETS: np.dtype("<i2"),
+}
+
+# Layout of one decoded measurement handed to the GUI in streaming mode
+MEASUREMENT_DTYPE = np.dtype([
+    ("t", "<f8"),       # host arrival time (seconds since the epoch)
+    ("offset", "<f8"),  # sample offset between the two microphones
+])
+
+
+def checksum(data):
+    """Returns the 8-bit additive checksum used by the binary frames."""
+    return sum(data) & 0xFF
+
+
+def encode_frame(frame_type, payload):
+    """Builds one binary frame (used by tools and tests that stand in for the ESP32)."""
+    payload = bytes(payload)
+    header = HEADER.pack(SYNC_WORD, frame_type, len(payload))
+    return header + payload + bytes([checksum(header[2:] + payload)])
+
+
+def make_measurements(offsets, t):
+    """Packs an array of offsets that arrived at time t into a measurement batch."""
+    batch = np.empty(len(offsets), dtype=MEASUREMENT_DTYPE)
+    batch["t"] = t
+    batch["offset"] = offsets
+    return batch
+
+
+class FrameDecoder:
+    """Incremental decoder for the text (one value per line) and binary framed formats.
+
+    "line" mode is the old firmware reader: every line is parsed on its own
+    with float() and comes back as its own one-value array, unbatched.
+    payload_dtypes maps the binary frame types to accept onto their payload
+    dtype (default: the firmware's PAYLOAD_DTYPES); other types are bad records.
+    """
+
+    def __init__(self, mode="text", payload_dtypes=None):
+        if mode not in ("line", "text", "binary"):
+            raise ValueError(f"Unknown decoder mode '{mode}'")
+        self.mode = mode
+        self.payload_dtypes = PAYLOAD_DTYPES if payload_dtypes is None else payload_dtypes
+        self._buffer = bytearray()
+        self.bad_records = 0 # Unparsable lines or frames with a bad checksum
+
+    def feed(self, data):
+        """Appends raw bytes and returns {frame type: [payload arrays]} for every complete record."""
+        self._buffer += data
+        if self.mode == "binary":
+            return self._decode_binary()
+        if self.mode == "line":
+            return self._decode_lines()
+        return self._decode_text()
+
+    def reset(self):
+        """Drops any partially received record."""
+        self._buffer.clear()
+
+    def _decode_lines(self):
+        values = []
+        while True:
+            end = self._buffer.find(b"\n")
+            if end < 0:
+                break
+            line = bytes(self._buffer[:end]).decode("utf-8", errors="replace").strip()
+            del self._buffer[:end + 1]
+            if not line:
+                continue
+            try:
+                values.append(np.array([float(line)]))
+            except ValueError:
+                self.bad_records += 1
+                print(f"Could not parse '{line}' as float. Skipping.")
+        return {FRAME_OFFSETS: values} if values else {}
+
+    def _decode_text(self):
+        end = self._buffer.rfind(b"\n")
+        if end < 0:
+            return {}
+        lines = bytes(self._buffer[:end]).splitlines()
+        del self._buffer[:end + 1]
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            return {}
+
+        try:
+            # Fast path: the whole chunk is numeric, convert it in one go
+            values = np.array(lines).astype(np.float64)
+        except ValueError:
+            # Banner text ("TDOA Measurement Started", ...) mixed in: fall back per line
+            parsed = []
+            for line in lines:
+                try:
+                    parsed.append(float(line))
+                except ValueError:
+                    self.bad_records += 1
+            values = np.array(parsed, dtype=np.float64)
+
+        if len(values) == 0:
+            return {}
+        return {FRAME_OFFSETS: [values]}
+
+    def _decode_binary(self):
+        records = {}
+        buf = self._buffer
+        pos = 0
+        while True:
+            start = buf.find(SYNC_WORD, pos)
+            if start < 0:
+                # Keep a trailing half sync word, drop the rest
+                pos = len(buf) - 1 if buf.endswith(SYNC_WORD[:1]) else len(buf)
+                break
+            if len(buf) - start < HEADER.size:
+                pos = start
+                break
+
+            _, frame_type, length = HEADER.unpack_from(buf, start)
+            if length > MAX_PAYLOAD:
+                self.bad_records += 1
+                pos = start + 1
+                continue
+            end = start + HEADER.size + length
+            if len(buf) < end + CHECKSUM_SIZE:
+                pos = start
+                break
+
+            if checksum(buf[start + 2:end]) != buf[end]:
+                # Corrupted frame, or a false sync inside a payload: resync one byte later
+                self.bad_records += 1
+                pos = start + 1
+                continue
+
+            dtype = self.payload_dtypes.get(frame_type)
+            if dtype is None or length % dtype.itemsize:
+                self.bad_records += 1
+            else:
+                payload = np.frombuffer(bytes(buf[start + HEADER.size:end]), dtype=dtype)
+                records.setdefault(frame_type, []).append(payload)
+            pos = end + CHECKSUM_SIZE
+
+        del buf[:pos]
+        return records
@@ -0,0 +1,199 @@
+# sim_device.py (stand-in ESP32 for development and benchmarks)
+import argparse
+import math
+import os
+import socket
+import threading
+import time
+import numpy as np
+from serial_protocol import encode_frame, FRAME_OFFSETS, FRAME_RAW_AUDIO, FRAME_SCORES, FRAME_PAIR_OFFSETS
+from tdoa import MIC_SPACING, SPEED_SOUND, SAMPLE_RATE, BUFFER_LEN, SAMPLE_SHIFT, calc_max_shift
+
+
+class SimulatedDevice:
+    """Emits the sketch's serial output for synthetic chirps at a chosen rate.
+
+    format is "text" (one integer offset per line, like the stock sketch),
+    "binary" (FRAME_OFFSETS frames), "raw" (FRAME_RAW_AUDIO frames for the
+    host GCC-PHAT engine), "scores" (FRAME_SCORES vectors, computed by the
+    firmware model from the same synthetic frames) or "pairs" (FRAME_PAIR_OFFSETS
+    whole-sample lags of every pair of the mics array, by default a square of
+    four; see array_geometry.py). The simulated source sweeps +/-sweep_deg around
+    ahead with a period of sweep_period seconds. jitter is the standard
+    deviation of the gap between chirps, as a fraction of the mean gap.
+
+    Transport is a pty pair (POSIX; connect to .port) or, with transport="tcp",
+    a localhost socket (connect to .port, a socket:// URL pyserial understands).
+    """
+
+    def __init__(self, rate=20.0, format="text", jitter=0.0, transport="pty", sweep_deg=60.0,
+                 sweep_period=10.0, seed=None, mics=None):
+        if format not in ("text", "binary", "raw", "scores", "pairs"):
+            raise ValueError(f"Unknown output format '{format}'")
+        self.rate = float(rate)
+        self.format = format
+        self.jitter = jitter
+        self.transport = transport
+        self.sweep_deg = sweep_deg
+        self.sweep_period = sweep_period
+        self.sent = 0 # Chirps written so far
+        self.max_shift = calc_max_shift()
+        self._rng = np.random.default_rng(seed)
+        self._running = False
+        self._thread = None
+        self._write = None
+        self._close = []
+        self._firmware = None
+        self.array = None
+        if format == "pairs":
+            from array_geometry import MicArray # Local import, only this format needs it
+            half = MIC_SPACING / 2
+            self.array = MicArray(mics or [(-half, -half), (half, -half), (half, half), (-half, half)])
+
+        if transport == "pty":
+            master, slave = os.openpty()
+            self.port = os.ttyname(slave)
+            self._write = lambda data: os.write(master, data)
+            self._close = [lambda: os.close(master), lambda: os.close(slave)]
+        elif transport == "tcp":
+            self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._server.bind(("127.0.0.1", 0))
+            self._server.listen(1)
+            self.port = f"socket://127.0.0.1:{self._server.getsockname()[1]}"
+            self._close = [self._server.close]
+        else:
+            raise ValueError(f"Unknown transport '{transport}'")
+
+    # --- Synthetic chirps ---
+    def bearing_at(self, t):
+        """True bearing (radians) of the simulated source at time t."""
+        return math.radians(self.sweep_deg) * math.sin(2 * math.pi * t / self.sweep_period)
+
+    def offset_for(self, bearing):
+        """Fractional sample offset a chirp from bearing produces at the mics."""
+        return math.sin(bearing) * MIC_SPACING / SPEED_SOUND * SAMPLE_RATE
+
+    def _raw_frame(self, offset):
+        """Interleaved int32 I2S frame of a noise chirp, right channel delayed by offset samples."""
+        pairs = BUFFER_LEN // 2
+        pad = 2 * self.max_shift + 2
+        chirp = self._rng.normal(scale=2e4, size=pairs + 2 * pad)
+        freqs = np.fft.rfftfreq(len(chirp))
+        delayed = np.fft.irfft(np.fft.rfft(chirp) * np.exp(-2j * np.pi * freqs * offset), len(chirp))
+        frame = np.empty(BUFFER_LEN, dtype="<i4")
+        frame[0::2] = (chirp[pad:pad + pairs] * (1 << SAMPLE_SHIFT)).astype(np.int32)
+        frame[1::2] = (delayed[pad:pad + pairs] * (1 << SAMPLE_SHIFT)).astype(np.int32)
+        return frame
+
+    def encode(self, t):
+        """Serial bytes for one chirp detected at time t."""
+        if self.format == "pairs":
+            bearing = self.bearing_at(t)
+            source = 100.0 * np.array([math.sin(bearing), math.cos(bearing), 0.0]) # Level source 100 m away
+            # Arrival time at each mic, then mic j's delay after mic i as computeOffset(mic i, mic j) reports it
+            arrival = np.linalg.norm(self.array.positions - source, axis=1) / SPEED_SOUND * SAMPLE_RATE
+            pairs = self.array.pairs
+            lags = arrival[pairs[:, 1]] - arrival[pairs[:, 0]]
+            whole = np.clip(np.round(lags), -self.array.max_shifts, self.array.max_shifts)
+            return encode_frame(FRAME_PAIR_OFFSETS, whole.astype("<i2").tobytes())
+        offset = self.offset_for(self.bearing_at(t))
+        if self.format == "raw":
+            return encode_frame(FRAME_RAW_AUDIO, self._raw_frame(offset).tobytes())
+        if self.format == "scores":
+            if self._firmware is None:
+                from firmware_model import FirmwareModel # Local import, only this format needs it
+                self._firmware = FirmwareModel(energy_threshold=-1.0) # Every synthetic frame is a chirp
+            return encode_frame(FRAME_SCORES, self._firmware.score_vectors(self._raw_frame(offset)[None])[0].tobytes())
+        # The sketch only knows whole-sample lags
+        whole = int(np.clip(round(offset), -self.max_shift, self.max_shift))
+        if self.format == "binary":
+            return encode_frame(FRAME_OFFSETS, np.int16(whole).tobytes())
+        return f"{whole}\r\n".encode()
+
+    # --- Running ---
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="SimulatedDevice", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops emitting chirps; the port stays open so readers can drain it."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """Stops the device and releases the pty or socket."""
+        self.stop()
+        for close in self._close:
+            try:
+                close()
+            except OSError:
+                pass
+
+    def _run(self):
+        if self.transport == "tcp":
+            self._server.settimeout(0.1)
+            while self._running:
+                try:
+                    conn, _ = self._server.accept()
+                    break
+                except socket.timeout:
+                    continue
+            else:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._write = conn.sendall
+            self._close.append(conn.close)
+
+        self._write(b"TDOA Measurement Started\r\n" if self.format == "text" else b"")
+        gap = 1.0 / self.rate
+        next_due = time.monotonic()
+        while self._running:
+            now = time.monotonic()
+            if now < next_due:
+                time.sleep(min(next_due - now, 0.05))
+                continue
+            # Everything already due goes out in one write, so high rates are not capped by sleep granularity
+            out = bytearray()
+            while next_due <= now:
+                out += self.encode(time.time())
+                self.sent += 1
+                next_due += max(gap * (1 + self.jitter * self._rng.standard_normal()), 0.0)
+            try:
+                self._write(bytes(out))
+            except OSError:
+                break
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated ESP32 TDOA receiver.")
+    parser.add_argument("--rate", type=float, default=20.0, help="Chirps per second (default: 20).")
+    parser.add_argument("--format", choices=("text", "binary", "raw", "scores", "pairs"), default="text")
+    parser.add_argument("--mics", help="Mic positions for --format pairs, \"x,y[,z]; ...\" in metres "
+                                       "(default: a square of four).")
+    parser.add_argument("--sweep", type=float, default=60.0,
+                        help="Degrees the source sweeps either side of ahead (default: 60; past 90 goes behind).")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Std. dev. of the chirp gap, fraction of the mean.")
+    parser.add_argument("--transport", choices=("pty", "tcp"), default="pty")
+    args = parser.parse_args()
+
+    mics = None
+    if args.mics:
+        from array_geometry import parse_positions # Local import, only --mics needs it
+        mics = parse_positions(args.mics)
+    device = SimulatedDevice(args.rate, args.format, args.jitter, args.transport, sweep_deg=args.sweep, mics=mics)
+    device.start()
+    print(f"Simulated ESP32 on {device.port} ({args.format}, {args.rate:g} chirps/s). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        device.close()
+        print(f"Sent {device.sent} chirps.")
+
+if __name__ == "__main__":
+    main()
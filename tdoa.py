@@ -0,0 +1,166 @@
+# tdoa.py (host-side time-difference-of-arrival engine)
+import math
+import numpy as np
+
+# --- Mirrors of the USER SETTINGS in airloc.ino ---
+SAMPLE_RATE = 44100          # Hz
+MIC_SPACING = 0.05727827     # meters between microphones
+SPEED_SOUND = 343.0          # m/s
+BUFFER_LEN = 1024            # interleaved int32 samples per I2S read
+ENERGY_THRESHOLD = 1e7       # mean left-channel energy that counts as a chirp
+SAMPLE_SHIFT = 11            # rawBuffer >> 11, as done by the sketch before correlating
+
+
+def calc_max_shift(mic_spacing=MIC_SPACING, speed_of_sound=SPEED_SOUND, sample_rate=SAMPLE_RATE):
+    """Largest physically possible lag in samples (same as calcMaxShift() in the sketch)."""
+    return int(math.ceil(mic_spacing / speed_of_sound * sample_rate))
+
+
+def split_channels(raw_frames):
+    """Splits (n_frames, BUFFER_LEN) interleaved int32 I2S frames into scaled left/right float arrays."""
+    scaled = (np.asarray(raw_frames, dtype=np.int32) >> SAMPLE_SHIFT).astype(np.float64)
+    return scaled[:, 0::2], scaled[:, 1::2]
+
+
+def energy_gate(left, threshold=ENERGY_THRESHOLD):
+    """Boolean mask of the frames whose mean left-channel energy passes the sketch's chirp gate."""
+    energy = np.einsum("ij,ij->i", left, left) / left.shape[1]
+    return energy > threshold
+
+
+def parabolic_peak(window):
+    """Fractional index of the maximum of each row, from a parabola through the peak and its two neighbours."""
+    peak = np.argmax(window, axis=1)
+    rows = np.arange(len(window))
+    inner = (peak > 0) & (peak < window.shape[1] - 1)
+    lo = window[rows, np.maximum(peak - 1, 0)]
+    mid = window[rows, peak]
+    hi = window[rows, np.minimum(peak + 1, window.shape[1] - 1)]
+
+    denom = lo - 2 * mid + hi
+    safe = inner & (np.abs(denom) > 1e-12)
+    delta = np.zeros(len(window))
+    delta[safe] = 0.5 * (lo[safe] - hi[safe]) / denom[safe]
+    return peak + delta
+
+
+class GccPhatEngine:
+    """Batched GCC-PHAT lag estimator with sub-sample peak interpolation.
+
+    Lags follow the sign convention of computeOffset() in the sketch: a positive
+    lag means the right microphone hears the chirp after the left one.
+    """
+
+    def __init__(self, max_shift=None, energy_threshold=ENERGY_THRESHOLD, upsample=4):
+        self.max_shift = calc_max_shift() if max_shift is None else int(max_shift)
+        self.energy_threshold = energy_threshold
+        self.upsample = max(1, int(upsample)) # Correlation is evaluated on a grid 1/upsample samples apart
+        self.frames_seen = 0
+        self.frames_gated = 0 # Frames skipped because they were below the energy threshold
+
+    def process(self, frames):
+        """Estimates one lag per chirp frame.
+
+        frames is a list of 1-D interleaved int32 frames (as decoded from the
+        serial stream) or a 2-D (n_frames, samples) array. Returns an array of
+        fractional lags in samples, one per frame that passed the energy gate.
+        """
+        if isinstance(frames, np.ndarray):
+            groups = [frames.reshape(-1, frames.shape[-1])]
+        else:
+            # Frames of different lengths cannot share one FFT batch
+            by_length = {}
+            for frame in frames:
+                by_length.setdefault(len(frame), []).append(frame)
+            groups = [np.vstack(group) for group in by_length.values()]
+
+        lags = [self._process_batch(batch) for batch in groups if len(batch)]
+        if not lags:
+            return np.empty(0, dtype=np.float64)
+        return lags[0] if len(lags) == 1 else np.concatenate(lags)
+
+    def _process_batch(self, raw_frames):
+        left, right = split_channels(raw_frames)
+        self.frames_seen += len(left)
+
+        if self.energy_threshold is not None:
+            active = energy_gate(left, self.energy_threshold)
+            self.frames_gated += int(len(active) - np.count_nonzero(active))
+            if not active.any():
+                return np.empty(0, dtype=np.float64)
+            left, right = left[active], right[active]
+
+        return self.lags(left, right)
+
+    def lags(self, left, right):
+        """GCC-PHAT lag (in samples) for each row of the (n_frames, n) left/right arrays."""
+        n = left.shape[1]
+        nfft = 1 << int(2 * n - 1).bit_length() # No circular wrap for any lag
+        spec = np.conj(np.fft.rfft(left, nfft, axis=1)) * np.fft.rfft(right, nfft, axis=1)
+        spec /= np.maximum(np.abs(spec), 1e-12) # PHAT weighting: keep phase only
+
+        # Zero-padding the spectrum upsamples the correlation by self.upsample
+        up = self.upsample
+        cc = np.fft.irfft(spec, nfft * up, axis=1)
+        max_lag = min(self.max_shift, n - 1) * up
+        window = np.concatenate((cc[:, -max_lag:], cc[:, :max_lag + 1]), axis=1) if max_lag else cc[:, :1]
+
+        return (parabolic_peak(window) - max_lag) / up
+
+
+class ScoreFusion:
+    """Turns the sketch's correlation score vectors (STREAM_SCORES) into fractional lags, fused across chirps.
+
+    Each vector holds computeOffset()'s score for every shift from -maxShift
+    to maxShift, scaled so its largest magnitude is 32767. Every vector is
+    normalised to a unit peak and summed with the ones before it that are
+    at most window chirps and max_age seconds older, so one noisy frame
+    cannot outvote its neighbours. The lag is the parabolic peak of the sum.
+    A ring of the last window - 1 vectors carries the sum across batches.
+    """
+
+    def __init__(self, window=4, max_age=0.25):
+        self.window = max(1, int(window))
+        self.max_age = max_age # seconds; older vectors are left out of the sum
+        self.max_shift = None # Set by the first vector: the firmware decides the range
+        self.vectors_seen = 0
+        self._ring = None # (window - 1, 2 * max_shift + 1) most recent normalised vectors, oldest first
+        self._ring_t = None
+
+    def reset(self, length=None):
+        """Forgets the fused history; length (2 * maxShift + 1) switches the vector size."""
+        if length is not None:
+            self.max_shift = (int(length) - 1) // 2
+        if self.max_shift is None:
+            return
+        self._ring = np.zeros((self.window - 1, 2 * self.max_shift + 1))
+        self._ring_t = np.full(self.window - 1, -np.inf)
+
+    def process(self, vectors, t):
+        """Fused lag (samples) for each score vector (a list of int16 arrays or a 2-D array) received at t."""
+        vectors = [np.asarray(v) for v in vectors] if not isinstance(vectors, np.ndarray) else list(vectors)
+        if not vectors:
+            return np.empty(0, dtype=np.float64)
+        length = len(vectors[-1])
+        if self.max_shift is None or length != 2 * self.max_shift + 1:
+            self.reset(length)
+        vectors = np.vstack([v for v in vectors if len(v) == length]).astype(np.float64)
+        t = np.broadcast_to(np.asarray(t, dtype=np.float64), (len(vectors),))
+        self.vectors_seen += len(vectors)
+
+        # Unit-peak normalisation: every chirp counts the same whatever its loudness
+        peaks = np.abs(vectors).max(axis=1, keepdims=True)
+        vectors /= np.where(peaks > 0, peaks, 1.0)
+
+        history = np.concatenate((self._ring, vectors))
+        times = np.concatenate((self._ring_t, t))
+        if self.window > 1:
+            # (chirps, shifts, window) views onto the history: each chirp with the window - 1 before it
+            windows = np.lib.stride_tricks.sliding_window_view(history, self.window, axis=0)
+            recent = t[:, None] - np.lib.stride_tricks.sliding_window_view(times, self.window) <= self.max_age
+            fused = np.einsum("msw,mw->ms", windows, recent.astype(np.float64))
+            self._ring = history[-(self.window - 1):].copy()
+            self._ring_t = times[-(self.window - 1):].copy()
+        else:
+            fused = vectors
+        return parabolic_peak(fused) - self.max_shift
@@ -0,0 +1,78 @@
+# test_array_geometry.py (MicArray against lags with a known geometry: python -m pytest test_array_geometry.py)
+import numpy as np
+from array_geometry import MicArray, two_mic_positions
+from bearing import BearingTable
+from firmware_model import correlation_scores, best_offsets
+from tdoa import MIC_SPACING, SPEED_SOUND, SAMPLE_RATE
+
+HALF = MIC_SPACING / 2
+SQUARE = [(-HALF, -HALF), (HALF, -HALF), (HALF, HALF), (-HALF, HALF)]
+
+
+def arrival_samples(positions, bearing_deg, elevation_deg=0.0, distance=100.0):
+    """Arrival time (samples) of a chirp at each mic, from a source at bearing/elevation, distance metres away."""
+    b, e = np.radians(bearing_deg), np.radians(elevation_deg)
+    source = distance * np.array([np.sin(b) * np.cos(e), np.cos(b) * np.cos(e), np.sin(e)])
+    return np.linalg.norm(np.asarray(positions, dtype=float) - source, axis=1) / SPEED_SOUND * SAMPLE_RATE
+
+
+def pair_lags(array, arrival):
+    """Mic j's delay after mic i for every pair, as computeOffset(mic i, mic j) reports it."""
+    return arrival[array.pairs[:, 1]] - arrival[array.pairs[:, 0]]
+
+
+def angle_error(a, b):
+    return np.abs(np.angle(np.exp(1j * np.radians(np.asarray(a) - np.asarray(b)))))
+
+
+def test_square_resolves_every_bearing():
+    array = MicArray(SQUARE)
+    for bearing in (0, 45, 90, 135, 180, -135, -90, -45, -170):
+        solved, ambiguous, elevation = array.solve(pair_lags(array, arrival_samples(array.positions, bearing)))
+        assert np.degrees(angle_error(np.degrees(solved[0]), bearing)) < 0.5, bearing
+        assert ambiguous[0] == solved[0]
+        assert abs(elevation[0]) < 0.01
+
+
+def test_square_elevation_is_a_magnitude():
+    array = MicArray(SQUARE)
+    for elevation in (30, -30):
+        solved, _, solved_elevation = array.solve(pair_lags(array, arrival_samples(array.positions, 60, elevation)))
+        assert np.degrees(angle_error(np.degrees(solved[0]), 60)) < 0.5
+        assert abs(np.degrees(solved_elevation[0]) - 30) < 0.5
+
+
+def test_tetrahedron_gives_signed_elevation():
+    array = MicArray([(HALF, HALF, HALF), (HALF, -HALF, -HALF), (-HALF, HALF, -HALF), (-HALF, -HALF, HALF)])
+    solved, _, elevation = array.solve(pair_lags(array, arrival_samples(array.positions, -120, -25)))
+    assert np.degrees(angle_error(np.degrees(solved[0]), -120)) < 0.5
+    assert abs(np.degrees(elevation[0]) + 25) < 0.5
+
+
+def test_two_mics_match_bearing_table():
+    array = MicArray(two_mic_positions())
+    table = BearingTable()
+    offsets = np.arange(-table.max_shift, table.max_shift + 1.0) # The table's exact grid points
+    solved, mirror, _ = array.solve(offsets[:, None])
+    primary, table_mirror = table.lookup(offsets)
+    assert np.allclose(solved, primary, atol=1e-6)
+    assert np.allclose(angle_error(np.degrees(mirror), np.degrees(table_mirror)), 0, atol=1e-6)
+
+
+def test_firmware_lags_solve_to_the_source():
+    """Pair lags from the sketch's own computeOffset() on delayed copies of one chirp."""
+    array = MicArray(SQUARE)
+    max_shift = int(array.max_shifts.max())
+    rng = np.random.default_rng(1)
+    n, pad = 512, 4 * max_shift
+    chirp = rng.normal(scale=2e4, size=n + 2 * pad)
+    freqs = np.fft.rfftfreq(len(chirp))
+    for bearing in (0, 90, 45, 180, -100):
+        arrival = arrival_samples(array.positions, bearing)
+        arrival -= arrival.min()
+        mics = [np.fft.irfft(np.fft.rfft(chirp) * np.exp(-2j * np.pi * freqs * d), len(chirp))[pad:pad + n]
+                .astype(np.float32) for d in arrival]
+        lags = [best_offsets(correlation_scores(mics[i][None], mics[j][None], max_shift), max_shift)[0]
+                for i, j in array.pairs]
+        solved = np.degrees(array.solve(lags)[0][0])
+        assert np.degrees(angle_error(solved, bearing)) < 10, (bearing, solved)
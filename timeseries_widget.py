@@ -0,0 +1,124 @@
+from PySide6.QtWidgets import QWidget
+from PySide6.QtGui import QPainter, QPen, QColor, QFont, QPixmap, QPolygonF
+from PySide6.QtCore import Qt, QPointF, QTimer
+import numpy as np
+from history import envelope_points
+from instrumentation import metrics
+
+class TimeSeriesWidget(QWidget):
+    """Scrolling bearing-vs-time plot drawn from a BearingHistory."""
+    RENDER_FPS = 30
+    WINDOW_SECONDS = 60.0 # Width of the visible time window
+    MARGIN_LEFT = 45
+    MARGIN_OTHER = 10
+
+    def __init__(self, history):
+        super().__init__()
+        self.setMinimumHeight(150)
+        self.history = history
+        self.full_circle = False # Axis spans +/-180° (arrays without a mirror) rather than +/-90°
+
+        self._background = None
+        self._axis_font = QFont("Arial", 8)
+        self._trace_pen = QPen(Qt.red, 1)
+
+        # Same coalescing as ViewerWidget: new data only marks the plot dirty
+        self._dirty = False
+        self._render_timer = QTimer(self)
+        self._render_timer.setInterval(int(1000 / self.RENDER_FPS))
+        self._render_timer.timeout.connect(self._render_tick)
+
+    def mark_dirty(self):
+        """Schedules a repaint on the next render tick."""
+        self._dirty = True
+        if not self._render_timer.isActive():
+            self._render_timer.start()
+
+    def _render_tick(self):
+        if self._dirty:
+            self._dirty = False
+            self.update()
+        else:
+            self._render_timer.stop()
+
+    def set_full_circle(self, on):
+        """Scales the axis to +/-180° for bearings that can be behind the array, or back to +/-90°."""
+        if on != self.full_circle:
+            self.full_circle = on
+            self._background = None
+            self.update()
+
+    def _span(self):
+        return 180 if self.full_circle else 90
+
+    def resizeEvent(self, event):
+        self._background = None
+        super().resizeEvent(event)
+
+    def _plot_rect(self):
+        """Returns (left, top, width, height) of the plotting area."""
+        return (self.MARGIN_LEFT, self.MARGIN_OTHER,
+                self.width() - self.MARGIN_LEFT - self.MARGIN_OTHER,
+                self.height() - 2 * self.MARGIN_OTHER)
+
+    def _render_background(self):
+        """Draws the axes, gridlines and labels into a cached pixmap."""
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+
+        painter = QPainter(pixmap)
+        painter.fillRect(self.rect(), Qt.white)
+        left, top, width, height = self._plot_rect()
+
+        painter.setFont(self._axis_font)
+        span = self._span()
+        for degrees in range(-span, span + 1, span // 2):
+            y = top + height * (span - degrees) / (2 * span)
+            painter.setPen(QPen(QColor(220, 220, 220), 1, Qt.DotLine))
+            painter.drawLine(QPointF(left, y), QPointF(left + width, y))
+            painter.setPen(Qt.black)
+            painter.drawText(int(left - 35), int(y + 4), f"{degrees:+d}°")
+
+        painter.setPen(QPen(Qt.darkGray, 1))
+        painter.drawRect(left, top, width, height)
+        painter.drawText(int(left + 4), int(top + height - 4), f"-{self.WINDOW_SECONDS:.0f} s")
+        painter.end()
+
+        self._background = pixmap
+
+    def paintEvent(self, event):
+        """Draws the min/max-decimated bearing trace of the last WINDOW_SECONDS as one polyline."""
+        started = metrics.start()
+        self._paint(event)
+        metrics.stop("paint_plot", started)
+
+    def _paint(self, event):
+        if self._background is None or self._background.devicePixelRatio() != self.devicePixelRatioF():
+            self._render_background()
+
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._background)
+
+        t_end = self.history.latest_time()
+        left, top, width, height = self._plot_rect()
+        if t_end is None or width <= 1:
+            return
+
+        # One bin per pixel column: never more than 2 * width points, whatever the history length
+        t_start = t_end - self.WINDOW_SECONDS
+        times, mins, maxs = self.history.decimate(t_start, t_end + 1e-6, int(width))
+        if len(times) == 0:
+            return
+        ts, bearings = envelope_points(times, mins, maxs)
+        xs = left + (ts - t_start) / self.WINDOW_SECONDS * width
+        degrees = np.degrees(bearings)
+        ys = top + (0.5 - degrees / (2 * self._span())) * height
+
+        painter.setClipRect(left, top, width, height) # Out-of-range bearings stay inside the plot
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(self._trace_pen)
+        # Break the line where a bearing wraps past +/-180° instead of drawing across the plot
+        breaks = np.flatnonzero(np.abs(np.diff(degrees)) > 180) + 1
+        for seg_x, seg_y in zip(np.split(xs, breaks), np.split(ys, breaks)):
+            painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in zip(seg_x, seg_y)]))
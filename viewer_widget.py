@@ -1,23 +1,107 @@
 from PySide6.QtWidgets import QWidget
-from PySide6.QtGui import QPainter, QPen, QBrush, QColor, QFont
-from PySide6.QtCore import Qt, QPointF
+from PySide6.QtGui import QPainter, QPen, QBrush, QColor, QFont, QPixmap, QPolygonF
+from PySide6.QtCore import Qt, QPointF, QRectF, QTimer
 import math
+import numpy as np
+from history import BearingDensity, envelope_points
+from instrumentation import metrics
 
 class ViewerWidget(QWidget):
-    def __init__(self):
+    RENDER_FPS = 60 # Upper bound on repaints per second, however fast data arrives
+    TRAIL_SECONDS = 30.0 # How far back the bearing trail reaches
+    TRAIL_BINS = 120 # Decimated trail points (x2 for min/max), independent of data rate
+    DENSITY_BINS = 180 # 2° sectors in the bearing density rose
+    DENSITY_HALF_LIFE = 5.0 # seconds for a bearing's weight in the rose to halve
+    DENSITY_THRESHOLD = 0.03 # Change in any normalised sector that makes the rose worth redrawing
+
+    def __init__(self, history=None):
         super().__init__()
+        self.history = history # Optional BearingHistory used for the trail overlay
         self.setMinimumSize(500, 400)
         self.setStyleSheet("background-color: lightgray;")
         self.current_angle_rad = 0.0 # Stores the angle calculated from arcsin
+        self.ambiguous_angle_rad = math.pi # The mirror bearing the array cannot tell apart
+        self.elevation_rad = math.nan # Known only for arrays with mics off a single line
+        self.resolved = False # True when the array has no front/back mirror
+
+        # Static compass (grid, circles, labels) rendered once and reused every frame
+        self._background = None
+        self._label_font = QFont("Arial", 10, QFont.Bold)
+        self._angle_font = QFont("Arial", 14, QFont.Bold)
+        self._detail_font = QFont("Arial", 10)
+        self._primary_pen = QPen(Qt.red, 4, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+        self._ambiguous_pen = QPen(Qt.blue, 4, Qt.DotLine, Qt.RoundCap, Qt.RoundJoin) # Dotted blue for ambiguous
+        self._primary_brush = QBrush(Qt.red)
+        self._ambiguous_brush = QBrush(Qt.blue)
+        self._trail_pen = QPen(QColor(255, 120, 120), 2, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+
+        # Bearing density rose under the arrows, cached as a pixmap and redrawn only when it visibly changes
+        self.show_density = True
+        self.density = BearingDensity(self.DENSITY_BINS, self.DENSITY_HALF_LIFE)
+        self.mirror_density = BearingDensity(self.DENSITY_BINS, self.DENSITY_HALF_LIFE)
+        self._density_layer = None
+        self._density_brush = QColor(255, 0, 0)
+        self._mirror_density_brush = QColor(0, 0, 255)
+
+        # Data updates only mark the widget dirty; this tick turns them into at most one repaint per frame
+        self._dirty = False
+        self._render_timer = QTimer(self)
+        self._render_timer.setInterval(int(1000 / self.RENDER_FPS))
+        self._render_timer.timeout.connect(self._render_tick)
+
+    def set_angle(self, angle_rad, ambiguous_rad=None, elevation_rad=math.nan, resolved=False):
+        """Sets the angle (and its ambiguous mirror, default +180°) to be drawn on the next frame.
 
-    def set_angle(self, angle_rad):
-        """Sets the angle to be drawn and triggers a repaint."""
+        resolved means the array told front from back, so only one arrow is drawn.
+        Bearings that are not finite (no bearing) are not drawn.
+        """
         self.current_angle_rad = angle_rad
-        self.update() # Request a repaint of the widget
+        self.ambiguous_angle_rad = angle_rad + math.pi if ambiguous_rad is None else ambiguous_rad
+        self.elevation_rad = elevation_rad
+        self.resolved = resolved
+        self._dirty = True
+        if not self._render_timer.isActive():
+            self._render_timer.start()
 
-    def paintEvent(self, event):
-        """Draws the polar graph, compass, and two ambiguous angle indicators."""
-        painter = QPainter(self)
+    def add_bearings(self, t, primary, ambiguous):
+        """Accumulates a batch of bearings into the density rose (drawn on the next frame that needs it)."""
+        self.density.add(t, primary)
+        self.mirror_density.add(t, ambiguous)
+
+    def clear_density(self):
+        self.density.clear()
+        self.mirror_density.clear()
+        self._density_layer = None
+        self.update()
+
+    def set_show_density(self, shown):
+        self.show_density = shown
+        self.update()
+
+    def _render_tick(self):
+        """Repaints if anything changed since the last frame, otherwise lets the timer idle."""
+        if self._dirty:
+            self._dirty = False
+            self.update() # Request a repaint of the widget
+        else:
+            self._render_timer.stop()
+
+    def resizeEvent(self, event):
+        self._background = None # Compass geometry depends on the widget size
+        self._density_layer = None
+        super().resizeEvent(event)
+
+    def _compass_geometry(self):
+        """Returns (center_x, center_y, compass_radius) for the current widget size."""
+        return self.width() // 2, self.height() // 2, min(self.width(), self.height()) / 3
+
+    def _render_background(self):
+        """Draws the static polar graph and compass labels into a cached pixmap."""
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+
+        painter = QPainter(pixmap)
         painter.setRenderHint(QPainter.Antialiasing)
 
         # Fill background (canvas area)
@@ -30,13 +114,10 @@ class ViewerWidget(QWidget):
         painter.drawRect(self.rect().adjusted(0, 0, -1, -1))
 
         # Center of the widget
-        center_x = self.width() // 2
-        center_y = self.height() // 2
+        center_x, center_y, compass_radius = self._compass_geometry()
         center = QPointF(center_x, center_y)
 
         # --- Polar Graph Elements ---
-        compass_radius = min(self.width(), self.height()) / 3
-        
         # Draw concentric circles (grid lines)
         painter.setPen(QPen(QColor(220, 220, 220), 1, Qt.DotLine)) # Light gray dotted lines
         num_circles = 3
@@ -60,8 +141,7 @@ class ViewerWidget(QWidget):
 
 
         # --- Compass Labels ---
-        font = QFont("Arial", 10, QFont.Bold)
-        painter.setFont(font)
+        painter.setFont(self._label_font)
         painter.setPen(Qt.black)
 
         # Labels for 0°, +90°, -90° (and 180° for ambiguity context)
@@ -72,23 +152,59 @@ class ViewerWidget(QWidget):
         
         # Add a "180° (Behind)" label for context of ambiguity
         painter.drawText(int(center_x - 50), int(center_y + compass_radius + 20), "180° (Behind)")
+        painter.end()
 
+        self._background = pixmap
+
+    def paintEvent(self, event):
+        """Composites the cached compass with the two ambiguous angle indicators."""
+        started = metrics.start()
+        self._paint(event)
+        metrics.stop("paint", started)
+
+    def _paint(self, event):
+        # Re-render the static layer after a resize or when moved to a screen with another DPI
+        if self._background is None or self._background.devicePixelRatio() != self.devicePixelRatioF():
+            self._render_background()
+
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._background)
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        center_x, center_y, compass_radius = self._compass_geometry()
+        center = QPointF(center_x, center_y)
+
+        if self.show_density:
+            if (self._density_layer is None or self._density_layer.devicePixelRatio() != self.devicePixelRatioF()
+                    or self.density.changed(self.DENSITY_THRESHOLD)
+                    or self.mirror_density.changed(self.DENSITY_THRESHOLD)):
+                self._render_density()
+            painter.drawPixmap(0, 0, self._density_layer)
+
+        if self.history is not None:
+            self._draw_trail(painter, center_x, center_y, compass_radius)
 
         # --- Draw Ambiguous Angle Indicators (Two Arrows) ---
         arrow_length = compass_radius * 0.8
-        arrow_thickness = 4
         arrow_head_size = 15
 
+        if not math.isfinite(self.current_angle_rad):
+            return # No bearing to show (e.g. a vertical line of mics)
+
         # First arrow: The directly calculated angle
-        painter.setPen(QPen(Qt.red, arrow_thickness, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
-        painter.setBrush(QBrush(Qt.red))
+        painter.setPen(self._primary_pen)
+        painter.setBrush(self._primary_brush)
         self._draw_arrow(painter, center, arrow_length, arrow_head_size, self.current_angle_rad)
 
-        # Second arrow: The ambiguous angle (180 degrees rotated)
+        # Second arrow: The ambiguous angle (mirrored behind the array)
         # This angle represents the "behind" ambiguity.
-        ambiguous_angle_rad = self.current_angle_rad + math.pi
-        painter.setPen(QPen(Qt.blue, arrow_thickness, Qt.DotLine, Qt.RoundCap, Qt.RoundJoin)) # Dotted blue for ambiguous
-        painter.setBrush(QBrush(Qt.blue))
+        ambiguous_angle_rad = self.ambiguous_angle_rad
+        if self.resolved or not math.isfinite(ambiguous_angle_rad):
+            # Multi-mic array: the direction is resolved, so there is no mirror to show
+            self._draw_resolved_text(painter, center_x, center_y, compass_radius)
+            return
+        painter.setPen(self._ambiguous_pen)
+        painter.setBrush(self._ambiguous_brush)
         self._draw_arrow(painter, center, arrow_length, arrow_head_size, ambiguous_angle_rad)
 
         # --- Display the calculated angles in degrees ---
@@ -104,19 +220,75 @@ class ViewerWidget(QWidget):
 
 
         painter.setPen(Qt.darkBlue)
-        painter.setFont(QFont("Arial", 14, QFont.Bold))
+        painter.setFont(self._angle_font)
         painter.drawText(
             int(center_x - 120), int(center_y + compass_radius + 40),
             f"Possible Angles: {display_angles[0]:.2f}° and {display_angles[1]:.2f}°"
         )
         # Indicate which one is "primary" (from arcsin) or "ambiguous"
-        painter.setFont(QFont("Arial", 10))
+        painter.setFont(self._detail_font)
         painter.drawText(
             int(center_x - 120), int(center_y + compass_radius + 60),
             f"(Primary: {angle_deg_primary:.2f}°, Ambiguous: {math.degrees(ambiguous_angle_rad):.2f}°)"
         )
 
 
+    def _draw_resolved_text(self, painter, center_x, center_y, compass_radius):
+        painter.setPen(Qt.darkBlue)
+        painter.setFont(self._angle_font)
+        painter.drawText(int(center_x - 120), int(center_y + compass_radius + 40),
+                         f"Bearing: {math.degrees(self.current_angle_rad):.2f}°")
+        if not math.isnan(self.elevation_rad):
+            painter.setFont(self._detail_font)
+            painter.drawText(int(center_x - 120), int(center_y + compass_radius + 60),
+                             f"Elevation: {math.degrees(self.elevation_rad):.2f}°")
+
+    def _render_density(self):
+        """Draws both density roses into a transparent cached pixmap: sector length and opacity follow the density."""
+        started = metrics.start()
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        center_x, center_y, compass_radius = self._compass_geometry()
+        span = 360.0 / self.DENSITY_BINS
+        for density, color in ((self.mirror_density, self._mirror_density_brush),
+                               (self.density, self._density_brush)):
+            values = density.mark_shown()
+            starts = np.degrees(density.bin_edges())
+            for value, start in zip(values[values > 0.01], starts[values > 0.01]):
+                radius = compass_radius * float(value)
+                color.setAlpha(int(40 + 110 * value))
+                painter.setBrush(color)
+                # Qt angles run counter-clockwise from 3 o'clock in 1/16°; bearings clockwise from Up
+                painter.drawPie(QRectF(center_x - radius, center_y - radius, 2 * radius, 2 * radius),
+                                int((90.0 - start - span) * 16), int(span * 16))
+        painter.end()
+        self._density_layer = pixmap
+        metrics.stop("paint_density", started)
+
+    def _draw_trail(self, painter, center_x, center_y, compass_radius):
+        """Draws recent primary bearings as a spiral: newest on the rim, older ones nearer the center."""
+        t_end = self.history.latest_time()
+        if t_end is None:
+            return
+        t_start = t_end - self.TRAIL_SECONDS
+        times, mins, maxs = self.history.decimate(t_start, t_end + 1e-6, self.TRAIL_BINS)
+        if len(times) < 2:
+            return
+        ts, bearings = envelope_points(times, mins, maxs)
+
+        radius = compass_radius * (0.25 + 0.75 * (ts - t_start) / self.TRAIL_SECONDS)
+        xs = center_x + radius * np.sin(bearings) # 0 rad is "Up", positive is clockwise
+        ys = center_y - radius * np.cos(bearings)
+        painter.setPen(self._trail_pen)
+        painter.setBrush(Qt.NoBrush)
+        painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in zip(xs, ys)]))
+
     def _draw_arrow(self, painter, center, length, head_size, angle_rad):
         """Helper function to draw an arrow from the center at a given angle."""
         # Angle for drawing: 0 degrees is to the right, positive is counter-clockwise.